@@ -0,0 +1,4 @@
+"""Benchmarks of the Factorial API client against a local fake server.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
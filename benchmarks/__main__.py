@@ -0,0 +1,10 @@
+"""Entry point of `python -m benchmarks`.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import sys
+
+from benchmarks.run import main
+
+sys.exit(main())
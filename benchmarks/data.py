@@ -0,0 +1,174 @@
+"""Synthetic Factorial data at configurable scale.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import random
+import string
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from drifactorial import HALF_DAY_AM, HALF_DAY_PM
+
+DEFAULT_SEED = 2021
+DEFAULT_START = date(2021, 1, 1)
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Size of a synthetic dataset."""
+
+    employees: int = 200
+    leaves: int = 12
+    shifts: int = 120
+    locations: int = 4
+    teams: int = 10
+    holidays: int = 14
+    years: int = 2
+
+    def as_dict(self) -> Dict[str, int]:
+        """Get the scale as a dictionary."""
+        return asdict(self)
+
+
+DEFAULT_SCALE = Scale()
+
+
+@dataclass
+class Dataset:
+    """Synthetic employees, holidays, leaves and shifts, as API JSON."""
+
+    employees: List[Dict[str, Any]]
+    holidays: List[Dict[str, Any]]
+    leaves: List[Dict[str, Any]]
+    shifts: List[Dict[str, Any]]
+
+
+def _random_string(rng: random.Random, *, k: int = 12) -> str:
+    """Aux function to generate a random string in lowercase."""
+    return "".join(rng.choices(string.ascii_lowercase, k=k))
+
+
+def _random_day(rng: random.Random, *, start: date, days: int) -> date:
+    """Aux function to generate a random date within a period."""
+    return start + timedelta(days=rng.randrange(days))
+
+
+def generate(
+    scale: Scale, *, seed: int = DEFAULT_SEED, start: date = DEFAULT_START
+) -> Dataset:
+    """Generate a reproducible dataset.
+
+    Holidays belong to locations and employees have the holidays of
+      their location. Leaves and shifts are spread over `scale.years`
+      years from `start`.
+
+    Args:
+        scale: Size of the dataset.
+        seed: Optional, seed of the random generator.
+        start: Optional, first day of the period.
+
+    Returns:
+        Dataset.
+    """
+    rng = random.Random(seed)
+    days = 365 * scale.years
+    holidays: List[Dict[str, Any]] = []
+    for location_id in range(1, scale.locations + 1):
+        for _ in range(scale.holidays * scale.years):
+            holidays.append(
+                {
+                    "id": len(holidays) + 1,
+                    "summary": _random_string(rng),
+                    "description": None,
+                    "date": _random_day(rng, start=start, days=days).isoformat(),
+                    "half_day": rng.choice([None] * 8 + [HALF_DAY_AM, HALF_DAY_PM]),
+                    "location_id": location_id,
+                }
+            )
+    employees: List[Dict[str, Any]] = []
+    leaves: List[Dict[str, Any]] = []
+    shifts: List[Dict[str, Any]] = []
+    for employee_id in range(1, scale.employees + 1):
+        location_id = rng.randint(1, scale.locations)
+        first_name = _random_string(rng, k=8)
+        last_name = _random_string(rng, k=10)
+        full_name = f"{first_name} {last_name}"
+        employees.append(
+            {
+                "id": employee_id,
+                "email": f"{first_name}.{last_name}@example.com",
+                "first_name": first_name,
+                "last_name": last_name,
+                "full_name": full_name,
+                "company_holiday_ids": [
+                    x["id"] for x in holidays if x["location_id"] == location_id
+                ],
+                "location_id": location_id,
+                "regular_access_starts_on": start.isoformat(),
+                "role": "basic",
+                "team_ids": rng.sample(
+                    range(1, scale.teams + 1), k=min(2, scale.teams)
+                ),
+                "timeoff_manager_id": 1,
+                "address_line_1": _random_string(rng, k=24),
+                "address_line_2": None,
+                "bank_number": None,
+                "birthday_on": _random_day(
+                    rng, start=date(1960, 1, 1), days=365 * 40
+                ).isoformat(),
+                "city": _random_string(rng),
+                "country": "es",
+                "gender": rng.choice(["female", "male", None]),
+                "hiring": {
+                    "base_compensation_amount_in_cents": rng.randint(10**6, 10**7),
+                    "base_compensation_type": "yearly",
+                },
+                "identifier": _random_string(rng, k=9),
+                "identifier_type": "dni",
+                "manager_id": 1,
+                "nationality": "es",
+                "phone_number": None,
+                "postal_code": f"{rng.randint(1000, 52999):05d}",
+                "social_security_number": None,
+                "start_date": start.isoformat(),
+                "state": None,
+                "terminated_on": None,
+            }
+        )
+        for _ in range(scale.leaves * scale.years):
+            start_on = _random_day(rng, start=start, days=days)
+            length = rng.randint(0, 9)
+            leaves.append(
+                {
+                    "id": len(leaves) + 1,
+                    "approved": rng.random() < 0.9,
+                    "description": None,
+                    "employee_id": employee_id,
+                    "start_on": start_on.isoformat(),
+                    "finish_on": (start_on + timedelta(days=length)).isoformat(),
+                    "half_day": None if length else rng.choice([None, HALF_DAY_AM]),
+                    "leave_type_id": rng.randint(1, 5),
+                    "employee_full_name": full_name,
+                    "leave_type_name": None,
+                }
+            )
+        for day in sorted(
+            _random_day(rng, start=start, days=days)
+            for _ in range(scale.shifts * scale.years)
+        ):
+            clock_in = rng.randint(7, 10)
+            shifts.append(
+                {
+                    "id": len(shifts) + 1,
+                    "day": day.day,
+                    "month": day.month,
+                    "year": day.year,
+                    "clock_in": f"{clock_in:02d}:{rng.randint(0, 59):02d}",
+                    "clock_out": f"{clock_in + 8:02d}:{rng.randint(0, 59):02d}",
+                    "employee_id": employee_id,
+                    "observations": None,
+                }
+            )
+    return Dataset(employees=employees, holidays=holidays, leaves=leaves, shifts=shifts)
@@ -0,0 +1,352 @@
+"""Run the benchmarks and compare their results between versions.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from unittest import mock
+
+import drifactorial
+from benchmarks.data import (
+    DEFAULT_SCALE,
+    DEFAULT_SEED,
+    DEFAULT_START,
+    Dataset,
+    Scale,
+)
+from benchmarks.server import FakeFactorial
+from drifactorial import Factorial
+from drifactorial.metrics import PERCENTILES, percentile
+
+DEFAULT_REPEAT = 20
+DEFAULT_BURST = 50
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_REGRESSION = 0.2
+RESULTS_DIR = Path(__file__).parent / "results"
+
+Operation = Callable[[], int]
+# operations of a scenario and how many of them run at once
+Workload = Tuple[List[Operation], int]
+
+
+def _get_employees(client: Factorial, dataset: Dataset, args: Any) -> Workload:
+    return [lambda: len(client.get_employees())] * args.repeat, 1
+
+
+def _get_leaves(client: Factorial, dataset: Dataset, args: Any) -> Workload:
+    return [lambda: len(client.get_leaves())] * args.repeat, 1
+
+
+def _get_daysoff(client: Factorial, dataset: Dataset, args: Any) -> Workload:
+    end = DEFAULT_START + timedelta(days=365 * args.scale.years - 1)
+
+    def get_daysoff(employee_id: int) -> int:
+        daysoff = client.get_daysoff(
+            employee_id=employee_id, start=DEFAULT_START, end=end
+        )
+        return sum(len(x) for x in daysoff)
+
+    employee_ids = [x["id"] for x in dataset.employees]
+    return [
+        partial(get_daysoff, employee_ids[n % len(employee_ids)])
+        for n in range(args.repeat)
+    ], 1
+
+
+def _clock_in_burst(client: Factorial, dataset: Dataset, args: Any) -> Workload:
+    now = datetime(2021, 6, 1, 9)
+    employee_ids = [x["id"] for x in dataset.employees]
+
+    def clock_in(employee_id: int) -> int:
+        client.clock_in(now=now, employee_id=employee_id)
+        return 1
+
+    return [
+        partial(clock_in, employee_ids[n % len(employee_ids)])
+        for n in range(args.burst)
+    ], args.concurrency
+
+
+SCENARIOS: Dict[str, Callable[[Factorial, Dataset, Any], Workload]] = {
+    "get_employees": _get_employees,
+    "get_leaves": _get_leaves,
+    "get_daysoff": _get_daysoff,
+    "clock_in_burst": _clock_in_burst,
+}
+
+
+def _execute(operations: Sequence[Operation], *, concurrency: int) -> Dict[str, Any]:
+    """Aux function to run and time the operations of a scenario."""
+
+    def timed(operation: Operation) -> Tuple[float, int]:
+        start = time.perf_counter()
+        items = operation()
+        return time.perf_counter() - start, items
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(timed, operations))
+    else:
+        timings = [timed(x) for x in operations]
+    seconds = time.perf_counter() - start
+    latencies = sorted(x for x, _ in timings)
+    items = sum(x for _, x in timings)
+    return {
+        "operations": len(timings),
+        "items": items,
+        "seconds": seconds,
+        "operations_per_second": len(timings) / seconds,
+        "items_per_second": items / seconds,
+        "latency": {
+            "mean": sum(latencies) / len(latencies),
+            **{f"p{q}": percentile(latencies, q) for q in PERCENTILES},
+        },
+    }
+
+
+def run_scenario(
+    name: str, client: Factorial, dataset: Dataset, args: Any
+) -> Dict[str, Any]:
+    """Measure a scenario.
+
+    The first operation warms up connections and parsers. Times are
+      measured in a first pass, and peak memory in a second one, since
+      tracing allocations slows everything down.
+
+    Args:
+        name: Name of the scenario.
+        client: Client connected to the fake server.
+        dataset: Dataset of the fake server.
+        args: Benchmark settings.
+
+    Returns:
+        Throughput, latency in seconds and peak memory in bytes.
+    """
+    operations, concurrency = SCENARIOS[name](client, dataset, args)
+    operations[0]()
+    result = _execute(operations, concurrency=concurrency)
+    tracemalloc.start()
+    try:
+        _execute(operations, concurrency=concurrency)
+        _, result["peak_memory"] = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def _commit() -> Optional[str]:
+    """Aux function to get the current git commit, if any."""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).parent,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(args: Any) -> Dict[str, Any]:
+    """Run the selected scenarios against a fake server.
+
+    Args:
+        args: Benchmark settings, as parsed by `parse_args`.
+
+    Returns:
+        Results of each scenario, with the version and settings.
+    """
+    server = FakeFactorial(scale=args.scale, seed=args.seed, latency=args.latency)
+    dataset = server.dataset()
+    results = {}
+    with server, mock.patch.object(drifactorial, "URL_BASE", server.url):
+        for name in args.scenarios:
+            with Factorial(
+                access_token="benchmark",
+                pool_size=args.concurrency,
+                page_size=args.page_size,
+            ) as client:
+                results[name] = run_scenario(name, client, dataset, args)
+    return {
+        "version": drifactorial.__version__,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "scale": args.scale.as_dict(),
+            "seed": args.seed,
+            "latency": args.latency,
+            "repeat": args.repeat,
+            "burst": args.burst,
+            "concurrency": args.concurrency,
+            "page_size": args.page_size,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], *, max_regression: float
+) -> List[str]:
+    """Compare results with a baseline.
+
+    Args:
+        current: Results of this run.
+        baseline: Results of a previous run.
+        max_regression: Relative increase of median latency or peak
+          memory over the baseline considered a regression.
+
+    Returns:
+        Description of each regression found.
+    """
+    if current["settings"] != baseline["settings"]:
+        print("Warning: settings differ from the baseline.")
+    regressions = []
+    print(f"\nComparison with {baseline['version']} ({baseline['commit']}):")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric, value, old_value in (
+            ("p50 latency", result["latency"]["p50"], old["latency"]["p50"]),
+            ("peak memory", result["peak_memory"], old["peak_memory"]),
+        ):
+            change = value / old_value - 1 if old_value else 0.0
+            print(f"  {name:<16} {metric:<12} {change:+8.1%}")
+            if change > max_regression:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
+
+
+def _print(results: Dict[str, Any]) -> None:
+    """Aux function to print results as a table."""
+    print(
+        f"drifactorial {results['version']} ({results['commit']}),"
+        f" Python {results['python']}"
+    )
+    print(
+        f"  {'scenario':<16} {'ops/s':>9} {'items/s':>11}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MiB':>9}"
+    )
+    for name, result in results["results"].items():
+        latency = result["latency"]
+        print(
+            f"  {name:<16} {result['operations_per_second']:9.1f}"
+            f" {result['items_per_second']:11.0f}"
+            f" {latency['p50'] * 1e3:8.2f} {latency['p95'] * 1e3:8.2f}"
+            f" {latency['p99'] * 1e3:8.2f} {result['peak_memory'] / 2**20:9.2f}"
+        )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark drifactorial against a local fake Factorial API.",
+    )
+    defaults = DEFAULT_SCALE
+    parser.add_argument("--employees", type=int, default=defaults.employees)
+    parser.add_argument(
+        "--leaves",
+        type=int,
+        default=defaults.leaves,
+        help="leaves per employee and year",
+    )
+    parser.add_argument(
+        "--shifts",
+        type=int,
+        default=defaults.shifts,
+        help="shifts per employee and year",
+    )
+    parser.add_argument("--years", type=int, default=defaults.years)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="server delay in seconds"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT, help="requests per scenario"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=DEFAULT_BURST, help="clock-ins per burst"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="concurrent clock-ins",
+    )
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help=f"results file, by default in {RESULTS_DIR}",
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="do not save the results"
+    )
+    parser.add_argument("--compare", type=Path, default=None, help="baseline file")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help="fail if p50 latency or peak memory grow more than this fraction",
+    )
+    args = parser.parse_args(argv)
+    if min(args.repeat, args.burst, args.concurrency) < 1:
+        parser.error("Repeat, burst and concurrency must be at least 1.")
+    args.scale = Scale(
+        employees=args.employees,
+        leaves=args.leaves,
+        shifts=args.shifts,
+        years=args.years,
+    )
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run benchmarks from the command line.
+
+    Returns:
+        Exit code, 1 if some regression was found.
+    """
+    args = parse_args(argv)
+    results = run(args)
+    _print(results)
+    if not args.no_save:
+        output = args.output
+        if output is None:
+            stamp = results["commit"] or results["timestamp"].replace(":", "")
+            output = RESULTS_DIR / f"{results['version']}-{stamp}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        print(f"Results saved to {output}")
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, max_regression=args.max_regression)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
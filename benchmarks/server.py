@@ -0,0 +1,244 @@
+"""Local stand-in for the Factorial API.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import gzip
+import json
+import multiprocessing
+import socket
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import parse
+
+from benchmarks.data import DEFAULT_SCALE, DEFAULT_SEED, Dataset, Scale, generate
+from drifactorial import (
+    LIMIT_PARAM,
+    PAGE_PARAM,
+    URL_ACCOUNT,
+    URL_API,
+    URL_CLOCK_IN,
+    URL_CLOCK_OUT,
+    URL_EMPLOYEES,
+    URL_HOLIDAYS,
+    URL_LEAVES,
+    URL_SHIFTS,
+)
+
+_START_TIMEOUT = 30.0
+
+
+class _Server(ThreadingHTTPServer):
+    """Keep-alive HTTP server answering from a synthetic dataset."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, dataset: Dataset, *, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.dataset = dataset
+        self.latency = latency
+        self.employees = {x["id"]: x for x in dataset.employees}
+        # read-only data, so each distinct GET is serialized only once
+        self.bodies: Dict[str, bytes] = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        # responses are compressed when accepted, as the real API does
+        encoding = "gzip" if "gzip" in self.headers.get("Accept-Encoding", "") else None
+        key = f"{encoding}:{self.path}"
+        body = self.server.bodies.get(key)
+        if body is None:
+            status, payload = self._get(self.path)
+            body = json.dumps(payload).encode("utf-8")
+            if status != 200:
+                self._reply(status, body)
+                return
+            if encoding is not None:
+                body = gzip.compress(body)
+            self.server.bodies[key] = body
+        self._reply(200, body, encoding=encoding)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        endpoint = self.path.split("?")[0][len(f"/{URL_API}/") :]
+        if endpoint not in (
+            f"{URL_SHIFTS}/{URL_CLOCK_IN}",
+            f"{URL_SHIFTS}/{URL_CLOCK_OUT}",
+        ):
+            self._reply(404, b'{"error": "not found"}')
+            return
+        now = datetime.fromisoformat(payload["now"])
+        shift = {
+            "id": int(now.timestamp()),
+            "day": now.day,
+            "month": now.month,
+            "year": now.year,
+            "clock_in": now.strftime("%H:%M"),
+            "clock_out": None if endpoint.endswith(URL_CLOCK_IN) else "18:00",
+            "employee_id": int(payload["employee_id"]),
+            "observations": None,
+        }
+        self._reply(200, json.dumps(shift).encode("utf-8"))
+
+    def _get(self, path: str) -> Tuple[int, Any]:
+        """Aux method to answer a GET request."""
+        url = parse.urlsplit(path)
+        query = {k: v[0] for k, v in parse.parse_qs(url.query).items()}
+        endpoint = url.path[len(f"/{URL_API}/") :]
+        dataset = self.server.dataset
+        items: List[Dict[str, Any]]
+        if endpoint == URL_ACCOUNT:
+            employee = dataset.employees[0]
+            return 200, {
+                "email": employee["email"],
+                "full_name": employee["full_name"],
+                "first_name": employee["first_name"],
+                "last_name": employee["last_name"],
+                "employee_id": employee["id"],
+                "role": employee["role"],
+            }
+        if endpoint.startswith(f"{URL_EMPLOYEES}/"):
+            employee = self.server.employees.get(int(endpoint.split("/")[1]))
+            if employee is None:
+                return 404, {"error": "not found"}
+            return 200, employee
+        if endpoint == URL_EMPLOYEES:
+            items = dataset.employees
+        elif endpoint == URL_HOLIDAYS:
+            items = dataset.holidays
+        elif endpoint == URL_LEAVES:
+            items = [
+                x
+                for x in dataset.leaves
+                if x["finish_on"] >= query.get("from", "")
+                and x["start_on"] <= query.get("to", "9999")
+            ]
+        elif endpoint == URL_SHIFTS:
+            items = dataset.shifts
+            if "year" in query and "month" in query:
+                year, month = int(query["year"]), int(query["month"])
+                items = [x for x in items if (x["year"], x["month"]) == (year, month)]
+        else:
+            return 404, {"error": "not found"}
+        if "employee_id" in query:
+            employee_id = int(query["employee_id"])
+            items = [x for x in items if x["employee_id"] == employee_id]
+        if PAGE_PARAM in query and LIMIT_PARAM in query:
+            page, limit = int(query[PAGE_PARAM]), int(query[LIMIT_PARAM])
+            items = items[(page - 1) * limit : page * limit]
+        return 200, items
+
+    def _reply(
+        self, status: int, body: bytes, *, encoding: Optional[str] = None
+    ) -> None:
+        """Aux method to send a JSON response."""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _serve(scale: Scale, seed: int, latency: float, conn: Any) -> None:
+    """Aux function to run the server in a child process."""
+    server = _Server(generate(scale, seed=seed), latency=latency)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+class FakeFactorial:
+    """Local Factorial API serving a synthetic dataset.
+
+    The server runs in a child process, so that neither its CPU time
+      nor its memory are measured as the client's. Every process
+      generates the same dataset from the same scale and seed.
+
+    Clock-ins and clock-outs are answered with a new shift but do not
+      change the dataset, so that repeated runs are comparable.
+    """
+
+    def __init__(
+        self,
+        *,
+        scale: Scale = DEFAULT_SCALE,
+        seed: int = DEFAULT_SEED,
+        latency: float = 0.0,
+    ):
+        """Instantiate server.
+
+        Args:
+            scale: Optional, size of the dataset.
+            seed: Optional, seed of the dataset.
+            latency: Optional, seconds waited before each response, to
+              emulate the network round trip.
+        """
+        self.scale = scale
+        self.seed = seed
+        self.latency = latency
+        self.port: Optional[int] = None
+        self._process: Optional[Any] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        if self.port is None:
+            raise RuntimeError("Server is not running.")
+        return f"http://127.0.0.1:{self.port}"
+
+    def dataset(self) -> Dataset:
+        """Generate the dataset served."""
+        return generate(self.scale, seed=self.seed)
+
+    def start(self) -> None:
+        """Start the server process and wait until it listens."""
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_serve,
+            args=(self.scale, self.seed, self.latency, child_conn),
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        if not parent_conn.poll(_START_TIMEOUT):
+            self.stop()
+            raise RuntimeError("Fake server did not start.")
+        self.port = parent_conn.recv()
+        parent_conn.close()
+
+    def stop(self) -> None:
+        """Stop the server process."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        self.port = None
+
+    def __enter__(self) -> "FakeFactorial":
+        """Enter context, starting the server."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and stop the server."""
+        self.stop()
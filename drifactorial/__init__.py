@@ -3,23 +3,62 @@
 Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
 """
 
+from __future__ import annotations
 
+import io
+import itertools
 import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, Generator, List, Optional, Tuple, Union
-from urllib import parse, request
+from functools import lru_cache, partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib import error, parse, request
 
-from dateutil.parser import parse as du_parse  # type: ignore
-from pydantic import TypeAdapter
+from drifactorial.auth import UNAUTHORIZED_CODES, TokenRefresher
+from drifactorial.cache import PAST_MONTHS_TTL, CacheKey, ResponseCache, cache_key
+from drifactorial.intervals import (
+    DateInterval,
+    DaysOff,
+    expand_intervals,
+    merge_intervals,
+    remove_weekends,
+)
+from drifactorial.metrics import Event, Hook, ParseEvent, RequestEvent, endpoint_name
+from drifactorial.ratelimit import RateLimiter
+from drifactorial.stream import iter_json_array, join_json_arrays
+from drifactorial.transport import (
+    ACCEPT_ENCODING,
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    ConnectionPool,
+)
 
-from drifactorial.schemas import Account, Employee, Holiday, Leave, Shift, Token
+if TYPE_CHECKING:
+    from pydantic import TypeAdapter
 
-try:
-    from importlib.metadata import version  # type: ignore
-except ModuleNotFoundError:
-    from importlib_metadata import version  # type: ignore
-
-__version__ = version(__name__)
+    from drifactorial.columnar import LeaveColumns, ShiftColumns
+    from drifactorial.diskcache import DiskCache
+    from drifactorial.outbox import ClockQueue
+    from drifactorial.schemas import Account, Employee, Holiday, Leave, Shift, Token
 
 
 URL_BASE = "https://api.factorialhr.com"
@@ -38,14 +77,136 @@ SCOPES = ["read", "write", "read+write"]
 DEFAULT_SCOPE = "read+write"
 HALF_DAY_AM = "beggining_of_day"
 HALF_DAY_PM = "end_of_day"
+PAGE_PARAM = "page"
+LIMIT_PARAM = "limit"
+PAGINATED_ENDPOINTS = (URL_LEAVES, URL_HOLIDAYS, URL_EMPLOYEES, URL_SHIFTS)
+DEFAULT_PREFETCH = 1
+_T = TypeVar("_T")
+# action, employee id and time of a clock-in or clock-out
+_Clock = Tuple[str, int, datetime]
+_END = object()
+REJECTED_FILTER_CODES = (400, 422)
+# words of error messages rejecting a query parameter as unsupported
+UNSUPPORTED_WORDS = (
+    "unknown",
+    "unsupported",
+    "not supported",
+    "unpermitted",
+    "not permitted",
+    "not allowed",
+    "unrecognized",
+)
+
+# query parameter of each filter supported by the API, by endpoint
+SERVER_FILTERS: Dict[str, Dict[str, str]] = {
+    URL_LEAVES: {"start": "from", "end": "to", "employee_id": "employee_id"},
+    URL_HOLIDAYS: {},
+    URL_SHIFTS: {"employee_id": "employee_id"},
+}
+
+# names loaded on first access, to keep `import drifactorial` fast
+SCHEMA_NAMES = ("Account", "Employee", "Holiday", "Leave", "Shift", "Token")
+
+
+def __getattr__(name: str) -> Any:
+    """Load the package version and the schemas on first access."""
+    if name == "__version__":
+        try:
+            from importlib.metadata import version  # type: ignore
+        except ModuleNotFoundError:
+            from importlib_metadata import version  # type: ignore
+        value = version(__name__)
+    elif name in SCHEMA_NAMES:
+        from drifactorial import schemas
+
+        value = getattr(schemas, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 
 def _parse_date(start: Any) -> date:
     """Aux function to parse date."""
-    parsed = start if isinstance(start, date) else du_parse(start).date()
+    if isinstance(start, date):
+        return start
+    from dateutil.parser import parse as du_parse  # type: ignore
+
+    parsed = du_parse(start).date()
     return parsed
 
 
+def _server_params(filters: Dict[str, str], **values: Any) -> Dict[str, str]:
+    """Aux function to translate filters into query parameters.
+
+    Args:
+        filters: Query parameter of each supported filter.
+        values: Value of each filter. None values are skipped.
+
+    Returns:
+        Query parameters of the supported filters.
+    """
+    params = {}
+    for name, value in values.items():
+        if value is None or name not in filters:
+            continue
+        if isinstance(value, date):
+            value = value.isoformat()
+        params[filters[name]] = f"{value}"
+    return params
+
+
+def _rejected_params(message: bytes, params: Iterable[str]) -> Set[str]:
+    """Aux function to find the query parameters an error rejects.
+
+    A parameter is rejected if the error message says something is
+      not supported, and names the parameter: quoted (e.g. as a key
+      of a JSON body) or right after the word "parameter".
+
+    Args:
+        message: Body of the error response.
+        params: Query parameters sent.
+
+    Returns:
+        Query parameters rejected as not supported.
+    """
+    text = message.decode("utf-8", "replace").lower()
+    if not any(x in text for x in UNSUPPORTED_WORDS):
+        return set()
+    rejected = set()
+    for param in params:
+        name = re.escape(param.lower())
+        quoted = rf"[\"'`]{name}\\?[\"'`]"
+        named = rf"\bparam(eter)?s?\W+{name}\b"
+        if re.search(quoted, text) or re.search(named, text):
+            rejected.add(param)
+    return rejected
+
+
+class _MeteredReader:
+    """Aux class counting and timing the reads of a response body."""
+
+    def __init__(self, read: Callable[[int], bytes]):
+        self._read = read
+        self.elapsed = 0.0
+        self.size = 0
+
+    def __call__(self, amt: int) -> bytes:
+        start = time.perf_counter()
+        chunk = self._read(amt)
+        self.elapsed += time.perf_counter() - start
+        self.size += len(chunk)
+        return chunk
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    """Aux function to build (only once) the adapter of a schema."""
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(schema)
+
+
 def daterange(
     start: date, end: date, *, include_end: bool = True
 ) -> Generator[date, None, None]:
@@ -66,12 +227,438 @@ def daterange(
         yield start + timedelta(n)
 
 
-class Factorial:
+def _employment_window(
+    employee: Employee, *, start: Optional[date], end: Optional[date]
+) -> Tuple[date, date]:
+    """Aux function to bound a date filter by an employee's contract."""
+    # find valid start
+    if employee.start_date is None:
+        aux_start = date.today()
+    else:
+        aux_start = employee.start_date
+    if start is not None:
+        aux_start = max(aux_start, _parse_date(start))
+
+    # find valid end
+    if employee.terminated_on is None:
+        aux_end = date.today() + timedelta(days=365 * 10)
+    else:
+        aux_end = employee.terminated_on
+    if end is not None:
+        aux_end = min(aux_end, _parse_date(end))
+    return aux_start, aux_end
+
+
+def _months(start: date, end: date) -> List[Tuple[int, int]]:
+    """Aux function to list the (year, month) of a date range, in order."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _shifts_between(
+    months: Iterable[List[Shift]], *, start: date, end: date
+) -> List[Shift]:
+    """Aux function to merge the shifts of consecutive months in a range."""
+    return [
+        shift
+        for shifts in months
+        for shift in shifts
+        if start <= date(shift.year, shift.month, shift.day) <= end
+    ]
+
+
+def _collect_daysoff(
+    employee: Employee,
+    *,
+    holidays: List[Holiday],
+    leaves: List[Leave],
+    start: date,
+    end: date,
+    include_weekend: bool,
+    compact: bool = False,
+) -> DaysOff:
+    """Aux function to split an employee's holidays and leaves into days off.
+
+    Days off are merged as date intervals, and only expanded into
+      single days at the end, unless `compact`.
+
+    Args:
+        employee: Employee object.
+        holidays: Company holidays within `start` and `end`.
+        leaves: Leaves of the employee within `start` and `end`.
+        start: Start date of the employee's window (included).
+        end: End date of the employee's window (included).
+        include_weekend: Include weekend days (True) or not (False).
+        compact: Optional, return date intervals (True) or single
+          days (False).
+
+    Returns:
+        Full days off.
+        Morning days off.
+        Afternoon days off.
+    """
+    # get holidays for this employee
+    holidays = [x for x in holidays if x.id in employee.company_holiday_ids]
+
+    # get leaves for this employee
+    leaves = [x for x in leaves if x.approved]
+
+    # extract holidays and leaves: full days, mornings, afternoons
+    intervals: Dict[Optional[str], List[DateInterval]] = {
+        None: [],
+        HALF_DAY_AM: [],
+        HALF_DAY_PM: [],
+    }
+    for holiday in holidays:
+        if holiday.half_day in intervals:
+            intervals[holiday.half_day].append((holiday.date, holiday.date))
+    for leave in leaves:
+        if leave.half_day is None:
+            intervals[None].append(
+                (max(leave.start_on, start), min(leave.finish_on, end))
+            )
+        elif leave.half_day in intervals:
+            intervals[leave.half_day].append((leave.start_on, leave.start_on))
+
+    days_full, days_am, days_pm = (
+        merge_intervals(intervals[x]) for x in (None, HALF_DAY_AM, HALF_DAY_PM)
+    )
+
+    # remove weekends
+    if not include_weekend:
+        days_full = remove_weekends(days_full)
+        days_am = remove_weekends(days_am)
+        days_pm = remove_weekends(days_pm)
+
+    if compact:
+        return days_full, days_am, days_pm
+    return (
+        expand_intervals(days_full),
+        expand_intervals(days_am),
+        expand_intervals(days_pm),
+    )
+
+
+def _select_employees(
+    employees: List[Employee], employee_ids: Optional[Iterable[int]]
+) -> List[Employee]:
+    """Aux function to pick employees by id, in the given order."""
+    if employee_ids is None:
+        return employees
+    by_id = {x.id: x for x in employees}
+    selected_ids = list(dict.fromkeys(employee_ids))
+    missing = [x for x in selected_ids if x not in by_id]
+    if missing:
+        raise ValueError(f"Unknown employee ids: {', '.join(map(str, missing))}.")
+    return [by_id[x] for x in selected_ids]
+
+
+def _collect_daysoff_bulk(
+    employees: List[Employee],
+    *,
+    windows: Dict[int, Tuple[date, date]],
+    holidays: List[Holiday],
+    leaves: List[Leave],
+    include_weekend: bool,
+    compact: bool = False,
+) -> Dict[int, DaysOff]:
+    """Aux function to split days off of many employees at once.
+
+    Holidays are indexed by id and leaves grouped by employee, so
+      each employee only looks at their own records.
+
+    Args:
+        employees: Employee objects.
+        windows: Start and end date of each employee's window.
+        holidays: Company holidays within all windows.
+        leaves: Leaves within all windows.
+        include_weekend: Include weekend days (True) or not (False).
+        compact: Optional, return date intervals (True) or single
+          days (False).
+
+    Returns:
+        Full, morning and afternoon days off by employee id.
+    """
+    holidays_by_id = {x.id: x for x in holidays}
+    leaves_by_employee: Dict[int, List[Leave]] = defaultdict(list)
+    for leave in leaves:
+        leaves_by_employee[leave.employee_id].append(leave)
+
+    daysoff = {}
+    for employee in employees:
+        aux_start, aux_end = windows[employee.id]
+        employee_holidays = [
+            holidays_by_id[x]
+            for x in dict.fromkeys(employee.company_holiday_ids)
+            if x in holidays_by_id and aux_start <= holidays_by_id[x].date <= aux_end
+        ]
+        employee_leaves = [
+            x
+            for x in leaves_by_employee[employee.id]
+            if x.finish_on >= aux_start and x.start_on <= aux_end
+        ]
+        daysoff[employee.id] = _collect_daysoff(
+            employee,
+            holidays=employee_holidays,
+            leaves=employee_leaves,
+            start=aux_start,
+            end=aux_end,
+            include_weekend=include_weekend,
+            compact=compact,
+        )
+    return daysoff
+
+
+class _BaseFactorial:
+    """Aux class with the behaviour shared by the sync and async clients."""
+
+    access_token: str
+    cache: Optional[ResponseCache]
+    _hooks: List[Hook]
+    _server_filters: Dict[str, Dict[str, str]]
+
+    def add_hook(self, hook: Hook) -> None:
+        """Register a function called with request metrics.
+
+        The hook receives a `RequestEvent` after each HTTP request
+          (latencies, status and size) and a `ParseEvent` after each
+          response is parsed into schema objects (decoding and
+          validation times, number of items). Nothing is measured
+          while no hook is registered.
+
+        Args:
+            hook: Function called with each event, from the thread
+              that sent the request.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Unregister a function registered with `add_hook`."""
+        self._hooks.remove(hook)
+
+    def _emit(self, event: Event) -> None:
+        """Aux method to call all hooks with an event."""
+        for hook in self._hooks:
+            hook(event)
+
+    def _emit_request(
+        self,
+        req: request.Request,
+        *,
+        endpoint: str,
+        start: float,
+        response: Any = None,
+        status: Optional[int] = None,
+        size: int = 0,
+    ) -> None:
+        """Aux method to emit the metrics of a request."""
+        self._emit(
+            RequestEvent(
+                endpoint=endpoint_name(endpoint),
+                method=req.get_method(),
+                status=getattr(response, "status", status),
+                connect_time=getattr(response, "connect_time", None),
+                ttfb=getattr(response, "ttfb", None),
+                total_time=time.perf_counter() - start,
+                bytes=size,
+                compressed_bytes=getattr(response, "compressed_bytes", size),
+            )
+        )
+
+    def _with_access_token(self, req: request.Request) -> str:
+        """Aux method to send a request with the current access token."""
+        access_token = self.access_token
+        req.add_header("Authorization", f"Bearer {access_token}")
+        return access_token
+
+    def _parse_page(
+        self, body: bytes, *, previous: Optional[bytes], schema: Any, endpoint: str
+    ) -> List[Any]:
+        """Aux method to parse the new items of a page.
+
+        Endpoints ignoring the pagination parameters return the same page
+          over and over, so a page repeating the previous one has none.
+        """
+        if body == previous:
+            return []
+        return self._parse(List[schema], body, endpoint=endpoint)
+
+    def _parse(self, schema: Any, raw: bytes, *, endpoint: str) -> Any:
+        """Parse a response into schema objects, emitting its metrics.
+
+        Args:
+            schema: Schema of the response.
+            raw: Raw body of the response.
+            endpoint: Endpoint of the response.
+
+        Returns:
+            Parsed response.
+        """
+        if not self._hooks:
+            return _adapter(schema).validate_json(raw)
+        start = time.perf_counter()
+        parsed = _adapter(schema).validate_json(raw)
+        self._emit(
+            ParseEvent(
+                endpoint=endpoint_name(endpoint),
+                decode_time=None,
+                validation_time=time.perf_counter() - start,
+                items=len(parsed) if isinstance(parsed, list) else 1,
+            )
+        )
+        return parsed
+
+    def _reject_filters(
+        self, exc: error.HTTPError, *, endpoint: str, params: Dict[str, str]
+    ) -> None:
+        """Aux method to disable the filters the API rejected.
+
+        Only the filters whose query parameters the error names as not
+          supported are disabled for the endpoint: other errors may be
+          caused by the value of a filter, or by anything else.
+
+        Args:
+            exc: Error rejecting a request with filters.
+            endpoint: Endpoint of the request.
+            params: Query parameters of the filters sent.
+
+        Raises:
+            HTTPError: If the error does not reject the request.
+        """
+        if exc.code not in REJECTED_FILTER_CODES:
+            raise exc
+        rejected = _rejected_params(exc.read() if exc.fp else b"", params)
+        if rejected:
+            supported = self._server_filters.get(endpoint, {})
+            self._server_filters[endpoint] = {
+                k: v for k, v in supported.items() if v not in rejected
+            }
+
+    def _clocked(self, response: bytes, *, endpoint: str, employee_id: int) -> Shift:
+        """Aux method to parse a clocked shift, and drop its cached month.
+
+        Overnight shifts are clocked out the day after they start,
+          maybe in the next month, so the month dropped is the one of
+          the shift, not the one of the clock.
+        """
+        from drifactorial.schemas import Shift
+
+        try:
+            shift = self._parse(Shift, response, endpoint=endpoint)
+        except Exception:
+            if self.cache is not None:
+                self.cache.invalidate(URL_SHIFTS, employee_id=employee_id)
+            raise
+        if self.cache is not None:
+            self.cache.invalidate(
+                URL_SHIFTS,
+                year=shift.year,
+                month=shift.month,
+                employee_id=shift.employee_id,
+            )
+        return shift
+
+
+class Factorial(_BaseFactorial):
     """Python client for Factorial API."""
 
-    def __init__(self, *, access_token: str):
-        """Instantiate client."""
+    def __init__(
+        self,
+        *,
+        access_token: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        server_filters: bool = True,
+        cache: Optional[ResponseCache] = None,
+        disk_cache: Optional[DiskCache] = None,
+        page_size: Optional[int] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+        rate_limiter: Optional[RateLimiter] = None,
+        hooks: Iterable[Hook] = (),
+        token_refresher: Optional[TokenRefresher] = None,
+        compression: bool = True,
+        coalesce: bool = False,
+    ):
+        """Instantiate client.
+
+        Args:
+            access_token: Access token for the API.
+            pool_size: Optional, maximum number of idle keep-alive
+              connections kept open.
+            idle_timeout: Optional, seconds after which an idle
+              connection is closed instead of reused.
+            server_filters: Optional, send supported filters to the
+              API as query parameters (True) or only filter the
+              responses locally (False).
+            cache: Optional, cache of responses of slow-changing
+              endpoints. Nothing is cached if None.
+            disk_cache: Optional, cache on disk of the employees and
+              holidays, shared between processes. Nothing is stored
+              if None.
+            page_size: Optional, number of items requested per page
+              from list endpoints. Lists are requested in a single
+              response if None.
+            prefetch: Optional, number of pages requested in the
+              background while the current page is consumed.
+            rate_limiter: Optional, rate limiter shared by all requests,
+              which also retries throttled and failed requests.
+              Requests are neither limited nor retried if None.
+            hooks: Optional, functions called with the metrics of each
+              request and parsed response. See `add_hook`.
+            token_refresher: Optional, credentials to refresh the access
+              token before it expires, or once a request is rejected
+              as unauthorized. The token is never refreshed if None.
+            compression: Optional, ask the API for compressed (gzip or
+              deflate) responses (True) or not (False).
+            coalesce: Optional, share a single request among identical
+              GET requests made at the same time (True), or make them
+              all (False). See `coalesced`.
+        """
+        if page_size is not None and page_size < 1:
+            raise ValueError("Page size must be at least 1.")
+        if prefetch < 0:
+            raise ValueError("Prefetch depth must not be negative.")
         self.access_token = access_token
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.rate_limiter = rate_limiter
+        self.token_refresher = token_refresher
+        self.compression = compression
+        self.coalesce = coalesce
+        # identical GET requests that did not reach the API
+        self.coalesced = 0
+        self._in_flight: Dict[CacheKey, Future] = {}
+        self._in_flight_lock = threading.Lock()
+        self._hooks: List[Hook] = list(hooks)
+        self._token_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._pool = ConnectionPool(maxsize=pool_size, idle_timeout=idle_timeout)
+        self._server_filters = {
+            endpoint: dict(filters) if server_filters else {}
+            for endpoint, filters in SERVER_FILTERS.items()
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def close(self) -> None:
+        """Close all pooled connections and background threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._pool.close()
+
+    def __enter__(self) -> "Factorial":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and close pooled connections."""
+        self.close()
 
     def _get(
         self, *, endpoint: str, params: Optional[Dict[str, str]] = None
@@ -85,16 +672,566 @@ class Factorial:
         Returns:
             Response of the GET request in JSON format.
         """
+        return json.loads(self._get_raw(endpoint=endpoint, params=params))
+
+    def _get_request(
+        self, *, endpoint: str, params: Optional[Dict[str, str]] = None
+    ) -> request.Request:
+        """Build a GET request.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+
+        Returns:
+            GET request.
+        """
         url = f"{URL_BASE}/{URL_API}/{endpoint}"
-        if params is not None:
+        if params:
             url = f"{url}?{parse.urlencode(params)}"
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {self.access_token}",
         }
-        request_url = request.Request(url, headers=headers)
-        response = request.urlopen(request_url)
-        return json.loads(response.read())
+        if self.compression:
+            headers["Accept-Encoding"] = ACCEPT_ENCODING
+        return request.Request(url, headers=headers)
+
+    def _open(self, *, endpoint: str, params: Optional[Dict[str, str]] = None) -> bytes:
+        """Send a GET request and read the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+
+        Returns:
+            Raw body of the GET response.
+        """
+        req = self._get_request(endpoint=endpoint, params=params)
+        return self._send(req, endpoint=endpoint)
+
+    def _send(self, req: request.Request, *, endpoint: str) -> bytes:
+        """Send a request and read the response, emitting its metrics.
+
+        Args:
+            req: Request to send.
+            endpoint: Endpoint of the request.
+
+        Returns:
+            Raw body of the response.
+        """
+        if not self._hooks:
+            return self._urlopen(req).read()
+        start = time.perf_counter()
+        try:
+            response = self._urlopen(req)
+        except error.HTTPError as e:
+            self._emit_request(req, endpoint=endpoint, start=start, status=e.code)
+            raise
+        body = response.read()
+        self._emit_request(
+            req, endpoint=endpoint, start=start, response=response, size=len(body)
+        )
+        return body
+
+    def _urlopen(self, req: request.Request) -> Any:
+        """Send a request with a valid access token.
+
+        If there is a token refresher, an expiring access token is
+          refreshed before sending the request, and a request rejected
+          as unauthorized is sent once more after refreshing it.
+          Concurrent callers share a single refresh.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Response of the request.
+
+        Raises:
+            HTTPError: If the response has an error status.
+        """
+        refresher = self.token_refresher
+        if refresher is None or not req.has_header("Authorization"):
+            return self._urlopen_limited(req)
+        if refresher.expired():
+            self._refresh_token(stale=self.access_token)
+        access_token = self._with_access_token(req)
+        try:
+            return self._urlopen_limited(req)
+        except error.HTTPError as e:
+            if e.code not in UNAUTHORIZED_CODES:
+                raise
+        self._refresh_token(stale=access_token)
+        self._with_access_token(req)
+        return self._urlopen_limited(req)
+
+    def _refresh_token(self, *, stale: str) -> None:
+        """Refresh the access token, unless it was already refreshed.
+
+        Args:
+            stale: Access token found to be expired.
+        """
+        with self._token_lock:
+            # another caller refreshed the token while we waited
+            if self.access_token != stale:
+                return
+            refresher = self.token_refresher
+            self.refresh_access_token(
+                client_id=refresher.client_id,
+                client_secret=refresher.client_secret,
+                refresh_token=refresher.refresh_token,
+            )
+            refresher.refreshes += 1
+
+    def _urlopen_limited(self, req: request.Request) -> Any:
+        """Send a request through the rate limiter, if any.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Response of the request.
+
+        Raises:
+            HTTPError: If the response has an error status, and the
+              rate limiter does not retry it (any more).
+        """
+        limiter = self.rate_limiter
+        if limiter is None:
+            return self._pool.urlopen(req)
+        attempt = 0
+        while True:
+            time.sleep(limiter.acquire())
+            try:
+                response = self._pool.urlopen(req)
+            except error.HTTPError as e:
+                headers: Any = e.headers or {}
+                delay = limiter.retry_delay(
+                    status=e.code,
+                    method=req.get_method(),
+                    retry_after=headers.get("Retry-After"),
+                    attempt=attempt,
+                )
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+            else:
+                limiter.on_success()
+                return response
+
+    def _get_raw(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+    ) -> bytes:
+        """Generic GET method, without decoding the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+
+        Returns:
+            Raw body of the GET response.
+        """
+        body, _ = self._get_body(endpoint=endpoint, params=params, ttl=ttl, schema=None)
+        return body
+
+    def _get_list(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+        schema: Any,
+    ) -> List[Any]:
+        """Generic GET method for lists, parsing the response.
+
+        Paginated responses are parsed page by page as they arrive,
+          and not parsed again once joined.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+            schema: Schema of the items.
+
+        Returns:
+            Parsed items of the JSON array in the response.
+        """
+        body, items = self._get_body(
+            endpoint=endpoint, params=params, ttl=ttl, schema=schema
+        )
+        if items is None:
+            items = self._parse(List[schema], body, endpoint=endpoint)
+        return items
+
+    def _get_body(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]],
+        ttl: Optional[float],
+        schema: Any,
+    ) -> Tuple[bytes, Optional[List[Any]]]:
+        """Aux method to get a response, cached or shared if possible.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Request parameters.
+            ttl: Seconds the response is cached, instead of the TTL of
+              the endpoint.
+            schema: Schema of the items, or None to only get the raw
+              body.
+
+        Returns:
+            Raw body of the response, and its parsed items if it was
+              requested page by page by this call. The body is empty if
+              only the items are needed, i.e. if it is neither cached
+              nor shared.
+        """
+        key = cache_key(endpoint, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, None
+        get = partial(
+            self._get_uncached,
+            key,
+            endpoint=endpoint,
+            params=params,
+            ttl=ttl,
+            schema=schema,
+        )
+        if not self.coalesce:
+            return get()
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), None
+        try:
+            body, items = get()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(body)
+            return body, items
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    def _get_uncached(
+        self,
+        key: CacheKey,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]],
+        ttl: Optional[float],
+        schema: Any,
+    ) -> Tuple[bytes, Optional[List[Any]]]:
+        """Aux method to request a response, and cache it."""
+        items = None
+        if self._paginated(endpoint):
+            raw = schema is None or self.cache is not None or self.coalesce
+            bodies = []
+            items = []
+            pages = self._get_pages(
+                endpoint=endpoint, params=params, schema=schema or Any
+            )
+            for page, page_items in pages:
+                if raw:
+                    bodies.append(page)
+                items.extend(page_items)
+            # pages are only joined to cache or share them
+            body = join_json_arrays(bodies) if raw else b""
+            if schema is None:
+                items = None
+        else:
+            body = self._open(endpoint=endpoint, params=params)
+        if self.cache is not None:
+            self.cache.set(key, body, ttl=ttl)
+        return body, items
+
+    def _get_items(
+        self, *, endpoint: str, params: Optional[Dict[str, str]] = None, schema: Any
+    ) -> Iterator[Any]:
+        """Generic GET method, parsing the items of the response one by one.
+
+        The request is sent right away, but the response is read and
+          parsed as items are consumed. Cached responses are used, but
+          streamed responses are not cached.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            schema: Schema of the items.
+
+        Returns:
+            Iterator over the parsed items of the JSON array in the
+              response.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(cache_key(endpoint, params))
+            if cached is not None:
+                read = io.BytesIO(cached).read
+                return self._iter_items([read], schema=schema, endpoint=endpoint)
+        if self._paginated(endpoint):
+            pages = self._get_pages(endpoint=endpoint, params=params, schema=schema)
+            # fetch the first page now, so that request errors raise here
+            first = list(itertools.islice(pages, 1))
+            return (x for _, items in itertools.chain(first, pages) for x in items)
+        req = self._get_request(endpoint=endpoint, params=params)
+        start = time.perf_counter()
+        try:
+            response = self._urlopen(req)
+        except error.HTTPError as e:
+            if self._hooks:
+                self._emit_request(req, endpoint=endpoint, start=start, status=e.code)
+            raise
+        return self._iter_response(
+            response, req=req, start=start, schema=schema, endpoint=endpoint
+        )
+
+    def _iter_response(
+        self,
+        response: Any,
+        *,
+        req: request.Request,
+        start: float,
+        schema: Any,
+        endpoint: str,
+    ) -> Generator[Any, None, None]:
+        """Aux method to parse the items of a response as it is read."""
+        read = _MeteredReader(response.read)
+        try:
+            yield from self._iter_items([read], schema=schema, endpoint=endpoint)
+        finally:
+            response.close()
+            if self._hooks:
+                self._emit_request(
+                    req,
+                    endpoint=endpoint,
+                    start=start,
+                    response=response,
+                    size=read.size,
+                )
+
+    def _iter_items(
+        self,
+        reads: Iterable[Callable[[int], bytes]],
+        *,
+        schema: Any,
+        endpoint: str,
+    ) -> Generator[Any, None, None]:
+        """Aux method to parse the items of JSON arrays one by one.
+
+        Args:
+            reads: Functions reading each JSON array.
+            schema: Schema of the items.
+            endpoint: Endpoint of the arrays.
+
+        Yields:
+            Parsed items.
+        """
+        adapter = _adapter(schema)
+        if not self._hooks:
+            for read in reads:
+                for item in iter_json_array(read):
+                    yield adapter.validate_python(item)
+            return
+        decode_time = validation_time = 0.0
+        items = 0
+        try:
+            for read in reads:
+                decoded = iter_json_array(read)
+                while True:
+                    start = time.perf_counter()
+                    item = next(decoded, _END)
+                    decoded_at = time.perf_counter()
+                    decode_time += decoded_at - start
+                    if item is _END:
+                        break
+                    parsed = adapter.validate_python(item)
+                    validation_time += time.perf_counter() - decoded_at
+                    items += 1
+                    yield parsed
+                # time waiting for the network is not decoding
+                decode_time -= getattr(read, "elapsed", 0.0)
+        finally:
+            self._emit(
+                ParseEvent(
+                    endpoint=endpoint_name(endpoint),
+                    decode_time=decode_time,
+                    validation_time=validation_time,
+                    items=items,
+                )
+            )
+
+    def _paginated(self, endpoint: str) -> bool:
+        """Check whether an endpoint is requested page by page."""
+        return self.page_size is not None and endpoint in PAGINATED_ENDPOINTS
+
+    def _get_pages(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        schema: Any,
+    ) -> Generator[Tuple[bytes, List[Any]], None, None]:
+        """Generic GET method for paginated endpoints.
+
+        Pages are requested until the API returns one with less than
+          `page_size` items, counted as each page is parsed. Once the
+          first page comes back full, while a page is consumed the next
+          `prefetch` pages are already requested in background threads.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            schema: Schema of the items.
+
+        Yields:
+            Raw body of each page, in order, and its parsed items.
+        """
+        parse = partial(self._parse_page, schema=schema, endpoint=endpoint)
+
+        def get_page(page: int) -> bytes:
+            page_params = {
+                **(params or {}),
+                PAGE_PARAM: f"{page}",
+                LIMIT_PARAM: f"{self.page_size}",
+            }
+            return self._open(endpoint=endpoint, params=page_params)
+
+        previous = None
+        if self.prefetch == 0:
+            for page in itertools.count(1):
+                body = get_page(page)
+                items = parse(body, previous=previous)
+                if items:
+                    yield body, items
+                if len(items) < self.page_size:  # type: ignore
+                    return
+                previous = body
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.prefetch, thread_name_prefix="drifactorial"
+            )
+        pending: Deque[Future] = deque()
+        pages = itertools.count(1)
+        try:
+            while True:
+                if not pending:
+                    pending.append(self._executor.submit(get_page, next(pages)))
+                body = pending.popleft().result()
+                items = parse(body, previous=previous)
+                if len(items) < self.page_size:  # type: ignore
+                    if items:
+                        yield body, items
+                    return
+                previous = body
+                # the page is full: read ahead while it is consumed
+                while len(pending) < self.prefetch:
+                    pending.append(self._executor.submit(get_page, next(pages)))
+                yield body, items
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _get_filtered(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+        schema: Any,
+        **filters: Any,
+    ) -> List[Any]:
+        """GET method for lists, sending the supported filters to the API.
+
+        Filters not supported by the endpoint are left out. If the API
+          rejects the filters, the request is sent again without them,
+          so callers must always filter the response themselves too.
+          Filters the error names as not supported are disabled for the
+          endpoint.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+            schema: Schema of the items.
+            filters: Value of each filter.
+
+        Returns:
+            Parsed items of the JSON array in the response.
+        """
+        return self._with_server_filters(
+            partial(self._get_list, ttl=ttl, schema=schema),
+            endpoint=endpoint,
+            params=params,
+            filters=filters,
+        )
+
+    def _get_items_filtered(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        schema: Any,
+        **filters: Any,
+    ) -> Iterator[Any]:
+        """Same as `_get_filtered`, parsing items one by one.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            schema: Schema of the items.
+            filters: Value of each filter.
+
+        Returns:
+            Iterator over the parsed items of the JSON array in the
+              response.
+        """
+        return self._with_server_filters(
+            partial(self._get_items, schema=schema),
+            endpoint=endpoint,
+            params=params,
+            filters=filters,
+        )
+
+    def _with_server_filters(
+        self,
+        get: Callable[..., _T],
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]],
+        filters: Dict[str, Any],
+    ) -> _T:
+        """Aux method to call a GET method with the supported filters."""
+        supported = self._server_filters.get(endpoint, {})
+        server_params = _server_params(supported, **filters)
+        if server_params:
+            try:
+                return get(
+                    endpoint=endpoint, params={**(params or {}), **server_params}
+                )
+            except error.HTTPError as exc:
+                self._reject_filters(exc, endpoint=endpoint, params=server_params)
+        return get(endpoint=endpoint, params=params)
 
     def _post(self, *, endpoint: str, payload: Dict[str, str]) -> Dict[str, Any]:
         """Generic POST method.
@@ -106,6 +1243,18 @@ class Factorial:
         Returns:
             Response of the POST request in JSON format.
         """
+        return json.loads(self._post_raw(endpoint=endpoint, payload=payload))
+
+    def _post_raw(self, *, endpoint: str, payload: Dict[str, str]) -> bytes:
+        """Generic POST method, without decoding the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            payload: Data to post during request.
+
+        Returns:
+            Raw body of the POST response.
+        """
         url = f"{URL_BASE}/{URL_API}/{endpoint}"
         headers = {
             "Accept": "application/json",
@@ -114,8 +1263,7 @@ class Factorial:
         }
         data = json.dumps(payload).encode("utf-8")
         request_url = request.Request(url, data=data, headers=headers)
-        response = request.urlopen(request_url)
-        return json.loads(response.read())
+        return self._send(request_url, endpoint=endpoint)
 
     def get_holidays(
         self, *, start: Optional[date] = None, end: Optional[date] = None
@@ -129,23 +1277,98 @@ class Factorial:
         Returns:
             List of Holiday objects.
         """
-        response = self._get(endpoint=URL_HOLIDAYS)
-        parsed = [TypeAdapter(Holiday).validate_python(x) for x in response]
+        from drifactorial.schemas import Holiday
+
+        start = None if start is None else _parse_date(start)
+        end = None if end is None else _parse_date(end)
+        if self.disk_cache is None:
+            parsed = self._get_filtered(
+                endpoint=URL_HOLIDAYS, schema=Holiday, start=start, end=end
+            )
+        else:
+            # all holidays are stored, and filtered once loaded
+            parsed = self.disk_cache.get(URL_HOLIDAYS, List[Holiday])
+            if parsed is None:
+                parsed = self._get_list(endpoint=URL_HOLIDAYS, schema=Holiday)
+                self.disk_cache.set(URL_HOLIDAYS, List[Holiday], parsed)
         if start is not None:
-            parsed = [x for x in parsed if x.date >= _parse_date(start)]
+            parsed = [x for x in parsed if x.date >= start]
         if end is not None:
-            parsed = [x for x in parsed if x.date <= _parse_date(end)]
+            parsed = [x for x in parsed if x.date <= end]
         return parsed
 
     def get_employees(self) -> List[Employee]:
         """Get employees information."""
-        response = self._get(endpoint=URL_EMPLOYEES)
-        return [TypeAdapter(Employee).validate_python(x) for x in response]
+        from drifactorial.schemas import Employee
+
+        if self.disk_cache is not None:
+            cached = self.disk_cache.get(URL_EMPLOYEES, List[Employee])
+            if cached is not None:
+                return cached
+        parsed = self._get_list(endpoint=URL_EMPLOYEES, schema=Employee)
+        if self.disk_cache is not None:
+            self.disk_cache.set(URL_EMPLOYEES, List[Employee], parsed)
+        return parsed
+
+    def iter_employees(self) -> Generator[Employee, None, None]:
+        """Iterate over employees information.
+
+        Same as `get_employees`, but the response is parsed as it is
+          read and employees are yielded one at a time.
+
+        Yields:
+            Employee objects.
+        """
+        from drifactorial.schemas import Employee
+
+        yield from self._get_items(endpoint=URL_EMPLOYEES, schema=Employee)
 
     def get_single_employee(self, *, employee_id: int) -> Employee:
         """Get single employee information."""
-        response = self._get(endpoint=f"{URL_EMPLOYEES}/{employee_id}")
-        return TypeAdapter(Employee).validate_python(response)
+        from drifactorial.schemas import Employee
+
+        endpoint = f"{URL_EMPLOYEES}/{employee_id}"
+        response = self._get_raw(endpoint=endpoint)
+        return self._parse(Employee, response, endpoint=endpoint)
+
+    def get_employees_by_ids(
+        self,
+        *,
+        employee_ids: Iterable[int],
+        max_concurrency: Optional[int] = None,
+    ) -> Dict[int, Union[Employee, Exception]]:
+        """Get information of many single employees concurrently.
+
+        Repeated ids are only requested once. A failed request does
+          not cancel the others: its exception is returned in place
+          of the employee.
+
+        Args:
+            employee_ids: Employee ids.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+
+        Returns:
+            Employee, or exception raised while getting it, by
+              employee id, in the order of `employee_ids`.
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        ids = list(dict.fromkeys(employee_ids))
+        if not ids:
+            return {}
+        workers = min(max_concurrency or self._pool.maxsize, len(ids))
+
+        def get_employee(employee_id: int) -> Union[Employee, Exception]:
+            try:
+                return self.get_single_employee(employee_id=employee_id)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="drifactorial"
+        ) as executor:
+            return dict(zip(ids, executor.map(get_employee, ids)))
 
     def get_shifts(
         self,
@@ -168,15 +1391,153 @@ class Factorial:
         Returns:
             List of Shift objects.
         """
+        return self._get_shifts(year=year, month=month, employee_id=employee_id)
+
+    def _get_shifts(
+        self,
+        *,
+        year: Optional[int],
+        month: Optional[int],
+        employee_id: Optional[int],
+        ttl: Optional[float] = None,
+    ) -> List[Shift]:
+        """Aux method to get shifts, caching the response for `ttl` seconds."""
+        from drifactorial.schemas import Shift
+
         params = {}
         if year is not None and month is not None:
             params = {"year": f"{year}", "month": f"{month}"}
-        response = self._get(endpoint=URL_SHIFTS, params=params)
-        parsed = [TypeAdapter(Shift).validate_python(x) for x in response]
+        parsed = self._get_filtered(
+            endpoint=URL_SHIFTS,
+            params=params,
+            ttl=ttl,
+            schema=Shift,
+            employee_id=employee_id,
+        )
         if employee_id is not None:
             parsed = [x for x in parsed if x.employee_id == employee_id]
         return parsed
 
+    def iter_shifts(
+        self,
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> Generator[Shift, None, None]:
+        """Iterate over shifts information.
+
+        Same as `get_shifts`, but the response is parsed as it is read
+          and shifts are yielded one at a time.
+
+        Args:
+            year: Optional, year to filter.
+            month: Optional, month to filter.
+            employee_id: Optional, filter on employee id.
+
+        Yields:
+            Shift objects.
+        """
+        from drifactorial.schemas import Shift
+
+        params = {}
+        if year is not None and month is not None:
+            params = {"year": f"{year}", "month": f"{month}"}
+        shifts = self._get_items_filtered(
+            endpoint=URL_SHIFTS, params=params, schema=Shift, employee_id=employee_id
+        )
+        for shift in shifts:
+            if employee_id is None or shift.employee_id == employee_id:
+                yield shift
+
+    def get_shifts_range(
+        self,
+        *,
+        start: date,
+        end: date,
+        employee_id: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        cache_past: bool = False,
+    ) -> List[Shift]:
+        """Get shifts information over a range of dates.
+
+        Shifts are requested month by month, concurrently, and merged
+          in order of month. Within a month, shifts keep the order of
+          the API.
+
+        Args:
+            start: Start date of the range (included).
+            end: End date of the range (included).
+            employee_id: Optional, filter on employee id.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+            cache_past: Optional, keep the shifts of months that are
+              fully in the past in the response cache for
+              `PAST_MONTHS_TTL` seconds, and reuse them in later calls
+              instead of requesting them again (True), or always
+              request all months (False). If the client has no cache,
+              a cache of past months only is created.
+
+        Returns:
+            List of Shift objects.
+        """
+        start = _parse_date(start)
+        end = _parse_date(end)
+        if end < start:
+            raise ValueError("End date must not be before start date.")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        months = _months(start, end)
+        today = date.today()
+        if cache_past and self.cache is None:
+            with self._cache_lock:
+                if self.cache is None:
+                    self.cache = ResponseCache(ttl={})
+
+        def get_month(year_month: Tuple[int, int]) -> List[Shift]:
+            year, month = year_month
+            past = cache_past and (year, month) < (today.year, today.month)
+            return self._get_shifts(
+                year=year,
+                month=month,
+                employee_id=employee_id,
+                ttl=PAST_MONTHS_TTL if past else None,
+            )
+
+        workers = min(max_concurrency or self._pool.maxsize, len(months))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="drifactorial"
+        ) as executor:
+            return _shifts_between(
+                executor.map(get_month, months), start=start, end=end
+            )
+
+    def get_shift_columns(
+        self,
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> ShiftColumns:
+        """Get shifts information, in a compact columnar container.
+
+        Same as `get_shifts`, but shifts are stored in typed arrays
+          as they are parsed, instead of kept as schema objects.
+
+        Args:
+            year: Optional, year to filter.
+            month: Optional, month to filter.
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            Columnar container of shifts.
+        """
+        from drifactorial.columnar import ShiftColumns
+
+        return ShiftColumns(
+            self.iter_shifts(year=year, month=month, employee_id=employee_id)
+        )
+
     def get_leaves(
         self,
         *,
@@ -194,16 +1555,91 @@ class Factorial:
         Returns:
             List of Leaves objects.
         """
-        response = self._get(endpoint=URL_LEAVES)
-        parsed = [TypeAdapter(Leave).validate_python(x) for x in response]
+        from drifactorial.schemas import Leave
+
+        start = None if start is None else _parse_date(start)
+        end = None if end is None else _parse_date(end)
+        parsed = self._get_filtered(
+            endpoint=URL_LEAVES,
+            schema=Leave,
+            start=start,
+            end=end,
+            employee_id=employee_id,
+        )
         if start is not None:
-            parsed = [x for x in parsed if x.finish_on >= _parse_date(start)]
+            parsed = [x for x in parsed if x.finish_on >= start]
         if end is not None:
-            parsed = [x for x in parsed if x.start_on <= _parse_date(end)]
+            parsed = [x for x in parsed if x.start_on <= end]
         if employee_id is not None:
             parsed = [x for x in parsed if x.employee_id == employee_id]
         return parsed
 
+    def iter_leaves(
+        self,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        employee_id: Optional[int] = None,
+    ) -> Generator[Leave, None, None]:
+        """Iterate over leaves information.
+
+        Same as `get_leaves`, but the response is parsed as it is read
+          and leaves are yielded one at a time.
+
+        Args:
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            employee_id: Optional, filter on employee id.
+
+        Yields:
+            Leave objects.
+        """
+        from drifactorial.schemas import Leave
+
+        start = None if start is None else _parse_date(start)
+        end = None if end is None else _parse_date(end)
+        leaves = self._get_items_filtered(
+            endpoint=URL_LEAVES,
+            schema=Leave,
+            start=start,
+            end=end,
+            employee_id=employee_id,
+        )
+        for leave in leaves:
+            if start is not None and leave.finish_on < start:
+                continue
+            if end is not None and leave.start_on > end:
+                continue
+            if employee_id is not None and leave.employee_id != employee_id:
+                continue
+            yield leave
+
+    def get_leave_columns(
+        self,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        employee_id: Optional[int] = None,
+    ) -> LeaveColumns:
+        """Get leaves information, in a compact columnar container.
+
+        Same as `get_leaves`, but leaves are stored in typed arrays
+          as they are parsed, instead of kept as schema objects.
+
+        Args:
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            Columnar container of leaves.
+        """
+        from drifactorial.columnar import LeaveColumns
+
+        return LeaveColumns(
+            self.iter_leaves(start=start, end=end, employee_id=employee_id)
+        )
+
     def get_daysoff(
         self,
         *,
@@ -211,7 +1647,8 @@ class Factorial:
         start: Optional[date] = None,
         end: Optional[date] = None,
         include_weekend: bool = False,
-    ) -> Tuple[List[date], List[date], List[date]]:
+        compact: bool = False,
+    ) -> DaysOff:
         """Get days off (holidays and leaves) for a single employee.
 
         Redefines date filter with employee start and termination date.
@@ -225,86 +1662,260 @@ class Factorial:
             end: Optional, end date of filter (included).
             include_weekend: Optional, include weekend days (True) or
               not (False).
+            compact: Optional, return sorted and merged date intervals
+              (True) or single days (False).
 
         Returns:
-            List of full days off.
-            List of morning days off.
-            List of afternoon days off.
+            Full days off.
+            Morning days off.
+            Afternoon days off.
         """
-        # get employee information
         employee = self.get_single_employee(employee_id=employee_id)
+        aux_start, aux_end = _employment_window(employee, start=start, end=end)
+        holidays = self.get_holidays(start=aux_start, end=aux_end)
+        leaves = self.get_leaves(start=aux_start, end=aux_end, employee_id=employee_id)
+        return _collect_daysoff(
+            employee,
+            holidays=holidays,
+            leaves=leaves,
+            start=aux_start,
+            end=aux_end,
+            include_weekend=include_weekend,
+            compact=compact,
+        )
 
-        # find valid start
-        if employee.start_date is None:
-            aux_start = date.today()
-        else:
-            aux_start = employee.start_date
-        if start is not None:
-            aux_start = max(aux_start, _parse_date(start))
-
-        # find valid end
-        if employee.terminated_on is None:
-            aux_end = date.today() + timedelta(days=365 * 10)
-        else:
-            aux_end = employee.terminated_on
-        if end is not None:
-            aux_end = min(aux_end, _parse_date(end))
-
-        # get holidays for this employee
-        holidays = [
-            x
-            for x in self.get_holidays(start=aux_start, end=aux_end)
-            if x.id in employee.company_holiday_ids
-        ]
+    def get_daysoff_bulk(
+        self,
+        *,
+        employee_ids: Optional[Iterable[int]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        include_weekend: bool = False,
+        compact: bool = False,
+    ) -> Dict[int, DaysOff]:
+        """Get days off (holidays and leaves) for many employees.
 
-        # get leaves for this employee
-        leaves = [
-            x
-            for x in self.get_leaves(
-                start=aux_start, end=aux_end, employee_id=employee_id
-            )
-            if x.approved
-        ]
+        Same as `get_daysoff`, but employees, holidays and leaves are
+          fetched once for all employees instead of once per employee.
 
-        # extract holidays: full days, mornings, afternoons
-        days_full = [x.date for x in holidays if x.half_day is None]
-        days_am = [x.date for x in holidays if x.half_day == HALF_DAY_AM]
-        days_pm = [x.date for x in holidays if x.half_day == HALF_DAY_PM]
-
-        # extract leaves
-        days_full = days_full[:] + [
-            y
-            for x in leaves
-            for y in daterange(max(x.start_on, aux_start), min(x.finish_on, aux_end))
-            if x.half_day is None
-        ]
-        days_am = days_am[:] + [x.start_on for x in leaves if x.half_day == HALF_DAY_AM]
-        days_pm = days_pm[:] + [x.start_on for x in leaves if x.half_day == HALF_DAY_PM]
+        Args:
+            employee_ids: Optional, employee ids. All employees if None.
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            include_weekend: Optional, include weekend days (True) or
+              not (False).
+            compact: Optional, return sorted and merged date intervals
+              (True) or single days (False).
 
-        # remove weekends
-        if not include_weekend:
-            days_full = [x for x in days_full if x.weekday() < 5]
-            days_am = [x for x in days_am if x.weekday() < 5]
-            days_pm = [x for x in days_pm if x.weekday() < 5]
+        Returns:
+            Full, morning and afternoon days off by employee id.
 
-        return sorted(days_full), sorted(days_am), sorted(days_pm)
+        Raises:
+            ValueError: If some employee id does not exist.
+        """
+        employees = _select_employees(self.get_employees(), employee_ids)
+        if not employees:
+            return {}
+        windows = {x.id: _employment_window(x, start=start, end=end) for x in employees}
+        min_start = min(x for x, _ in windows.values())
+        max_end = max(x for _, x in windows.values())
+        return _collect_daysoff_bulk(
+            employees,
+            windows=windows,
+            holidays=self.get_holidays(start=min_start, end=max_end),
+            leaves=self.get_leaves(start=min_start, end=max_end),
+            include_weekend=include_weekend,
+            compact=compact,
+        )
 
     def get_account(self) -> Account:
         """Get account information."""
-        response = self._get(endpoint=URL_ACCOUNT)
-        return TypeAdapter(Account).validate_python(response)
+        from drifactorial.schemas import Account
+
+        response = self._get_raw(endpoint=URL_ACCOUNT)
+        return self._parse(Account, response, endpoint=URL_ACCOUNT)
 
     def clock_in(self, *, now: datetime, employee_id: int) -> Shift:
         """Post clock-in time."""
         payload = {"now": f"{now.isoformat()}", "employee_id": f"{employee_id}"}
-        response = self._post(endpoint=f"{URL_SHIFTS}/{URL_CLOCK_IN}", payload=payload)
-        return TypeAdapter(Shift).validate_python(response)
+        endpoint = f"{URL_SHIFTS}/{URL_CLOCK_IN}"
+        response = self._post_raw(endpoint=endpoint, payload=payload)
+        return self._clocked(response, endpoint=endpoint, employee_id=employee_id)
 
     def clock_out(self, *, now: datetime, employee_id: int) -> Shift:
         """Post clock-out time."""
         payload = {"now": f"{now.isoformat()}", "employee_id": f"{employee_id}"}
-        response = self._post(endpoint=f"{URL_SHIFTS}/{URL_CLOCK_OUT}", payload=payload)
-        return TypeAdapter(Shift).validate_python(response)
+        endpoint = f"{URL_SHIFTS}/{URL_CLOCK_OUT}"
+        response = self._post_raw(endpoint=endpoint, payload=payload)
+        return self._clocked(response, endpoint=endpoint, employee_id=employee_id)
+
+    def clock_in_many(
+        self,
+        *,
+        entries: Iterable[Tuple[int, datetime]],
+        max_concurrency: Optional[int] = None,
+        queue: Optional[ClockQueue] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-in times concurrently.
+
+        See `_send_clocks`.
+
+        Args:
+            entries: Employee id and clock-in time of each clock-in.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+            queue: Optional, durable queue where clock-ins are stored
+              until the API accepts or rejects them.
+
+        Returns:
+            Shift, or exception raised while posting it, of each entry,
+              in the order of `entries`.
+        """
+        clocks = [(URL_CLOCK_IN, x, now) for x, now in entries]
+        return self._send_clocks(
+            clocks, max_concurrency=max_concurrency, queue=queue, enqueue=True
+        )
+
+    def clock_out_many(
+        self,
+        *,
+        entries: Iterable[Tuple[int, datetime]],
+        max_concurrency: Optional[int] = None,
+        queue: Optional[ClockQueue] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-out times concurrently.
+
+        See `_send_clocks`.
+
+        Args:
+            entries: Employee id and clock-out time of each clock-out.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+            queue: Optional, durable queue where clock-outs are stored
+              until the API accepts or rejects them.
+
+        Returns:
+            Shift, or exception raised while posting it, of each entry,
+              in the order of `entries`.
+        """
+        clocks = [(URL_CLOCK_OUT, x, now) for x, now in entries]
+        return self._send_clocks(
+            clocks, max_concurrency=max_concurrency, queue=queue, enqueue=True
+        )
+
+    def replay_clocks(
+        self, *, queue: ClockQueue, max_concurrency: Optional[int] = None
+    ) -> Dict[int, Union[Shift, Exception]]:
+        """Post again the clock-ins and clock-outs left in a queue.
+
+        Args:
+            queue: Durable queue of clock-ins and clock-outs.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+
+        Returns:
+            Shift, or exception raised while posting it, by id of the
+              queued clock, in the order they were queued.
+        """
+        pending = queue.pending()
+        results = self._send_clocks(
+            [(x.action, x.employee_id, x.now) for x in pending],
+            ids=[x.id for x in pending],
+            max_concurrency=max_concurrency,
+            queue=queue,
+        )
+        return dict(zip((x.id for x in pending), results))
+
+    def _send_clocks(
+        self,
+        clocks: List[_Clock],
+        *,
+        max_concurrency: Optional[int],
+        queue: Optional[ClockQueue],
+        enqueue: bool = False,
+        ids: Optional[List[int]] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-ins and clock-outs concurrently.
+
+        Clocks of the same employee are posted one after the other, in
+          order; clocks of different employees, concurrently, within
+          the limits of the rate limiter, if any. A failed request does
+          not cancel the others: its exception is returned in place of
+          the shift.
+
+        With a queue, clocks are stored before posting them, and only
+          removed once accepted or rejected by the API. Clocks that
+          failed with a transient error (not sent, throttled or
+          refused by an unavailable server) stay in the queue, to be
+          posted again with `replay_clocks`. Clocks that may have
+          reached the API anyway (e.g. timeouts waiting for the
+          response, or server errors) stay in the queue in an unknown
+          state, and are not replayed until resolved with
+          `ClockQueue.resolve`.
+
+        Clocks of an employee are never posted out of order: after a
+          transient or unknown error, the next clocks of the employee
+          are not posted, and neither are new clocks of employees with
+          clocks already in the queue, nor replayed clocks of
+          employees with clocks of unknown outcome. They get a
+          `PendingClockError`, and wait in the queue (if any).
+
+        Args:
+            clocks: Action, employee id and time of each clock.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+            queue: Optional, durable queue of the clocks.
+            enqueue: Optional, add the clocks to the queue (True) or
+              they are already queued with `ids` (False).
+            ids: Optional, ids of the clocks in the queue.
+
+        Returns:
+            Shift, or exception raised while posting it, of each clock.
+        """
+        from drifactorial.outbox import PendingClockError, is_transient, is_unknown
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        held: Set[int] = set()
+        if queue is not None and enqueue:
+            held = queue.employees()
+            ids = queue.put_many(clocks)
+        elif queue is not None:
+            # replayed clocks wait for the unknown clocks of their employee
+            held = {x.employee_id for x in queue.unknown()}
+        by_employee: Dict[int, List[int]] = defaultdict(list)
+        for n, (_, employee_id, _) in enumerate(clocks):
+            by_employee[employee_id].append(n)
+        results: List[Union[Shift, Exception]] = [None] * len(clocks)  # type: ignore
+        for employee_id in held.intersection(by_employee):
+            for n in by_employee.pop(employee_id):
+                results[n] = PendingClockError(employee_id)
+        if not by_employee:
+            return results
+        post = {URL_CLOCK_IN: self.clock_in, URL_CLOCK_OUT: self.clock_out}
+
+        def post_clocks(indexes: List[int]) -> None:
+            for k, n in enumerate(indexes):
+                action, employee_id, now = clocks[n]
+                exc: Optional[Exception] = None
+                try:
+                    results[n] = post[action](now=now, employee_id=employee_id)
+                except Exception as e:
+                    results[n] = exc = e
+                if queue is not None:
+                    queue.settle(ids[n], exc=exc)
+                if exc is not None and (is_transient(exc) or is_unknown(exc)):
+                    # the next clocks would reach the API before this one
+                    for m in indexes[k + 1 :]:
+                        results[m] = PendingClockError(employee_id)
+                    return
+
+        workers = min(max_concurrency or self._pool.maxsize, len(by_employee))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="drifactorial"
+        ) as executor:
+            list(executor.map(post_clocks, by_employee.values()))
+        return results
 
     @staticmethod
     def obtain_authorization_link(
@@ -337,11 +1948,14 @@ class Factorial:
         print(f"{str_text}\n{str_auth_url}")
 
     @staticmethod
-    def _post_token(*, data: Dict[str, str]) -> Dict[str, Any]:
+    def _post_token(
+        *, data: Dict[str, str], send: Callable[..., bytes]
+    ) -> Dict[str, Any]:
         """Request access token.
 
         Args:
             data: Settings and credentials needed to obtain the token.
+            send: Function sending the request through the client pool.
 
         Returns:
             Response of the POST request.
@@ -352,8 +1966,8 @@ class Factorial:
         url = f"{URL_BASE}/{URL_OAUTH}/{URL_TOKEN}"
         data_parsed = parse.urlencode(data).encode()
         request_url = request.Request(url, data=data_parsed)
-        response = request.urlopen(request_url)
-        return json.loads(response.read())
+        response = send(request_url, endpoint=f"{URL_OAUTH}/{URL_TOKEN}")
+        return json.loads(response)
 
     def obtain_access_token(
         self,
@@ -364,6 +1978,8 @@ class Factorial:
         authorization_key: str,
     ) -> Token:
         """Obtain access token from authorization key."""
+        from drifactorial.schemas import Token
+
         data = {
             "client_id": client_id,
             "client_secret": client_secret,
@@ -371,22 +1987,28 @@ class Factorial:
             "code": authorization_key,
             "grant_type": "authorization_code",
         }
-        response = self._post_token(data=data)
-        token = TypeAdapter(Token).validate_python(response)
+        response = self._post_token(data=data, send=self._send)
+        token = _adapter(Token).validate_python(response)
         self.access_token = token.access_token
+        if self.token_refresher is not None:
+            self.token_refresher.update(token)
         return token
 
     def refresh_access_token(
         self, *, client_id: str, client_secret: str, refresh_token: str
     ) -> Token:
         """Refresh access token when expired."""
+        from drifactorial.schemas import Token
+
         data = {
             "client_id": client_id,
             "client_secret": client_secret,
             "refresh_token": refresh_token,
             "grant_type": "refresh_token",
         }
-        response = self._post_token(data=data)
-        token = TypeAdapter(Token).validate_python(response)
+        response = self._post_token(data=data, send=self._send)
+        token = _adapter(Token).validate_python(response)
         self.access_token = token.access_token
+        if self.token_refresher is not None:
+            self.token_refresher.update(token)
         return token
@@ -0,0 +1,1160 @@
+"""Asyncio client for the Factorial API.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from urllib import error, parse, request
+
+from drifactorial import (
+    DEFAULT_PREFETCH,
+    LIMIT_PARAM,
+    PAGE_PARAM,
+    PAGINATED_ENDPOINTS,
+    SERVER_FILTERS,
+    URL_ACCOUNT,
+    URL_API,
+    URL_BASE,
+    URL_CLOCK_IN,
+    URL_CLOCK_OUT,
+    URL_EMPLOYEES,
+    URL_HOLIDAYS,
+    URL_LEAVES,
+    URL_OAUTH,
+    URL_SHIFTS,
+    URL_TOKEN,
+    Factorial,
+    _adapter,
+    _BaseFactorial,
+    _Clock,
+    _collect_daysoff,
+    _collect_daysoff_bulk,
+    _employment_window,
+    _months,
+    _parse_date,
+    _select_employees,
+    _server_params,
+    _shifts_between,
+)
+from drifactorial.auth import UNAUTHORIZED_CODES, TokenRefresher
+from drifactorial.cache import PAST_MONTHS_TTL, CacheKey, ResponseCache, cache_key
+from drifactorial.intervals import DaysOff
+from drifactorial.metrics import Hook
+from drifactorial.ratelimit import RateLimiter
+from drifactorial.stream import join_json_arrays
+from drifactorial.transport import (
+    ACCEPT_ENCODING,
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    AsyncConnectionPool,
+    AsyncResponse,
+)
+
+if TYPE_CHECKING:
+    from drifactorial.columnar import LeaveColumns, ShiftColumns
+    from drifactorial.diskcache import DiskCache
+    from drifactorial.outbox import ClockQueue
+    from drifactorial.schemas import Account, Employee, Holiday, Leave, Shift, Token
+
+# raw body of a response, and its parsed items if requested page by page
+_Body = Tuple[bytes, Optional[List[Any]]]
+
+
+class AsyncFactorial(_BaseFactorial):
+    """Asyncio client for Factorial API.
+
+    Mirrors `Factorial`, with awaitable methods. All requests from an
+    instance share one pool of keep-alive connections, so many tasks
+    can await the client concurrently.
+    """
+
+    def __init__(
+        self,
+        *,
+        access_token: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        server_filters: bool = True,
+        cache: Optional[ResponseCache] = None,
+        disk_cache: Optional[DiskCache] = None,
+        page_size: Optional[int] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+        rate_limiter: Optional[RateLimiter] = None,
+        hooks: Iterable[Hook] = (),
+        token_refresher: Optional[TokenRefresher] = None,
+        compression: bool = True,
+        coalesce: bool = False,
+    ):
+        """Instantiate client.
+
+        Args:
+            access_token: Access token for the API.
+            pool_size: Optional, maximum number of connections open at
+              the same time. Further requests wait for a free one.
+            idle_timeout: Optional, seconds after which an idle
+              connection is closed instead of reused.
+            server_filters: Optional, send supported filters to the
+              API as query parameters (True) or only filter the
+              responses locally (False).
+            cache: Optional, cache of responses of slow-changing
+              endpoints. Nothing is cached if None.
+            disk_cache: Optional, cache on disk of the employees and
+              holidays, shared between processes. Nothing is stored
+              if None.
+            page_size: Optional, number of items requested per page
+              from list endpoints. Lists are requested in a single
+              response if None.
+            prefetch: Optional, number of pages requested in background
+              tasks while the current page is consumed.
+            rate_limiter: Optional, rate limiter shared by all requests,
+              which also retries throttled and failed requests.
+              Requests are neither limited nor retried if None.
+            hooks: Optional, functions called with the metrics of each
+              request and parsed response. See `Factorial.add_hook`.
+            token_refresher: Optional, credentials to refresh the access
+              token before it expires, or once a request is rejected
+              as unauthorized. The token is never refreshed if None.
+            compression: Optional, ask the API for compressed (gzip or
+              deflate) responses (True) or not (False).
+            coalesce: Optional, share a single request among identical
+              GET requests made at the same time (True), or make them
+              all (False). See `coalesced`.
+        """
+        if page_size is not None and page_size < 1:
+            raise ValueError("Page size must be at least 1.")
+        if prefetch < 0:
+            raise ValueError("Prefetch depth must not be negative.")
+        self.access_token = access_token
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.rate_limiter = rate_limiter
+        self.token_refresher = token_refresher
+        self.compression = compression
+        self.coalesce = coalesce
+        # identical GET requests that did not reach the API
+        self.coalesced = 0
+        self._in_flight: Dict[CacheKey, "asyncio.Task[_Body]"] = {}
+        self._hooks: List[Hook] = list(hooks)
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._pool = AsyncConnectionPool(maxsize=pool_size, idle_timeout=idle_timeout)
+        self._server_filters = {
+            endpoint: dict(filters) if server_filters else {}
+            for endpoint, filters in SERVER_FILTERS.items()
+        }
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self._pool.aclose()
+
+    async def __aenter__(self) -> "AsyncFactorial":
+        """Enter context."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Exit context and close pooled connections."""
+        await self.aclose()
+
+    async def _get(
+        self, *, endpoint: str, params: Optional[Dict[str, str]] = None
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Generic GET method.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+
+        Returns:
+            Response of the GET request in JSON format.
+        """
+        return json.loads(await self._get_raw(endpoint=endpoint, params=params))
+
+    async def _get_raw(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+    ) -> bytes:
+        """Generic GET method, without decoding the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+
+        Returns:
+            Raw body of the GET response.
+        """
+        body, _ = await self._get_body(
+            endpoint=endpoint, params=params, ttl=ttl, schema=None
+        )
+        return body
+
+    async def _get_list(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+        schema: Any,
+    ) -> List[Any]:
+        """Generic GET method for lists, parsing the response.
+
+        Same as `Factorial._get_list`.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+            schema: Schema of the items.
+
+        Returns:
+            Parsed items of the JSON array in the response.
+        """
+        body, items = await self._get_body(
+            endpoint=endpoint, params=params, ttl=ttl, schema=schema
+        )
+        if items is None:
+            items = self._parse(List[schema], body, endpoint=endpoint)
+        return items
+
+    async def _get_body(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]],
+        ttl: Optional[float],
+        schema: Any,
+    ) -> Tuple[bytes, Optional[List[Any]]]:
+        """Aux method to get a response, cached or shared if possible.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Request parameters.
+            ttl: Seconds the response is cached, instead of the TTL of
+              the endpoint.
+            schema: Schema of the items, or None to only get the raw
+              body.
+
+        Returns:
+            Raw body of the response, and its parsed items if it was
+              requested page by page by this call. The body is empty if
+              only the items are needed, i.e. if it is neither cached
+              nor shared.
+        """
+        key = cache_key(endpoint, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, None
+        get = partial(
+            self._get_uncached,
+            key,
+            endpoint=endpoint,
+            params=params,
+            ttl=ttl,
+            schema=schema,
+        )
+        if not self.coalesce:
+            return await get()
+        task = self._in_flight.get(key)
+        leader = task is None
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(get())
+            self._in_flight[key] = task
+
+            def done(task: "asyncio.Task[_Body]") -> None:
+                del self._in_flight[key]
+                if not task.cancelled():
+                    # retrieved, even if no task is waiting any more
+                    task.exception()
+
+            task.add_done_callback(done)
+        # the request runs in its own task: cancelling any of the waiting
+        # tasks, even the one that sent it, does not cancel it
+        body, items = await asyncio.shield(task)
+        # other tasks parse their own objects
+        return body, items if leader else None
+
+    async def _get_uncached(
+        self,
+        key: CacheKey,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]],
+        ttl: Optional[float],
+        schema: Any,
+    ) -> Tuple[bytes, Optional[List[Any]]]:
+        """Aux method to request a response, and cache it."""
+        items = None
+        if self.page_size is not None and endpoint in PAGINATED_ENDPOINTS:
+            raw = schema is None or self.cache is not None or self.coalesce
+            pages = await self._get_pages(
+                endpoint=endpoint, params=params, schema=schema or Any
+            )
+            if schema is not None:
+                items = [x for _, page_items in pages for x in page_items]
+            # pages are only joined to cache or share them
+            body = join_json_arrays([x for x, _ in pages]) if raw else b""
+        else:
+            body = await self._open(endpoint=endpoint, params=params)
+        if self.cache is not None:
+            self.cache.set(key, body, ttl=ttl)
+        return body, items
+
+    async def _open(
+        self, *, endpoint: str, params: Optional[Dict[str, str]] = None
+    ) -> bytes:
+        """Send a GET request and read the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+
+        Returns:
+            Raw body of the GET response.
+        """
+        url = f"{URL_BASE}/{URL_API}/{endpoint}"
+        if params:
+            url = f"{url}?{parse.urlencode(params)}"
+        headers = {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self.access_token}",
+        }
+        if self.compression:
+            headers["Accept-Encoding"] = ACCEPT_ENCODING
+        request_url = request.Request(url, headers=headers)
+        return await self._send(request_url, endpoint=endpoint)
+
+    async def _send(self, req: request.Request, *, endpoint: str) -> bytes:
+        """Send a request and read the response, emitting its metrics.
+
+        Args:
+            req: Request to send.
+            endpoint: Endpoint of the request.
+
+        Returns:
+            Raw body of the response.
+        """
+        if not self._hooks:
+            return await (await self._urlopen(req)).read()
+        start = time.perf_counter()
+        try:
+            response = await self._urlopen(req)
+        except error.HTTPError as e:
+            self._emit_request(req, endpoint=endpoint, start=start, status=e.code)
+            raise
+        body = await response.read()
+        self._emit_request(
+            req, endpoint=endpoint, start=start, response=response, size=len(body)
+        )
+        return body
+
+    async def _urlopen(self, req: request.Request) -> AsyncResponse:
+        """Send a request with a valid access token.
+
+        Same as `Factorial._urlopen`, sharing a single refresh among
+          concurrent tasks.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Response of the request.
+
+        Raises:
+            HTTPError: If the response has an error status.
+        """
+        refresher = self.token_refresher
+        if refresher is None or not req.has_header("Authorization"):
+            return await self._urlopen_limited(req)
+        if refresher.expired():
+            await self._refresh_token(stale=self.access_token)
+        access_token = self._with_access_token(req)
+        try:
+            return await self._urlopen_limited(req)
+        except error.HTTPError as e:
+            if e.code not in UNAUTHORIZED_CODES:
+                raise
+        await self._refresh_token(stale=access_token)
+        self._with_access_token(req)
+        return await self._urlopen_limited(req)
+
+    async def _refresh_token(self, *, stale: str) -> None:
+        """Refresh the access token, unless it was already refreshed.
+
+        Args:
+            stale: Access token found to be expired.
+        """
+        # created here, so that it belongs to the running loop
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # another task refreshed the token while we waited
+            if self.access_token != stale:
+                return
+            refresher = self.token_refresher
+            await self.refresh_access_token(
+                client_id=refresher.client_id,
+                client_secret=refresher.client_secret,
+                refresh_token=refresher.refresh_token,
+            )
+            refresher.refreshes += 1
+
+    async def _urlopen_limited(self, req: request.Request) -> AsyncResponse:
+        """Send a request through the rate limiter, if any.
+
+        Same as `Factorial._urlopen`, waiting without blocking the loop.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Response of the request.
+
+        Raises:
+            HTTPError: If the response has an error status, and the
+              rate limiter does not retry it (any more).
+        """
+        limiter = self.rate_limiter
+        if limiter is None:
+            return await self._pool.urlopen(req)
+        attempt = 0
+        while True:
+            await asyncio.sleep(limiter.acquire())
+            try:
+                response = await self._pool.urlopen(req)
+            except error.HTTPError as e:
+                headers: Any = e.headers or {}
+                delay = limiter.retry_delay(
+                    status=e.code,
+                    method=req.get_method(),
+                    retry_after=headers.get("Retry-After"),
+                    attempt=attempt,
+                )
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+            else:
+                limiter.on_success()
+                return response
+
+    async def _get_pages(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        schema: Any,
+    ) -> List[Tuple[bytes, List[Any]]]:
+        """Generic GET method for paginated endpoints.
+
+        Same as `Factorial._get_pages`, reading ahead in background
+          tasks.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            schema: Schema of the items.
+
+        Returns:
+            Raw body of each page, in order, and its parsed items.
+        """
+        parse = partial(self._parse_page, schema=schema, endpoint=endpoint)
+
+        def get_page(page: int) -> "asyncio.Task[bytes]":
+            page_params = {
+                **(params or {}),
+                PAGE_PARAM: f"{page}",
+                LIMIT_PARAM: f"{self.page_size}",
+            }
+            return asyncio.ensure_future(
+                self._open(endpoint=endpoint, params=page_params)
+            )
+
+        bodies: List[Tuple[bytes, List[Any]]] = []
+        pending: Deque["asyncio.Task[bytes]"] = deque()
+        pages = itertools.count(1)
+        previous = None
+        try:
+            while True:
+                if not pending:
+                    pending.append(get_page(next(pages)))
+                body = await pending.popleft()
+                items = parse(body, previous=previous)
+                if items:
+                    bodies.append((body, items))
+                if len(items) < self.page_size:  # type: ignore
+                    return bodies
+                previous = body
+                # the page is full: request the next ones ahead
+                while len(pending) < self.prefetch:
+                    pending.append(get_page(next(pages)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_filtered(
+        self,
+        *,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        ttl: Optional[float] = None,
+        schema: Any,
+        **filters: Any,
+    ) -> List[Any]:
+        """GET method for lists, sending the supported filters to the API.
+
+        Same as `Factorial._get_filtered`.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            params: Optional request parameters.
+            ttl: Optional, seconds the response is cached, instead of
+              the TTL of the endpoint.
+            schema: Schema of the items.
+            filters: Value of each filter.
+
+        Returns:
+            Parsed items of the JSON array in the response.
+        """
+        supported = self._server_filters.get(endpoint, {})
+        server_params = _server_params(supported, **filters)
+        if server_params:
+            try:
+                return await self._get_list(
+                    endpoint=endpoint,
+                    params={**(params or {}), **server_params},
+                    ttl=ttl,
+                    schema=schema,
+                )
+            except error.HTTPError as exc:
+                self._reject_filters(exc, endpoint=endpoint, params=server_params)
+        return await self._get_list(
+            endpoint=endpoint, params=params, ttl=ttl, schema=schema
+        )
+
+    async def _post(self, *, endpoint: str, payload: Dict[str, str]) -> Dict[str, Any]:
+        """Generic POST method.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            payload: Data to post during request.
+
+        Returns:
+            Response of the POST request in JSON format.
+        """
+        return json.loads(await self._post_raw(endpoint=endpoint, payload=payload))
+
+    async def _post_raw(self, *, endpoint: str, payload: Dict[str, str]) -> bytes:
+        """Generic POST method, without decoding the response.
+
+        Args:
+            endpoint: Endpoint of the API to request.
+            payload: Data to post during request.
+
+        Returns:
+            Raw body of the POST response.
+        """
+        url = f"{URL_BASE}/{URL_API}/{endpoint}"
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.access_token}",
+        }
+        data = json.dumps(payload).encode("utf-8")
+        request_url = request.Request(url, data=data, headers=headers)
+        return await self._send(request_url, endpoint=endpoint)
+
+    async def get_holidays(
+        self, *, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[Holiday]:
+        """Get company holidays information.
+
+        Args:
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+
+        Returns:
+            List of Holiday objects.
+        """
+        from drifactorial.schemas import Holiday
+
+        start = None if start is None else _parse_date(start)
+        end = None if end is None else _parse_date(end)
+        if self.disk_cache is None:
+            parsed = await self._get_filtered(
+                endpoint=URL_HOLIDAYS, schema=Holiday, start=start, end=end
+            )
+        else:
+            # all holidays are stored, and filtered once loaded
+            parsed = self.disk_cache.get(URL_HOLIDAYS, List[Holiday])
+            if parsed is None:
+                parsed = await self._get_list(endpoint=URL_HOLIDAYS, schema=Holiday)
+                self.disk_cache.set(URL_HOLIDAYS, List[Holiday], parsed)
+        if start is not None:
+            parsed = [x for x in parsed if x.date >= start]
+        if end is not None:
+            parsed = [x for x in parsed if x.date <= end]
+        return parsed
+
+    async def get_employees(self) -> List[Employee]:
+        """Get employees information."""
+        from drifactorial.schemas import Employee
+
+        if self.disk_cache is not None:
+            cached = self.disk_cache.get(URL_EMPLOYEES, List[Employee])
+            if cached is not None:
+                return cached
+        parsed = await self._get_list(endpoint=URL_EMPLOYEES, schema=Employee)
+        if self.disk_cache is not None:
+            self.disk_cache.set(URL_EMPLOYEES, List[Employee], parsed)
+        return parsed
+
+    async def get_single_employee(self, *, employee_id: int) -> Employee:
+        """Get single employee information."""
+        from drifactorial.schemas import Employee
+
+        endpoint = f"{URL_EMPLOYEES}/{employee_id}"
+        response = await self._get_raw(endpoint=endpoint)
+        return self._parse(Employee, response, endpoint=endpoint)
+
+    async def get_employees_by_ids(
+        self,
+        *,
+        employee_ids: Iterable[int],
+        max_concurrency: Optional[int] = None,
+    ) -> Dict[int, Union[Employee, Exception]]:
+        """Get information of many single employees concurrently.
+
+        Repeated ids are only requested once. A failed request does
+          not cancel the others: its exception is returned in place
+          of the employee.
+
+        Args:
+            employee_ids: Employee ids.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+
+        Returns:
+            Employee, or exception raised while getting it, by
+              employee id, in the order of `employee_ids`.
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        ids = list(dict.fromkeys(employee_ids))
+        semaphore = asyncio.Semaphore(max_concurrency or self._pool.maxsize)
+
+        async def get_employee(employee_id: int) -> Union[Employee, Exception]:
+            async with semaphore:
+                try:
+                    return await self.get_single_employee(employee_id=employee_id)
+                except Exception as e:
+                    return e
+
+        results = await asyncio.gather(*(get_employee(x) for x in ids))
+        return dict(zip(ids, results))
+
+    async def get_shifts(
+        self,
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> List[Shift]:
+        """Get shifts information.
+
+        Arguments `year` and `month` must both be given in order to
+          filter shifts based on dates. If one of the two is missing,
+          all shifts will be returned (without filtering).
+
+        Args:
+            year: Optional, year to filter.
+            month: Optional, month to filter.
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            List of Shift objects.
+        """
+        return await self._get_shifts(year=year, month=month, employee_id=employee_id)
+
+    async def _get_shifts(
+        self,
+        *,
+        year: Optional[int],
+        month: Optional[int],
+        employee_id: Optional[int],
+        ttl: Optional[float] = None,
+    ) -> List[Shift]:
+        """Aux method to get shifts, caching the response for `ttl` seconds."""
+        from drifactorial.schemas import Shift
+
+        params = {}
+        if year is not None and month is not None:
+            params = {"year": f"{year}", "month": f"{month}"}
+        parsed = await self._get_filtered(
+            endpoint=URL_SHIFTS,
+            params=params,
+            ttl=ttl,
+            schema=Shift,
+            employee_id=employee_id,
+        )
+        if employee_id is not None:
+            parsed = [x for x in parsed if x.employee_id == employee_id]
+        return parsed
+
+    async def get_shifts_range(
+        self,
+        *,
+        start: date,
+        end: date,
+        employee_id: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        cache_past: bool = False,
+    ) -> List[Shift]:
+        """Get shifts information over a range of dates.
+
+        Shifts are requested month by month, concurrently, and merged
+          in order of month. Within a month, shifts keep the order of
+          the API.
+
+        Args:
+            start: Start date of the range (included).
+            end: End date of the range (included).
+            employee_id: Optional, filter on employee id.
+            max_concurrency: Optional, maximum number of requests in
+              flight. Defaults to the size of the connection pool.
+            cache_past: Optional, keep the shifts of months that are
+              fully in the past in the response cache for
+              `PAST_MONTHS_TTL` seconds, and reuse them in later calls
+              instead of requesting them again (True), or always
+              request all months (False). If the client has no cache,
+              a cache of past months only is created.
+
+        Returns:
+            List of Shift objects.
+        """
+        start = _parse_date(start)
+        end = _parse_date(end)
+        if end < start:
+            raise ValueError("End date must not be before start date.")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        today = date.today()
+        semaphore = asyncio.Semaphore(max_concurrency or self._pool.maxsize)
+
+        if cache_past and self.cache is None:
+            self.cache = ResponseCache(ttl={})
+
+        async def get_month(year: int, month: int) -> List[Shift]:
+            past = cache_past and (year, month) < (today.year, today.month)
+            async with semaphore:
+                return await self._get_shifts(
+                    year=year,
+                    month=month,
+                    employee_id=employee_id,
+                    ttl=PAST_MONTHS_TTL if past else None,
+                )
+
+        months = await asyncio.gather(*(get_month(*x) for x in _months(start, end)))
+        return _shifts_between(months, start=start, end=end)
+
+    async def get_shift_columns(
+        self,
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> ShiftColumns:
+        """Get shifts information, in a compact columnar container.
+
+        Same as `get_shifts`, but shifts are stored in typed arrays
+          once parsed, instead of kept as schema objects.
+
+        Args:
+            year: Optional, year to filter.
+            month: Optional, month to filter.
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            Columnar container of shifts.
+        """
+        from drifactorial.columnar import ShiftColumns
+
+        return ShiftColumns(
+            await self.get_shifts(year=year, month=month, employee_id=employee_id)
+        )
+
+    async def get_leaves(
+        self,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        employee_id: Optional[int] = None,
+    ) -> List[Leave]:
+        """Get leaves information.
+
+        Args:
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            List of Leaves objects.
+        """
+        from drifactorial.schemas import Leave
+
+        start = None if start is None else _parse_date(start)
+        end = None if end is None else _parse_date(end)
+        parsed = await self._get_filtered(
+            endpoint=URL_LEAVES,
+            schema=Leave,
+            start=start,
+            end=end,
+            employee_id=employee_id,
+        )
+        if start is not None:
+            parsed = [x for x in parsed if x.finish_on >= start]
+        if end is not None:
+            parsed = [x for x in parsed if x.start_on <= end]
+        if employee_id is not None:
+            parsed = [x for x in parsed if x.employee_id == employee_id]
+        return parsed
+
+    async def get_leave_columns(
+        self,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        employee_id: Optional[int] = None,
+    ) -> LeaveColumns:
+        """Get leaves information, in a compact columnar container.
+
+        Same as `get_leaves`, but leaves are stored in typed arrays
+          once parsed, instead of kept as schema objects.
+
+        Args:
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            employee_id: Optional, filter on employee id.
+
+        Returns:
+            Columnar container of leaves.
+        """
+        from drifactorial.columnar import LeaveColumns
+
+        return LeaveColumns(
+            await self.get_leaves(start=start, end=end, employee_id=employee_id)
+        )
+
+    async def get_daysoff(
+        self,
+        *,
+        employee_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        include_weekend: bool = False,
+        compact: bool = False,
+    ) -> DaysOff:
+        """Get days off (holidays and leaves) for a single employee.
+
+        Same as `Factorial.get_daysoff`, fetching holidays and leaves
+          concurrently.
+
+        Args:
+            employee_id: Employee id.
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            include_weekend: Optional, include weekend days (True) or
+              not (False).
+            compact: Optional, return sorted and merged date intervals
+              (True) or single days (False).
+
+        Returns:
+            Full days off.
+            Morning days off.
+            Afternoon days off.
+        """
+        employee = await self.get_single_employee(employee_id=employee_id)
+        aux_start, aux_end = _employment_window(employee, start=start, end=end)
+        holidays, leaves = await asyncio.gather(
+            self.get_holidays(start=aux_start, end=aux_end),
+            self.get_leaves(start=aux_start, end=aux_end, employee_id=employee_id),
+        )
+        return _collect_daysoff(
+            employee,
+            holidays=holidays,
+            leaves=leaves,
+            start=aux_start,
+            end=aux_end,
+            include_weekend=include_weekend,
+            compact=compact,
+        )
+
+    async def get_daysoff_bulk(
+        self,
+        *,
+        employee_ids: Optional[Iterable[int]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        include_weekend: bool = False,
+        compact: bool = False,
+    ) -> Dict[int, DaysOff]:
+        """Get days off (holidays and leaves) for many employees.
+
+        Same as `Factorial.get_daysoff_bulk`, fetching holidays and
+          leaves concurrently.
+
+        Args:
+            employee_ids: Optional, employee ids. All employees if None.
+            start: Optional, start date of filter (included).
+            end: Optional, end date of filter (included).
+            include_weekend: Optional, include weekend days (True) or
+              not (False).
+            compact: Optional, return sorted and merged date intervals
+              (True) or single days (False).
+
+        Returns:
+            Full, morning and afternoon days off by employee id.
+
+        Raises:
+            ValueError: If some employee id does not exist.
+        """
+        employees = _select_employees(await self.get_employees(), employee_ids)
+        if not employees:
+            return {}
+        windows = {x.id: _employment_window(x, start=start, end=end) for x in employees}
+        min_start = min(x for x, _ in windows.values())
+        max_end = max(x for _, x in windows.values())
+        holidays, leaves = await asyncio.gather(
+            self.get_holidays(start=min_start, end=max_end),
+            self.get_leaves(start=min_start, end=max_end),
+        )
+        return _collect_daysoff_bulk(
+            employees,
+            windows=windows,
+            holidays=holidays,
+            leaves=leaves,
+            include_weekend=include_weekend,
+            compact=compact,
+        )
+
+    async def get_account(self) -> Account:
+        """Get account information."""
+        from drifactorial.schemas import Account
+
+        response = await self._get_raw(endpoint=URL_ACCOUNT)
+        return self._parse(Account, response, endpoint=URL_ACCOUNT)
+
+    async def clock_in(self, *, now: datetime, employee_id: int) -> Shift:
+        """Post clock-in time."""
+        payload = {"now": f"{now.isoformat()}", "employee_id": f"{employee_id}"}
+        endpoint = f"{URL_SHIFTS}/{URL_CLOCK_IN}"
+        response = await self._post_raw(endpoint=endpoint, payload=payload)
+        return self._clocked(response, endpoint=endpoint, employee_id=employee_id)
+
+    async def clock_out(self, *, now: datetime, employee_id: int) -> Shift:
+        """Post clock-out time."""
+        payload = {"now": f"{now.isoformat()}", "employee_id": f"{employee_id}"}
+        endpoint = f"{URL_SHIFTS}/{URL_CLOCK_OUT}"
+        response = await self._post_raw(endpoint=endpoint, payload=payload)
+        return self._clocked(response, endpoint=endpoint, employee_id=employee_id)
+
+    async def clock_in_many(
+        self,
+        *,
+        entries: Iterable[Tuple[int, datetime]],
+        max_concurrency: Optional[int] = None,
+        queue: Optional[ClockQueue] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-in times concurrently.
+
+        Same as `Factorial.clock_in_many`.
+        """
+        clocks = [(URL_CLOCK_IN, x, now) for x, now in entries]
+        return await self._send_clocks(
+            clocks, max_concurrency=max_concurrency, queue=queue, enqueue=True
+        )
+
+    async def clock_out_many(
+        self,
+        *,
+        entries: Iterable[Tuple[int, datetime]],
+        max_concurrency: Optional[int] = None,
+        queue: Optional[ClockQueue] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-out times concurrently.
+
+        Same as `Factorial.clock_out_many`.
+        """
+        clocks = [(URL_CLOCK_OUT, x, now) for x, now in entries]
+        return await self._send_clocks(
+            clocks, max_concurrency=max_concurrency, queue=queue, enqueue=True
+        )
+
+    async def replay_clocks(
+        self, *, queue: ClockQueue, max_concurrency: Optional[int] = None
+    ) -> Dict[int, Union[Shift, Exception]]:
+        """Post again the clock-ins and clock-outs left in a queue.
+
+        Same as `Factorial.replay_clocks`.
+        """
+        pending = queue.pending()
+        results = await self._send_clocks(
+            [(x.action, x.employee_id, x.now) for x in pending],
+            ids=[x.id for x in pending],
+            max_concurrency=max_concurrency,
+            queue=queue,
+        )
+        return dict(zip((x.id for x in pending), results))
+
+    async def _send_clocks(
+        self,
+        clocks: List[_Clock],
+        *,
+        max_concurrency: Optional[int],
+        queue: Optional[ClockQueue],
+        enqueue: bool = False,
+        ids: Optional[List[int]] = None,
+    ) -> List[Union[Shift, Exception]]:
+        """Post many clock-ins and clock-outs concurrently.
+
+        Same as `Factorial._send_clocks`.
+        """
+        from drifactorial.outbox import PendingClockError, is_transient, is_unknown
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1.")
+        held: Set[int] = set()
+        if queue is not None and enqueue:
+            held = queue.employees()
+            ids = queue.put_many(clocks)
+        elif queue is not None:
+            # replayed clocks wait for the unknown clocks of their employee
+            held = {x.employee_id for x in queue.unknown()}
+        by_employee: Dict[int, List[int]] = defaultdict(list)
+        for n, (_, employee_id, _) in enumerate(clocks):
+            by_employee[employee_id].append(n)
+        results: List[Union[Shift, Exception]] = [None] * len(clocks)  # type: ignore
+        for employee_id in held.intersection(by_employee):
+            for n in by_employee.pop(employee_id):
+                results[n] = PendingClockError(employee_id)
+        post = {URL_CLOCK_IN: self.clock_in, URL_CLOCK_OUT: self.clock_out}
+        semaphore = asyncio.Semaphore(max_concurrency or self._pool.maxsize)
+
+        async def post_clocks(indexes: List[int]) -> None:
+            async with semaphore:
+                for k, n in enumerate(indexes):
+                    action, employee_id, now = clocks[n]
+                    exc: Optional[Exception] = None
+                    try:
+                        results[n] = await post[action](
+                            now=now, employee_id=employee_id
+                        )
+                    except Exception as e:
+                        results[n] = exc = e
+                    if queue is not None:
+                        queue.settle(ids[n], exc=exc)
+                    if exc is not None and (is_transient(exc) or is_unknown(exc)):
+                        # the next clocks would reach the API before this one
+                        for m in indexes[k + 1 :]:
+                            results[m] = PendingClockError(employee_id)
+                        return
+
+        await asyncio.gather(*(post_clocks(x) for x in by_employee.values()))
+        return results
+
+    obtain_authorization_link = staticmethod(Factorial.obtain_authorization_link)
+    authorize = Factorial.authorize
+
+    @staticmethod
+    async def _post_token(
+        *, data: Dict[str, str], send: Callable[..., Awaitable[bytes]]
+    ) -> Dict[str, Any]:
+        """Request access token.
+
+        Args:
+            data: Settings and credentials needed to obtain the token.
+            send: Coroutine function sending the request through the
+              client pool.
+
+        Returns:
+            Response of the POST request.
+        """
+        url = f"{URL_BASE}/{URL_OAUTH}/{URL_TOKEN}"
+        data_parsed = parse.urlencode(data).encode()
+        request_url = request.Request(url, data=data_parsed)
+        endpoint = f"{URL_OAUTH}/{URL_TOKEN}"
+        return json.loads(await send(request_url, endpoint=endpoint))
+
+    async def obtain_access_token(
+        self,
+        *,
+        client_id: str,
+        client_secret: str,
+        redirect_uri: str,
+        authorization_key: str,
+    ) -> Token:
+        """Obtain access token from authorization key."""
+        from drifactorial.schemas import Token
+
+        data = {
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "redirect_uri": redirect_uri,
+            "code": authorization_key,
+            "grant_type": "authorization_code",
+        }
+        response = await self._post_token(data=data, send=self._send)
+        token = _adapter(Token).validate_python(response)
+        self.access_token = token.access_token
+        if self.token_refresher is not None:
+            self.token_refresher.update(token)
+        return token
+
+    async def refresh_access_token(
+        self, *, client_id: str, client_secret: str, refresh_token: str
+    ) -> Token:
+        """Refresh access token when expired."""
+        from drifactorial.schemas import Token
+
+        data = {
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token",
+        }
+        response = await self._post_token(data=data, send=self._send)
+        token = _adapter(Token).validate_python(response)
+        self.access_token = token.access_token
+        if self.token_refresher is not None:
+            self.token_refresher.update(token)
+        return token
@@ -0,0 +1,101 @@
+"""Automatic refresh of access tokens.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from drifactorial.schemas import Token
+
+DEFAULT_REFRESH_MARGIN = 60.0
+UNAUTHORIZED_CODES = (401,)
+
+
+class TokenRefresher:
+    """Credentials to refresh the access token of a client.
+
+    Keeps the refresh token and the expiry time of the current access
+      token, so that the client refreshes it `margin` seconds before
+      it expires, and again if a request is rejected as unauthorized.
+      Each refresh replaces the refresh token.
+    """
+
+    def __init__(
+        self,
+        *,
+        client_id: str,
+        client_secret: str,
+        refresh_token: str,
+        expires_at: Optional[float] = None,
+        margin: float = DEFAULT_REFRESH_MARGIN,
+    ):
+        """Instantiate token refresher.
+
+        Args:
+            client_id: Client id of the application.
+            client_secret: Client secret of the application.
+            refresh_token: Refresh token of the current access token.
+            expires_at: Optional, Unix time at which the current access
+              token expires. Only refreshed once rejected if None.
+            margin: Optional, seconds before expiry at which the access
+              token is refreshed.
+        """
+        if margin < 0:
+            raise ValueError("Refresh margin must not be negative.")
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+        self.margin = margin
+        self.refreshes = 0
+
+    @classmethod
+    def from_token(
+        cls,
+        token: "Token",
+        *,
+        client_id: str,
+        client_secret: str,
+        margin: float = DEFAULT_REFRESH_MARGIN,
+    ) -> "TokenRefresher":
+        """Instantiate token refresher from an obtained token.
+
+        Args:
+            token: Token obtained from the API.
+            client_id: Client id of the application.
+            client_secret: Client secret of the application.
+            margin: Optional, seconds before expiry at which the access
+              token is refreshed.
+
+        Returns:
+            Token refresher.
+        """
+        refresher = cls(
+            client_id=client_id,
+            client_secret=client_secret,
+            refresh_token=token.refresh_token,
+            margin=margin,
+        )
+        refresher.update(token)
+        return refresher
+
+    def update(self, token: "Token") -> None:
+        """Keep the refresh token and expiry time of a new token."""
+        self.refresh_token = token.refresh_token
+        self.expires_at = float(token.created_at + token.expires_in)
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        """Check whether the access token is due for a refresh.
+
+        Args:
+            now: Optional, current Unix time.
+
+        Returns:
+            Whether the access token expires within the margin.
+        """
+        if self.expires_at is None:
+            return False
+        now = time.time() if now is None else now
+        return now >= self.expires_at - self.margin
@@ -0,0 +1,153 @@
+"""Response cache for the Factorial API.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Tuple
+
+DEFAULT_TTLS = {
+    "company_holidays": 3600.0,
+    "employees": 600.0,
+    "me": 3600.0,
+}
+# seconds the shifts of past months are kept by `get_shifts_range`
+PAST_MONTHS_TTL = 86400.0
+DEFAULT_MAXSIZE = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def cache_key(endpoint: str, params: Optional[Mapping[str, str]] = None) -> CacheKey:
+    """Build the cache key of a request.
+
+    Args:
+        endpoint: Endpoint of the API.
+        params: Optional request parameters.
+
+    Returns:
+        Hashable key, independent of the order of the parameters.
+    """
+    return endpoint, tuple(sorted((k, f"{v}") for k, v in (params or {}).items()))
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of raw API responses.
+
+    Each endpoint has its own time to live. Endpoints without a TTL
+    are not cached. The least recently used responses are evicted
+    once the cache holds more than `maxsize` responses or more than
+    `max_bytes` bytes.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: Optional[Mapping[str, float]] = None,
+        maxsize: int = DEFAULT_MAXSIZE,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """Instantiate cache.
+
+        Args:
+            ttl: Optional, seconds each endpoint is kept, by endpoint.
+              Sub-resources such as `employees/1` use the TTL of their
+              collection. Defaults to `DEFAULT_TTLS`.
+            maxsize: Optional, maximum number of cached responses.
+            max_bytes: Optional, maximum total size of cached responses.
+        """
+        self.ttl: Dict[str, float] = dict(DEFAULT_TTLS if ttl is None else ttl)
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of cached responses."""
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of cached responses."""
+        return self._size
+
+    def ttl_for(self, endpoint: str) -> Optional[float]:
+        """Get the TTL of an endpoint, or None if it is not cached."""
+        if endpoint in self.ttl:
+            return self.ttl[endpoint]
+        return self.ttl.get(endpoint.split("/")[0])
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        """Get a cached response, if present and not expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._pop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key: CacheKey, value: bytes, *, ttl: Optional[float] = None) -> None:
+        """Cache a response, if its endpoint has a TTL.
+
+        Args:
+            key: Cache key of the request.
+            value: Raw response.
+            ttl: Optional, seconds the response is kept, instead of the
+              TTL of its endpoint.
+        """
+        if ttl is None:
+            ttl = self.ttl_for(key[0])
+        if ttl is None or ttl <= 0 or len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._size += len(value)
+            while len(self._entries) > self.maxsize or self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, endpoint: Optional[str] = None, **params: object) -> int:
+        """Drop cached responses.
+
+        Args:
+            endpoint: Optional, endpoint to drop. All if None.
+            params: Optional, only drop responses that may contain
+              these values, i.e. whose request parameters do not
+              filter on a different value.
+
+        Returns:
+            Number of dropped responses.
+        """
+        values = {k: f"{v}" for k, v in params.items() if v is not None}
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if endpoint is None
+                or (
+                    (key[0] == endpoint or key[0].startswith(f"{endpoint}/"))
+                    and all(values.get(k, v) == v for k, v in key[1])
+                )
+            ]
+            for key in keys:
+                self._pop(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self.invalidate()
+
+    def _pop(self, key: CacheKey) -> None:
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
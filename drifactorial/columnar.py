@@ -0,0 +1,253 @@
+"""Compact columnar containers of shifts and leaves.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from array import array
+from datetime import date, time
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+
+from drifactorial.schemas import Leave, Shift
+
+# missing dates, times, booleans and texts
+NULL = -1
+
+_Model = TypeVar("_Model", bound=BaseModel)
+_Row = TypeVar("_Row", bound="Row")
+_Codec = Tuple[str, Callable[[Any], int], Callable[[int], Any]]
+
+
+def _seconds(value: time) -> int:
+    """Aux function to get the seconds since midnight of a time.
+
+    Microseconds are dropped.
+    """
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _time(value: int) -> time:
+    """Aux function to get the time of some seconds since midnight."""
+    return time(value // 3600, value // 60 % 60, value % 60)
+
+
+# typecode, encoding and decoding of each field type
+_CODECS: Dict[Any, _Codec] = {
+    int: ("q", int, int),
+    bool: ("b", int, bool),
+    date: ("i", date.toordinal, date.fromordinal),
+    time: ("i", _seconds, _time),
+}
+
+
+def _field_type(annotation: Any) -> Tuple[Any, bool]:
+    """Aux function to get the type of a field, and if it is optional."""
+    if get_origin(annotation) is Union:
+        args = [x for x in get_args(annotation) if x is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _encode_null(encode: Callable[[Any], int]) -> Callable[[Any], int]:
+    """Aux function to encode missing values as `NULL`."""
+    return lambda value: NULL if value is None else encode(value)
+
+
+def _decode_null(decode: Callable[[int], Any]) -> Callable[[int], Any]:
+    """Aux function to decode `NULL` as missing values."""
+    return lambda value: None if value == NULL else decode(value)
+
+
+class Row:
+    """Lightweight record of a columnar container."""
+
+    __slots__: Tuple[str, ...] = ()
+    _model: ClassVar[Type[BaseModel]]
+
+    def __init__(self, *values: Any):
+        """Instantiate record, with values in the order of the fields."""
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        """Represent record."""
+        values = ", ".join(f"{x}={getattr(self, x)!r}" for x in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare records by value."""
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, x) == getattr(other, x) for x in self.__slots__)
+
+    def to_model(self) -> Any:
+        """Convert into the full schema object."""
+        # the values come from schema objects, no need to validate again
+        return self._model.model_construct(
+            **{x: getattr(self, x) for x in self.__slots__}
+        )
+
+
+class ShiftRow(Row):
+    """Lightweight shift, with the fields of `Shift`."""
+
+    __slots__ = tuple(Shift.model_fields)
+    _model = Shift
+
+
+class LeaveRow(Row):
+    """Lightweight leave, with the fields of `Leave`."""
+
+    __slots__ = tuple(Leave.model_fields)
+    _model = Leave
+
+
+class Columns(Generic[_Model, _Row]):
+    """Schema objects stored field by field in typed arrays.
+
+    Integers are stored as 64-bit integers, dates as ordinals, times
+      as seconds since midnight, truncating microseconds, and booleans
+      as 0 or 1. Texts are
+      stored once in `strings`, and referenced by their position in
+      it. Missing values are stored as `NULL`.
+
+    Records are decoded on access, as `Row` objects or as the full
+      schema objects.
+    """
+
+    _row: ClassVar[Type[Row]]
+    # narrower typecodes for some integer fields
+    _typecodes: ClassVar[Dict[str, str]] = {}
+
+    def __init__(self, items: Iterable[_Model] = ()):
+        """Build container.
+
+        Args:
+            items: Optional, schema objects, e.g. from `iter_shifts`
+              or `iter_leaves`, which are not kept.
+        """
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._encoders: List[Tuple[str, Callable[[Any], int]]] = []
+        self._decoders: List[Callable[[int], Any]] = []
+        self._columns: Dict[str, array] = {}
+        for name, field in self._row._model.model_fields.items():
+            kind, optional = _field_type(field.annotation)
+            codec: _Codec
+            if kind is str:
+                codec = ("i", self._intern, self.strings.__getitem__)
+            else:
+                codec = _CODECS[kind]
+            typecode, encode, decode = codec
+            if optional:
+                encode, decode = _encode_null(encode), _decode_null(decode)
+            self._encoders.append((name, encode))
+            self._decoders.append(decode)
+            self._columns[name] = array(self._typecodes.get(name, typecode))
+        self.extend(items)
+
+    def _intern(self, value: str) -> int:
+        """Aux method to get the position of a text, storing it if new."""
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def append(self, item: _Model) -> None:
+        """Add a schema object.
+
+        Raises:
+            OverflowError: If some value does not fit its typed array.
+        """
+        values = [
+            (name, encode(getattr(item, name))) for name, encode in self._encoders
+        ]
+        appended = []
+        try:
+            for name, value in values:
+                self._columns[name].append(value)
+                appended.append(self._columns[name])
+        except OverflowError:
+            # an object that does not fit adds nothing
+            for column in appended:
+                column.pop()
+            raise
+
+    def extend(self, items: Iterable[_Model]) -> None:
+        """Add schema objects."""
+        for item in items:
+            self.append(item)
+
+    def column(self, name: str) -> array:
+        """Get the typed array of a field.
+
+        Args:
+            name: Name of the field.
+
+        Returns:
+            Encoded values of the field, which should not be modified.
+
+        Raises:
+            KeyError: If the field does not exist.
+        """
+        return self._columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        """Get the size of the typed arrays, in bytes."""
+        return sum(x.itemsize * len(x) for x in self._columns.values())
+
+    def __len__(self) -> int:
+        """Get the number of records."""
+        return len(self._columns["id"])
+
+    def __getitem__(self, index: int) -> _Row:
+        """Get a record."""
+        values = (
+            decode(column[index])
+            for decode, column in zip(self._decoders, self._columns.values())
+        )
+        return self._row(*values)  # type: ignore
+
+    def __iter__(self) -> Iterator[_Row]:
+        """Iterate over the records."""
+        columns = zip(*self._columns.values())
+        for values in columns:
+            yield self._row(  # type: ignore
+                *(decode(x) for decode, x in zip(self._decoders, values))
+            )
+
+    def to_models(self) -> List[_Model]:
+        """Convert all records into full schema objects."""
+        return [x.to_model() for x in self]
+
+
+class ShiftColumns(Columns[Shift, ShiftRow]):
+    """Columnar container of shifts."""
+
+    _row = ShiftRow
+    _typecodes = {"year": "i", "month": "i", "day": "i"}
+
+
+class LeaveColumns(Columns[Leave, LeaveRow]):
+    """Columnar container of leaves."""
+
+    _row = LeaveRow
@@ -0,0 +1,156 @@
+"""Persistent cache of parsed responses, shared between processes.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+
+from drifactorial import URL_EMPLOYEES, URL_HOLIDAYS, _adapter
+
+DEFAULT_TTLS = {
+    URL_EMPLOYEES: 600.0,
+    URL_HOLIDAYS: 3600.0,
+}
+FORMAT_VERSION = 2
+
+# magic, format version and creation time
+_HEADER = struct.Struct(">4sBd")
+_MAGIC = b"DRFC"
+
+
+class DiskCache:
+    """Cache of schema objects on disk, for warm starts.
+
+    Each endpoint is stored in its own file, as a binary header
+      followed by the compressed JSON of the objects. Objects are
+      validated when loaded, and files that do not match the current
+      schemas are ignored, so upgrades never load stale fields.
+
+    Files are replaced atomically, so many processes can share a
+      directory: readers see either the old or the new file, never a
+      partial one.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        *,
+        ttl: Optional[Mapping[str, float]] = None,
+    ):
+        """Instantiate cache.
+
+        Args:
+            directory: Directory of the cache files, created if missing.
+            ttl: Optional, seconds each endpoint is kept, by endpoint.
+              Endpoints without a TTL are not cached. Defaults to
+              `DEFAULT_TTLS`.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl: Dict[str, float] = dict(DEFAULT_TTLS if ttl is None else ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, endpoint: str) -> Path:
+        """Aux method to get the file of an endpoint."""
+        return self.directory / f"{endpoint.replace('/', '_')}.bin"
+
+    def get(self, endpoint: str, schema: Any) -> Optional[Any]:
+        """Load the objects of an endpoint, if cached and not expired.
+
+        Args:
+            endpoint: Endpoint of the objects.
+            schema: Schema of the objects.
+
+        Returns:
+            Schema objects, or None if missing, expired, or not valid
+              for the schema.
+        """
+        parsed = self._load(endpoint, schema)
+        with self._lock:
+            if parsed is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return parsed
+
+    def _load(self, endpoint: str, schema: Any) -> Optional[Any]:
+        """Aux method to read and parse a cache file."""
+        ttl = self.ttl.get(endpoint)
+        if ttl is None:
+            return None
+        try:
+            data = self._path(endpoint).read_bytes()
+        except FileNotFoundError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, created = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != FORMAT_VERSION or created + ttl <= time.time():
+            return None
+        try:
+            raw = zlib.decompress(data[_HEADER.size :])
+            return _adapter(schema).validate_json(raw)
+        except (zlib.error, ValueError):
+            # corrupted, or written with other schemas
+            return None
+
+    def set(self, endpoint: str, schema: Any, value: Any) -> None:
+        """Store the objects of an endpoint, if it has a TTL.
+
+        Args:
+            endpoint: Endpoint of the objects.
+            schema: Schema of the objects.
+            value: Schema objects.
+        """
+        ttl = self.ttl.get(endpoint)
+        if ttl is None or ttl <= 0:
+            return
+        header = _HEADER.pack(_MAGIC, FORMAT_VERSION, time.time())
+        body = zlib.compress(_adapter(schema).dump_json(value))
+        path = self._path(endpoint)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header + body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """Delete cache files.
+
+        Args:
+            endpoint: Optional, endpoint to drop. All if None.
+
+        Returns:
+            Number of deleted files.
+        """
+        paths = (
+            [self._path(endpoint)]
+            if endpoint is not None
+            else list(self.directory.glob("*.bin"))
+        )
+        deleted = 0
+        for path in paths:
+            try:
+                path.unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def clear(self) -> None:
+        """Delete all cache files."""
+        self.invalidate()
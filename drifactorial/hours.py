@@ -0,0 +1,180 @@
+"""Worked hours of shifts, aggregated by employee and period.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from drifactorial.columnar import NULL, ShiftColumns
+from drifactorial.schemas import Shift
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+PERIODS = (DAY, WEEK, MONTH)
+
+_DAY_SECONDS = 24 * 3600
+_EPOCH = date(1970, 1, 1).toordinal()
+# ordinal of a Monday, to align weeks
+_MONDAY = date(1970, 1, 5).toordinal()
+
+
+class PeriodHours(NamedTuple):
+    """Worked hours of an employee in a period."""
+
+    employee_id: int
+    start: date
+    hours: float
+    shifts: int
+    open_shifts: int
+
+
+def _numpy() -> Any:
+    """Aux function to import NumPy, if available."""
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        return None
+    return numpy
+
+
+def _period_start(day: date, period: str) -> date:
+    """Aux function to get the first day of the period of a day."""
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _aggregate_python(columns: ShiftColumns, period: str) -> List[PeriodHours]:
+    """Aux function to aggregate shifts in pure Python."""
+    starts: Dict[Tuple[int, int, int], date] = {}
+    totals: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0, 0])
+    for employee_id, year, month, day, clock_in, clock_out in zip(
+        columns.column("employee_id"),
+        columns.column("year"),
+        columns.column("month"),
+        columns.column("day"),
+        columns.column("clock_in"),
+        columns.column("clock_out"),
+    ):
+        start = starts.get((year, month, day))
+        if start is None:
+            start = _period_start(date(year, month, day), period)
+            starts[year, month, day] = start
+        total = totals[employee_id, start]
+        total[1] += 1
+        if clock_out == NULL:
+            total[2] += 1
+        else:
+            total[0] += (clock_out - clock_in) % _DAY_SECONDS
+    return [
+        PeriodHours(employee_id, start, seconds / 3600, shifts, open_shifts)
+        for (employee_id, start), (seconds, shifts, open_shifts) in sorted(
+            totals.items()
+        )
+    ]
+
+
+def _aggregate_numpy(np: Any, columns: ShiftColumns, period: str) -> List[PeriodHours]:
+    """Aux function to aggregate shifts with NumPy array operations."""
+    if not len(columns):
+        return []
+
+    def column(name: str) -> Any:
+        values = columns.column(name)
+        return np.frombuffer(values, dtype=values.typecode).astype(np.int64)
+
+    years = column("year")
+    months = column("month")
+    days = column("day")
+    if (
+        np.any((months < 1) | (months > 12))
+        or np.any(days < 1)
+        or np.any(years < 1)
+        or np.any(years > 9999)
+    ):
+        raise ValueError("Shifts with invalid dates.")
+    first_days = (
+        (years - 1970).astype("datetime64[Y]") + (months - 1).astype("timedelta64[M]")
+    ).astype("datetime64[D]")
+    dates = first_days + (days - 1).astype("timedelta64[D]")
+    if np.any(dates.astype("datetime64[M]") != first_days.astype("datetime64[M]")):
+        raise ValueError("Shifts with invalid dates.")
+    ordinals = dates.astype(np.int64) + _EPOCH
+    if period == WEEK:
+        ordinals -= (ordinals - _MONDAY) % 7
+    elif period == MONTH:
+        ordinals = first_days.astype(np.int64) + _EPOCH
+    clock_in = column("clock_in")
+    clock_out = column("clock_out")
+    is_open = clock_out == NULL
+    # overnight shifts end the day after they start
+    seconds = np.where(is_open, 0, (clock_out - clock_in) % _DAY_SECONDS)
+    # employees and periods as a single integer key, sorted by both
+    employee_ids, employees = np.unique(column("employee_id"), return_inverse=True)
+    first = ordinals.min()
+    span = ordinals.max() - first + 1
+    keys, inverse = np.unique(
+        employees.reshape(-1) * span + (ordinals - first), return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    totals = np.bincount(inverse, weights=seconds)
+    shifts = np.bincount(inverse)
+    open_shifts = np.bincount(inverse, weights=is_open)
+    return [
+        PeriodHours(
+            employee_id, date.fromordinal(ordinal), seconds / 3600, n, int(n_open)
+        )
+        for employee_id, ordinal, seconds, n, n_open in zip(
+            employee_ids[keys // span].tolist(),
+            (keys % span + first).tolist(),
+            totals.tolist(),
+            shifts.tolist(),
+            open_shifts.tolist(),
+        )
+    ]
+
+
+def worked_hours(
+    shifts: Union[ShiftColumns, Iterable[Shift]],
+    *,
+    period: str = DAY,
+    use_numpy: Optional[bool] = None,
+) -> List[PeriodHours]:
+    """Aggregate the worked hours of shifts by employee and period.
+
+    Shifts count in the day they are clocked in. Shifts clocked out
+      before their clock in time are overnight shifts, which end the
+      next day. Open shifts (not clocked out yet) count no hours, and
+      are counted apart in `open_shifts`.
+
+    Args:
+        shifts: Shifts, preferably as columns (e.g. from
+          `get_shift_columns`).
+        period: Optional, "day", "week" (starting on Monday) or
+          "month".
+        use_numpy: Optional, aggregate with NumPy array operations
+          (True) or in pure Python (False). NumPy is used if available
+          when None.
+
+    Returns:
+        Worked hours by employee and period start, sorted by both.
+
+    Raises:
+        ValueError: If the period is unknown, or some date is invalid.
+        ImportError: If NumPy is requested but not installed.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}.")
+    if not isinstance(shifts, ShiftColumns):
+        shifts = ShiftColumns(shifts)
+    np = None if use_numpy is False else _numpy()
+    if use_numpy and np is None:
+        raise ImportError("NumPy is not installed.")
+    if np is None:
+        return _aggregate_python(shifts, period)
+    return _aggregate_numpy(np, shifts, period)
@@ -0,0 +1,167 @@
+"""In-memory index of days off.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from drifactorial.intervals import DateInterval
+from drifactorial.schemas import Employee, Holiday, Leave
+
+_ONE_DAY = timedelta(days=1)
+
+
+class _Intervals:
+    """Sorted, disjoint date intervals of one employee."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self) -> None:
+        self.starts: List[date] = []
+        self.ends: List[date] = []
+
+    def add(self, start: date, end: date) -> None:
+        """Insert an interval, merging it with the ones it touches."""
+        # intervals from i to j overlap or are contiguous to the new one
+        i = bisect_left(self.ends, start - _ONE_DAY)
+        j = bisect_right(self.starts, end + _ONE_DAY)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def contains(self, day: date) -> bool:
+        """Check whether a day is within some interval."""
+        i = bisect_right(self.starts, day) - 1
+        return i >= 0 and self.ends[i] >= day
+
+    def overlaps(self, start: date, end: date) -> bool:
+        """Check whether some interval overlaps a range of days."""
+        i = bisect_left(self.ends, start)
+        return i < len(self.starts) and self.starts[i] <= end
+
+
+class LeaveIndex:
+    """Index of employees' days off, for availability queries.
+
+    Approved leaves and company holidays are kept as sorted, merged
+      date intervals per employee, so point and range queries take
+      logarithmic time in the number of days off of each employee.
+      Half days count as days off.
+
+    Holidays only apply to the employees that have them in their
+      `company_holiday_ids`, and teams are taken from `team_ids`, so
+      both need the employees to be indexed too.
+    """
+
+    def __init__(
+        self,
+        *,
+        employees: Iterable[Employee] = (),
+        leaves: Iterable[Leave] = (),
+        holidays: Iterable[Holiday] = (),
+    ):
+        """Build index.
+
+        Args:
+            employees: Optional, employees, for holidays and teams.
+            leaves: Optional, leaves. Only approved leaves are indexed.
+            holidays: Optional, company holidays.
+        """
+        self._intervals: Dict[int, _Intervals] = defaultdict(_Intervals)
+        self._teams: Dict[int, Set[int]] = defaultdict(set)
+        self._holiday_employees: Dict[int, Set[int]] = defaultdict(set)
+        self._holidays: Dict[int, Holiday] = {}
+        for employee in employees:
+            self.add_employee(employee)
+        for leave in leaves:
+            self.add_leave(leave)
+        for holiday in holidays:
+            self.add_holiday(holiday)
+
+    def add_employee(self, employee: Employee) -> None:
+        """Index an employee's teams and already indexed holidays."""
+        for team_id in employee.team_ids:
+            self._teams[team_id].add(employee.id)
+        for holiday_id in employee.company_holiday_ids:
+            self._holiday_employees[holiday_id].add(employee.id)
+            holiday = self._holidays.get(holiday_id)
+            if holiday is not None:
+                self._intervals[employee.id].add(holiday.date, holiday.date)
+
+    def add_leave(self, leave: Leave) -> None:
+        """Index a leave, if approved."""
+        if leave.approved and leave.start_on <= leave.finish_on:
+            self._intervals[leave.employee_id].add(leave.start_on, leave.finish_on)
+
+    def add_holiday(self, holiday: Holiday) -> None:
+        """Index a company holiday for the employees that have it."""
+        self._holidays[holiday.id] = holiday
+        for employee_id in self._holiday_employees.get(holiday.id, ()):
+            self._intervals[employee_id].add(holiday.date, holiday.date)
+
+    def employee_ids(self, *, team_id: Optional[int] = None) -> Set[int]:
+        """Get the ids of the indexed employees, or of a team."""
+        if team_id is not None:
+            return set(self._teams.get(team_id, ()))
+        return set(self._intervals) | {y for x in self._teams.values() for y in x}
+
+    def daysoff(self, employee_id: int) -> List[DateInterval]:
+        """Get the days off of an employee, as merged date intervals."""
+        intervals = self._intervals.get(employee_id)
+        if intervals is None:
+            return []
+        return list(zip(intervals.starts, intervals.ends))
+
+    def is_off(self, employee_id: int, day: date) -> bool:
+        """Check whether an employee is off on a given day."""
+        intervals = self._intervals.get(employee_id)
+        return intervals is not None and intervals.contains(day)
+
+    def off_on(self, day: date, *, team_id: Optional[int] = None) -> List[int]:
+        """Get the employees off on a given day.
+
+        Args:
+            day: Date of the query.
+            team_id: Optional, only look at the members of a team.
+
+        Returns:
+            Sorted ids of the employees off.
+        """
+        return sorted(
+            employee_id
+            for employee_id, intervals in self._candidates(team_id)
+            if intervals.contains(day)
+        )
+
+    def off_between(
+        self, start: date, end: date, *, team_id: Optional[int] = None
+    ) -> List[int]:
+        """Get the employees off some day within a range.
+
+        Args:
+            start: Start date of the query (included).
+            end: End date of the query (included).
+            team_id: Optional, only look at the members of a team.
+
+        Returns:
+            Sorted ids of the employees off.
+        """
+        return sorted(
+            employee_id
+            for employee_id, intervals in self._candidates(team_id)
+            if intervals.overlaps(start, end)
+        )
+
+    def _candidates(self, team_id: Optional[int]) -> Iterable[Tuple[int, _Intervals]]:
+        if team_id is None:
+            return self._intervals.items()
+        return (
+            (x, self._intervals[x])
+            for x in self._teams.get(team_id, ())
+            if x in self._intervals
+        )
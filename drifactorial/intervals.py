@@ -0,0 +1,73 @@
+"""Date interval arithmetic for days off.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple, Union
+
+DateInterval = Tuple[date, date]
+DaysOff = Union[
+    Tuple[List[date], List[date], List[date]],
+    Tuple[List[DateInterval], List[DateInterval], List[DateInterval]],
+]
+
+_ONE_DAY = timedelta(days=1)
+
+
+def merge_intervals(intervals: Iterable[DateInterval]) -> List[DateInterval]:
+    """Merge overlapping and contiguous date intervals.
+
+    Args:
+        intervals: Start and end dates (both included). Intervals
+          ending before they start are ignored.
+
+    Returns:
+        Sorted, disjoint and non-contiguous intervals.
+    """
+    merged: List[DateInterval] = []
+    for start, end in sorted(x for x in intervals if x[0] <= x[1]):
+        if merged and start <= merged[-1][1] + _ONE_DAY:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def remove_weekends(intervals: Iterable[DateInterval]) -> List[DateInterval]:
+    """Split date intervals into their runs of weekdays.
+
+    Weekends are skipped arithmetically, one week at a time, without
+      going through single days.
+
+    Args:
+        intervals: Sorted, disjoint start and end dates (both included).
+
+    Returns:
+        Intervals from Monday to Friday at most.
+    """
+    weekdays: List[DateInterval] = []
+    for start, end in intervals:
+        # move weekend starts to the next Monday
+        if start.weekday() > 4:
+            start += timedelta(days=7 - start.weekday())
+        while start <= end:
+            friday = start + timedelta(days=4 - start.weekday())
+            weekdays.append((start, min(friday, end)))
+            start = friday + timedelta(days=3)
+    return weekdays
+
+
+def count_days(intervals: Iterable[DateInterval]) -> int:
+    """Count the days of disjoint date intervals."""
+    return sum((end - start).days + 1 for start, end in intervals)
+
+
+def expand_intervals(intervals: Iterable[DateInterval]) -> List[date]:
+    """Materialize the single days of sorted, disjoint date intervals."""
+    return [
+        start + timedelta(n)
+        for start, end in intervals
+        for n in range((end - start).days + 1)
+    ]
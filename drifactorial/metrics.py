@@ -0,0 +1,132 @@
+"""Instrumentation of API requests.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import re
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, fields
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Union
+
+DEFAULT_WINDOW = 10000
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass(frozen=True)
+class RequestEvent:
+    """Network side of a single HTTP request.
+
+    Times are in seconds. `connect_time` is zero on reused connections,
+      and None, like `ttfb`, when the request failed before a response.
+      `total_time` covers the whole request until the body was read,
+      including rate limiter waits and retries.
+
+    `bytes` is the size of the body once decompressed, and
+      `compressed_bytes` its size as transferred, the same if the
+      response was not compressed.
+    """
+
+    endpoint: str
+    method: str
+    status: Optional[int]
+    connect_time: Optional[float]
+    ttfb: Optional[float]
+    total_time: float
+    bytes: int
+    compressed_bytes: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ParseEvent:
+    """Parsing side of a response, into schema objects.
+
+    Lists and single objects are decoded and validated in a single
+      pass by pydantic: their `decode_time` is None and the whole
+      parsing is in `validation_time`. Streamed items (`iter_*`) are
+      decoded first, which is measured apart in `decode_time`.
+    """
+
+    endpoint: str
+    decode_time: Optional[float]
+    validation_time: float
+    items: int
+
+
+Event = Union[RequestEvent, ParseEvent]
+Hook = Callable[[Event], None]
+
+
+def endpoint_name(endpoint: str) -> str:
+    """Group requests to single resources, such as `employees/{id}`."""
+    return re.sub(r"/\d+(?=/|$)", "/{id}", endpoint)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(int(-(-q * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+class MetricsAggregator:
+    """Hook keeping recent metrics of each endpoint in memory.
+
+    Register it on a client with `add_hook`, and read percentiles of
+      every numeric field of the events with `report`.
+    """
+
+    def __init__(self, *, window: int = DEFAULT_WINDOW):
+        """Instantiate aggregator.
+
+        Args:
+            window: Optional, number of most recent values kept for
+              each metric of each endpoint.
+        """
+        self.window = window
+        self._values: Dict[str, Dict[str, Deque[float]]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        """Record an event."""
+        with self._lock:
+            metrics = self._values[event.endpoint]
+            for field in fields(event):
+                value = getattr(event, field.name)
+                if isinstance(value, (int, float)) and field.name != "status":
+                    if field.name not in metrics:
+                        metrics[field.name] = deque(maxlen=self.window)
+                    metrics[field.name].append(value)
+
+    def report(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Summarize the recorded metrics.
+
+        Returns:
+            Count, mean and percentiles (`p50`, `p95` and `p99`) of
+              each metric, by endpoint.
+        """
+        with self._lock:
+            snapshot = {
+                endpoint: {name: sorted(values) for name, values in metrics.items()}
+                for endpoint, metrics in self._values.items()
+            }
+        report: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for endpoint, metrics in snapshot.items():
+            report[endpoint] = {}
+            for name, values in metrics.items():
+                if not values:
+                    continue
+                summary = {"count": len(values), "mean": sum(values) / len(values)}
+                for q in PERCENTILES:
+                    summary[f"p{q}"] = percentile(values, q)
+                report[endpoint][name] = summary
+        return report
+
+    def clear(self) -> None:
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._values.clear()
+
+    def endpoints(self) -> List[str]:
+        """Get the endpoints with recorded metrics."""
+        with self._lock:
+            return sorted(self._values)
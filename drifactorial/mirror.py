@@ -0,0 +1,389 @@
+"""Local SQLite mirror of the Factorial API.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+
+from drifactorial import (
+    URL_EMPLOYEES,
+    URL_HOLIDAYS,
+    URL_LEAVES,
+    URL_SHIFTS,
+    Factorial,
+    _adapter,
+    _parse_date,
+)
+from drifactorial.schemas import Employee, Holiday, Leave, Shift
+
+DEFAULT_LOOKBACK = timedelta(days=31)
+RESOURCES = (URL_EMPLOYEES, URL_HOLIDAYS, URL_LEAVES, URL_SHIFTS)
+
+# model and indexed columns of each table
+_TABLES: Dict[str, Tuple[Type[BaseModel], Tuple[str, ...]]] = {
+    URL_EMPLOYEES: (Employee, ()),
+    URL_HOLIDAYS: (Holiday, ("date",)),
+    URL_LEAVES: (Leave, ("employee_id", "start_on, finish_on")),
+    URL_SHIFTS: (Shift, ("employee_id", "year, month")),
+}
+_SQL_TYPES = {
+    bool: "INTEGER",
+    int: "INTEGER",
+    float: "REAL",
+    str: "TEXT",
+    date: "DATE",
+    time: "TIME",
+}
+
+
+def _column_type(annotation: Any) -> str:
+    """Aux function to map a field annotation to a column type."""
+    if get_origin(annotation) is Union:
+        args = [x for x in get_args(annotation) if x is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    # nested models and sequences are stored as JSON text
+    return _SQL_TYPES.get(annotation, "JSON")
+
+
+def _columns(model: Type[BaseModel]) -> Dict[str, str]:
+    """Aux function to get the columns of a model's table."""
+    return {k: _column_type(v.annotation) for k, v in model.model_fields.items()}
+
+
+class Mirror:
+    """Local SQLite copy of employees, holidays, leaves and shifts.
+
+    Each resource is stored in a table with one column per field of
+      its schema, and read back as the same schema objects returned
+      by `Factorial`, with the same filters.
+
+    The API has no change feed, so after the first full sync only
+      the records that can still change are requested again: leaves
+      ending and shifts dated within `lookback` of the last sync.
+      Employees and holidays are small and always requested in full.
+      In all cases, only the rows that actually changed are written.
+
+    Recent records missing from an incremental sync may have been
+      deleted, or moved to an older date: all the records of their
+      employees are requested again to tell.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        client: Optional[Factorial] = None,
+        lookback: timedelta = DEFAULT_LOOKBACK,
+    ):
+        """Open mirror.
+
+        Args:
+            path: Path of the SQLite database file, or ":memory:".
+            client: Optional, client used to sync. The mirror is
+              read-only if None.
+            lookback: Optional, how long before the last sync records
+              are requested again by incremental syncs.
+        """
+        self.client = client
+        self.lookback = lookback
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state"
+                " (resource TEXT PRIMARY KEY, synced_at TIMESTAMP NOT NULL)"
+            )
+            for resource in RESOURCES:
+                self._create_table(resource)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
+
+    def __enter__(self) -> "Mirror":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and close the database."""
+        self.close()
+
+    def _create_table(self, resource: str) -> None:
+        """Create a resource table, or recreate it if its schema changed."""
+        model, indexes = _TABLES[resource]
+        columns = _columns(model)
+        existing = {
+            x["name"]: x["type"]
+            for x in self._conn.execute(f"PRAGMA table_info({resource})")
+        }
+        if existing == columns:
+            return
+        self._conn.execute(f"DROP TABLE IF EXISTS {resource}")
+        self._conn.execute("DELETE FROM sync_state WHERE resource = ?", (resource,))
+        definition = ", ".join(
+            f"{k} {v} PRIMARY KEY" if k == "id" else f"{k} {v}"
+            for k, v in columns.items()
+        )
+        self._conn.execute(f"CREATE TABLE {resource} ({definition})")
+        for n, index in enumerate(indexes):
+            self._conn.execute(f"CREATE INDEX {resource}_{n} ON {resource} ({index})")
+
+    def synced_at(self, resource: str) -> Optional[datetime]:
+        """Get the time of the last sync of a resource, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE resource = ?", (resource,)
+            ).fetchone()
+        return None if row is None else datetime.fromisoformat(row[0])
+
+    def sync(
+        self, *, resources: Iterable[str] = RESOURCES, full: bool = False
+    ) -> Dict[str, int]:
+        """Update the mirror from the API.
+
+        Args:
+            resources: Optional, resources to sync. Defaults to all.
+            full: Optional, request all records again (True) or only
+              the ones that can have changed since the last sync
+              (False). The first sync of a resource is always full.
+
+        Returns:
+            Number of inserted, updated or deleted rows, by resource.
+        """
+        if self.client is None:
+            raise RuntimeError("Mirror has no client to sync from.")
+        now = datetime.now()
+        changes = {}
+        for resource in resources:
+            if resource not in _TABLES:
+                raise ValueError(f"Unknown resource: {resource}.")
+            synced_at = None if full else self.synced_at(resource)
+            since = None if synced_at is None else synced_at.date() - self.lookback
+            changes[resource] = 0
+            missing: Set[int] = set()
+            for records, scope, complete in self._fetch(
+                self.client, resource, since=since, today=now.date()
+            ):
+                stored, absent = self._store(resource, records, scope, complete)
+                changes[resource] += stored
+                missing |= absent
+            if missing:
+                changes[resource] += self._refetch(self.client, resource, missing)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                    (resource, now.isoformat()),
+                )
+        return changes
+
+    @staticmethod
+    def _fetch(
+        client: Factorial, resource: str, *, since: Optional[date], today: date
+    ) -> Iterable[Tuple[Sequence[BaseModel], Tuple[str, Tuple[Any, ...]], bool]]:
+        """Request the records of a resource, with the scope they replace.
+
+        Scopes are complete if records missing from them were deleted,
+          and not complete if they may have moved out of the scope.
+        """
+        if resource == URL_EMPLOYEES:
+            yield client.get_employees(), ("1", ()), True
+        elif resource == URL_HOLIDAYS:
+            yield client.get_holidays(), ("1", ()), True
+        elif resource == URL_LEAVES and since is None:
+            yield client.get_leaves(), ("1", ()), True
+        elif resource == URL_LEAVES:
+            leaves = client.get_leaves(start=since)
+            yield leaves, ("finish_on >= ?", (since.isoformat(),)), False
+        elif since is None:
+            yield client.get_shifts(), ("1", ()), True
+        else:
+            year, month = since.year, since.month
+            while (year, month) <= (today.year, today.month):
+                shifts = client.get_shifts(year=year, month=month)
+                yield shifts, ("year = ? AND month = ?", (year, month)), False
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _refetch(self, client: Factorial, resource: str, ids: Set[int]) -> int:
+        """Request all the records of the employees of some records."""
+        with self._lock:
+            employee_ids = [
+                x[0]
+                for x in self._conn.execute(
+                    f"SELECT DISTINCT employee_id FROM {resource}"
+                    " WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(ids)),),
+                )
+            ]
+        changes = 0
+        for employee_id in employee_ids:
+            records: Sequence[BaseModel]
+            if resource == URL_LEAVES:
+                records = client.get_leaves(employee_id=employee_id)
+            else:
+                records = client.get_shifts(employee_id=employee_id)
+            scope = ("employee_id = ?", (employee_id,))
+            changed, _ = self._store(resource, records, scope, True)
+            changes += changed
+        return changes
+
+    def _store(
+        self,
+        resource: str,
+        records: Sequence[BaseModel],
+        scope: Tuple[str, Tuple[Any, ...]],
+        complete: bool,
+    ) -> Tuple[int, Set[int]]:
+        """Write the records of a scope, deleting the missing ones.
+
+        Returns:
+            Number of changed rows, and ids of the rows of the scope
+              missing from the records, if the scope is not complete
+              (they are deleted otherwise).
+        """
+        model, _ = _TABLES[resource]
+        columns = _columns(model)
+        names = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{x} = excluded.{x}" for x in columns)
+        old_values = ", ".join(f"{resource}.{x}" for x in columns)
+        new_values = ", ".join(f"excluded.{x}" for x in columns)
+        rows = [self._to_row(x, columns) for x in records]
+        ids = {x.id for x in records}  # type: ignore
+        where, params = scope
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            # only rows with different values are actually updated
+            self._conn.executemany(
+                f"INSERT INTO {resource} ({names}) VALUES ({placeholders})"
+                f" ON CONFLICT (id) DO UPDATE SET {updates}"
+                f" WHERE ({old_values}) IS NOT ({new_values})",
+                rows,
+            )
+            missing = {
+                x[0]
+                for x in self._conn.execute(
+                    f"SELECT id FROM {resource} WHERE {where}", params
+                )
+                if x[0] not in ids
+            }
+            if complete:
+                self._conn.executemany(
+                    f"DELETE FROM {resource} WHERE id = ?", [(x,) for x in missing]
+                )
+                missing = set()
+            return self._conn.total_changes - before, missing
+
+    @staticmethod
+    def _to_row(record: BaseModel, columns: Dict[str, str]) -> Tuple[Any, ...]:
+        """Aux function to convert a schema object into a table row."""
+        values = record.model_dump(mode="json")
+        return tuple(
+            json.dumps(values[k]) if v == "JSON" else values[k]
+            for k, v in columns.items()
+        )
+
+    def _query(
+        self, resource: str, where: Sequence[str] = (), params: Sequence[Any] = ()
+    ) -> List[Any]:
+        """Aux function to read schema objects from a table."""
+        model, _ = _TABLES[resource]
+        json_columns = [k for k, v in _columns(model).items() if v == "JSON"]
+        sql = f"SELECT * FROM {resource}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = [dict(x) for x in self._conn.execute(f"{sql} ORDER BY id", params)]
+        for row in rows:
+            for column in json_columns:
+                row[column] = json.loads(row[column])
+        return _adapter(List[model]).validate_python(rows)  # type: ignore
+
+    def get_holidays(
+        self, *, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[Holiday]:
+        """Get mirrored company holidays, as `Factorial.get_holidays`."""
+        where: List[str] = []
+        params: List[Any] = []
+        if start is not None:
+            where.append("date >= ?")
+            params.append(_parse_date(start).isoformat())
+        if end is not None:
+            where.append("date <= ?")
+            params.append(_parse_date(end).isoformat())
+        return self._query(URL_HOLIDAYS, where, params)
+
+    def get_employees(self) -> List[Employee]:
+        """Get mirrored employees, as `Factorial.get_employees`."""
+        return self._query(URL_EMPLOYEES)
+
+    def get_single_employee(self, *, employee_id: int) -> Employee:
+        """Get a mirrored employee, as `Factorial.get_single_employee`.
+
+        Raises:
+            ValueError: If the employee is not in the mirror.
+        """
+        employees = self._query(URL_EMPLOYEES, ["id = ?"], [employee_id])
+        if not employees:
+            raise ValueError(f"Unknown employee id: {employee_id}.")
+        return employees[0]
+
+    def get_shifts(
+        self,
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> List[Shift]:
+        """Get mirrored shifts, as `Factorial.get_shifts`."""
+        where: List[str] = []
+        params: List[Any] = []
+        if year is not None and month is not None:
+            where.append("year = ? AND month = ?")
+            params.extend([year, month])
+        if employee_id is not None:
+            where.append("employee_id = ?")
+            params.append(employee_id)
+        return self._query(URL_SHIFTS, where, params)
+
+    def get_leaves(
+        self,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        employee_id: Optional[int] = None,
+    ) -> List[Leave]:
+        """Get mirrored leaves, as `Factorial.get_leaves`."""
+        where: List[str] = []
+        params: List[Any] = []
+        if start is not None:
+            where.append("finish_on >= ?")
+            params.append(_parse_date(start).isoformat())
+        if end is not None:
+            where.append("start_on <= ?")
+            params.append(_parse_date(end).isoformat())
+        if employee_id is not None:
+            where.append("employee_id = ?")
+            params.append(employee_id)
+        return self._query(URL_LEAVES, where, params)
@@ -0,0 +1,244 @@
+"""Durable local queue of clock-ins and clock-outs.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib import error
+
+from drifactorial import URL_CLOCK_IN, URL_CLOCK_OUT
+from drifactorial.ratelimit import RETRY_CODES
+from drifactorial.transport import NotSentError, _can_retry
+
+ACTIONS = (URL_CLOCK_IN, URL_CLOCK_OUT)
+# statuses of requests the server refused to handle
+REFUSED_CODES = (429, 503)
+# states of queued clocks
+PENDING = "pending"
+UNKNOWN = "unknown"
+
+
+class QueuedClock(NamedTuple):
+    """Clock-in or clock-out waiting in a queue."""
+
+    id: int
+    action: str
+    employee_id: int
+    now: datetime
+    attempts: int
+    last_error: Optional[str]
+    state: str
+
+
+class PendingClockError(Exception):
+    """Clock not posted, as an earlier clock of the employee is pending.
+
+    Clocks of an employee must reach the API in order: once one fails
+      with a transient error, the next ones wait in the queue until it
+      is replayed. Once one ends in an unknown state, they wait until
+      it is resolved.
+    """
+
+    def __init__(self, employee_id: int):
+        """Instantiate exception.
+
+        Args:
+            employee_id: Id of the employee of the clock.
+        """
+        super().__init__(f"An earlier clock of employee {employee_id} is pending.")
+        self.employee_id = employee_id
+
+
+def is_transient(exc: Exception) -> bool:
+    """Check whether a failed request can safely be sent again.
+
+    Clocks are not idempotent, so only requests the API provably did
+      not process are transient: those that failed before being sent,
+      as the connection pool decides which requests to resend, and
+      those the server refused to handle (throttled or unavailable).
+
+    Args:
+        exc: Exception raised while sending the request.
+
+    Returns:
+        Whether the request should be sent again.
+    """
+    if isinstance(exc, error.HTTPError):
+        return exc.code in REFUSED_CODES
+    return _can_retry("POST", exc, sent=not isinstance(exc, NotSentError))
+
+
+def is_unknown(exc: Exception) -> bool:
+    """Check whether a failed request may have been processed anyway.
+
+    Network errors after the request was sent (e.g. timeouts waiting
+      for the response) and server errors leave the request in an
+      unknown state: sending it again might clock the employee twice.
+
+    Args:
+        exc: Exception raised while sending the request.
+
+    Returns:
+        Whether the outcome of the request is unknown.
+    """
+    if is_transient(exc):
+        return False
+    if isinstance(exc, error.HTTPError):
+        return exc.code in RETRY_CODES
+    # the async pool raises incomplete reads and timeouts of its own
+    return isinstance(exc, (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError))
+
+
+class ClockQueue:
+    """Durable local queue of clock-ins and clock-outs.
+
+    Clocks are written to a SQLite table before they are sent, and
+      only removed once the API accepts or rejects them. Clocks that
+      failed with a transient error, or were never sent because the
+      process stopped, stay in the queue until they are replayed with
+      `Factorial.replay_clocks`. Clocks whose outcome is unknown are
+      not replayed: they stay in the queue until they are resolved.
+    """
+
+    def __init__(self, path: str):
+        """Open queue.
+
+        Args:
+            path: Path of the SQLite database file, or ":memory:".
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS clocks"
+                " (id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT NOT NULL,"
+                " employee_id INTEGER NOT NULL, now TIMESTAMP NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT,"
+                f" state TEXT NOT NULL DEFAULT '{PENDING}')"
+            )
+            columns = [x[1] for x in self._conn.execute("PRAGMA table_info(clocks)")]
+            if "state" not in columns:
+                # queue created by an older version
+                self._conn.execute(
+                    "ALTER TABLE clocks"
+                    f" ADD COLUMN state TEXT NOT NULL DEFAULT '{PENDING}'"
+                )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
+
+    def __enter__(self) -> "ClockQueue":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and close the database."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Count the queued clocks."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM clocks").fetchone()[0]
+
+    def put_many(self, clocks: Iterable[Tuple[str, int, datetime]]) -> List[int]:
+        """Add clocks to the queue, in a single transaction.
+
+        Args:
+            clocks: Action, employee id and time of each clock.
+
+        Returns:
+            Id of each queued clock, in order.
+        """
+        ids = []
+        with self._lock, self._conn:
+            for action, employee_id, now in clocks:
+                if action not in ACTIONS:
+                    raise ValueError(f"Unknown action: {action}.")
+                cursor = self._conn.execute(
+                    "INSERT INTO clocks (action, employee_id, now) VALUES (?, ?, ?)",
+                    (action, employee_id, now.isoformat()),
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def employees(self) -> Set[int]:
+        """Get the ids of the employees with queued clocks."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT employee_id FROM clocks")
+            return {x[0] for x in rows}
+
+    def pending(self) -> List[QueuedClock]:
+        """Get the clocks to replay, in the order they were added."""
+        return self._select(PENDING)
+
+    def unknown(self) -> List[QueuedClock]:
+        """Get the clocks of unknown outcome, in the order they were added."""
+        return self._select(UNKNOWN)
+
+    def _select(self, state: str) -> List[QueuedClock]:
+        """Aux method to get the queued clocks in a state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, action, employee_id, now, attempts, last_error, state"
+                " FROM clocks WHERE state = ? ORDER BY id",
+                (state,),
+            ).fetchall()
+        return [
+            QueuedClock(
+                x[0], x[1], x[2], datetime.fromisoformat(x[3]), x[4], x[5], x[6]
+            )
+            for x in rows
+        ]
+
+    def settle(self, clock_id: int, *, exc: Optional[Exception] = None) -> bool:
+        """Record the outcome of sending a queued clock.
+
+        Args:
+            clock_id: Id of the queued clock.
+            exc: Optional, exception raised while sending it. None if
+              it was accepted.
+
+        Returns:
+            Whether the clock was removed from the queue, i.e. it was
+              accepted or failed with a permanent error.
+        """
+        with self._lock, self._conn:
+            if exc is not None and (is_transient(exc) or is_unknown(exc)):
+                state = PENDING if is_transient(exc) else UNKNOWN
+                self._conn.execute(
+                    "UPDATE clocks SET attempts = attempts + 1, last_error = ?,"
+                    " state = ? WHERE id = ?",
+                    (repr(exc), state, clock_id),
+                )
+                return False
+            self._conn.execute("DELETE FROM clocks WHERE id = ?", (clock_id,))
+            return True
+
+    def resolve(self, clock_id: int, *, posted: bool) -> None:
+        """Resolve a clock of unknown outcome.
+
+        Check with the API (e.g. with `Factorial.get_shifts`) whether
+          the clock reached it before resolving it.
+
+        Args:
+            clock_id: Id of the queued clock.
+            posted: Whether the API processed the clock. If so, it is
+              removed from the queue; otherwise, it is replayed again.
+        """
+        with self._lock, self._conn:
+            if posted:
+                self._conn.execute(
+                    "DELETE FROM clocks WHERE id = ? AND state = ?",
+                    (clock_id, UNKNOWN),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE clocks SET state = ? WHERE id = ? AND state = ?",
+                    (PENDING, clock_id, UNKNOWN),
+                )
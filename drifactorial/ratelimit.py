@@ -0,0 +1,182 @@
+"""Client-side rate limiting of API requests.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+DEFAULT_MIN_RATE = 0.1
+# highest rate the limiter adapts up to, as a multiple of the initial rate
+DEFAULT_MAX_RATE_FACTOR = 2.0
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 60.0
+THROTTLE_CODES = (429,)
+RETRY_CODES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# rate lost on each throttled request, and recovered on each success
+_DECREASE_FACTOR = 0.5
+_INCREASE_FRACTION = 0.02
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `Retry-After` header into seconds.
+
+    Args:
+        value: Header value, either seconds or an HTTP date.
+
+    Returns:
+        Seconds to wait, or None if missing or malformed.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """Thread-safe token bucket, with adaptive rate and retry policy.
+
+    Each request takes a token from the bucket, which is refilled at
+      `rate` tokens per second up to `burst` tokens. Throttled
+      requests halve the rate and pause the bucket as long as the
+      server asks; each successful request raises the rate, up to
+      `max_rate`, so it keeps probing for the highest rate the server
+      accepts.
+
+    Failed requests are retried with exponential backoff and full
+      jitter: on 429 responses always, on 5xx responses only if the
+      request is idempotent.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ):
+        """Instantiate rate limiter.
+
+        Args:
+            rate: Optional, initial requests per second.
+            burst: Optional, maximum requests sent at once after an
+              idle period.
+            min_rate: Optional, lowest requests per second the rate
+              can adapt down to.
+            max_rate: Optional, highest requests per second the rate
+              can adapt up to. Defaults to twice `rate`; set it to
+              `rate` to only back off from the initial rate.
+            max_retries: Optional, maximum retries of a request.
+            backoff_base: Optional, seconds waited before the first
+              retry, doubled on each following one (before jitter).
+            backoff_max: Optional, maximum seconds between retries.
+        """
+        if rate <= 0 or min_rate <= 0:
+            raise ValueError("Rates must be positive.")
+        if burst < 1:
+            raise ValueError("Burst must be at least 1.")
+        if max_rate is None:
+            max_rate = rate * DEFAULT_MAX_RATE_FACTOR
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttled = 0
+        self.retries = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token from the bucket.
+
+        Tokens are reserved in order, so concurrent callers are spread
+          out at the current rate.
+
+        Returns:
+            Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            # the bucket is paused while the update time is in the future
+            if now > self._updated:
+                refill = (now - self._updated) * self.rate
+                self._tokens = min(self.burst, self._tokens + refill)
+                self._updated = now
+            self._tokens -= 1
+            wait = self._updated - now
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return max(wait, 0.0)
+
+    def on_success(self) -> None:
+        """Record a successful request, recovering part of the rate."""
+        with self._lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * _INCREASE_FRACTION
+            )
+
+    def retry_delay(
+        self,
+        *,
+        status: int,
+        method: str,
+        retry_after: Optional[str],
+        attempt: int,
+    ) -> Optional[float]:
+        """Record a failed request and decide whether to retry it.
+
+        Args:
+            status: Status code of the response.
+            method: Method of the request.
+            retry_after: Optional, `Retry-After` header of the response.
+            attempt: Number of retries of the request so far.
+
+        Returns:
+            Seconds to wait before retrying, or None not to retry.
+        """
+        wait = parse_retry_after(retry_after)
+        throttled = status in THROTTLE_CODES
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate * _DECREASE_FACTOR)
+            if wait is not None:
+                # nobody sends anything until the server accepts requests again
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = max(self._updated, time.monotonic() + wait)
+            retryable = throttled or (
+                status in RETRY_CODES and method.upper() in IDEMPOTENT_METHODS
+            )
+            if not retryable or attempt >= self.max_retries:
+                return None
+            self.retries += 1
+        if wait is not None:
+            return wait
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
@@ -0,0 +1,118 @@
+"""Incremental JSON parsing of API responses.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import codecs
+import json
+from typing import Any, Callable, Generator, Iterable, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = tuple(",]" + _WHITESPACE)
+_DECODER = json.JSONDecoder()
+
+
+def iter_json_array(
+    read: Callable[[int], Union[bytes, str]],
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Generator[Any, None, None]:
+    """Parse the items of a JSON array one at a time.
+
+    Only the item being parsed and the rest of the current chunk are
+    kept in memory, whatever the size of the array.
+
+    Args:
+        read: Function reading up to a number of bytes (or characters)
+          of the document, and returning an empty value at the end.
+        chunk_size: Optional, number of bytes read at a time.
+
+    Yields:
+        Decoded items of the array.
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """Read one more chunk into the buffer, if any."""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = read(chunk_size)
+        if isinstance(chunk, bytes):
+            text = decoder.decode(chunk, final=not chunk)
+        else:
+            text = chunk
+        eof = not chunk
+        buffer = buffer[pos:] + text
+        pos = 0
+        return True
+
+    def next_char() -> str:
+        """Skip whitespace and peek the next character, if any."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return buffer[pos] if pos < len(buffer) else ""
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            next_char()
+            while True:
+                try:
+                    item, end = _DECODER.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise ValueError("Malformed or truncated JSON array.") from None
+                # a number cut by the end of the chunk could continue in the next
+                if buffer[end : end + 1] not in _DELIMITERS and fill():
+                    continue
+                break
+            pos = end
+            yield item
+            separator = next_char()
+            pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError("Malformed JSON array.")
+    if next_char():
+        raise ValueError("Unexpected data after JSON array.")
+
+
+def join_json_arrays(documents: Iterable[bytes]) -> bytes:
+    """Concatenate JSON arrays without decoding their items.
+
+    Args:
+        documents: JSON arrays.
+
+    Returns:
+        A single JSON array with the items of all arrays, in order.
+
+    Raises:
+        ValueError: If some document is not a JSON array.
+    """
+    items = []
+    for document in documents:
+        document = document.strip()
+        if document[:1] != b"[" or document[-1:] != b"]":
+            raise ValueError("Expected a JSON array.")
+        inner = document[1:-1].strip()
+        if inner:
+            items.append(inner)
+    return b"[" + b",".join(items) + b"]"
@@ -0,0 +1,765 @@
+"""HTTP transport for the Factorial API.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import base64
+import io
+import select
+import socket
+import ssl
+import threading
+import time
+import zlib
+from email.message import Message
+from http import client
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib import error, parse, request
+
+from drifactorial.ratelimit import IDEMPOTENT_METHODS
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 60.0
+ACCEPT_ENCODING = "gzip, deflate"
+
+_PoolKey = Tuple[str, str, Optional[int]]
+# host, port and headers (e.g. credentials) of a proxy
+_Proxy = Tuple[str, int, Dict[str, str]]
+
+
+class _DeflateDecompressor:
+    """Decompressor of deflate bodies, zlib-wrapped or raw.
+
+    The deflate content encoding is a zlib stream, but some servers
+      send raw deflate data instead. Bodies without a valid zlib
+      header are decompressed as raw deflate.
+    """
+
+    def __init__(self) -> None:
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+        # data fed until the header is checked
+        self._head: Optional[bytes] = b""
+
+    @property
+    def unconsumed_tail(self) -> bytes:
+        """Data not decompressed yet, because of the length limit."""
+        return self._decompressor.unconsumed_tail
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        """Decompress data, up to `max_length` bytes if not zero."""
+        if self._head is None:
+            return self._decompressor.decompress(data, max_length)
+        self._head += data
+        try:
+            decompressed = self._decompressor.decompress(data, max_length)
+        except zlib.error:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            decompressed = self._decompressor.decompress(self._head, max_length)
+        if len(self._head) >= 2:
+            self._head = None
+        return decompressed
+
+    def flush(self) -> bytes:
+        """Decompress the rest of the data."""
+        return self._decompressor.flush()
+
+
+_Decompressor = Union["zlib._Decompress", _DeflateDecompressor]
+
+
+def _decompressor(headers: Message) -> Optional[_Decompressor]:
+    """Aux function to get a decompressor for the body of a response.
+
+    Returns:
+        Decompressor, or None if the body is not compressed (or the
+          encoding is not supported).
+    """
+    encoding = (headers.get("Content-Encoding") or "").strip().lower()
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecompressor()
+    return None
+
+
+def _resolve_proxy(key: _PoolKey) -> Optional[_Proxy]:
+    """Aux function to get the proxy of a host, as `urllib` does.
+
+    Proxies are read from the environment (e.g. `HTTPS_PROXY`), and
+      hosts listed in `NO_PROXY` are reached directly.
+    """
+    scheme, host, port = key
+    proxy = request.getproxies().get(scheme)
+    if not proxy or request.proxy_bypass(host if port is None else f"{host}:{port}"):
+        return None
+    url = parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if url.username is not None:
+        credentials = (
+            f"{parse.unquote(url.username)}:{parse.unquote(url.password or '')}"
+        )
+        token = base64.b64encode(credentials.encode()).decode("ascii")
+        headers["Proxy-Authorization"] = f"Basic {token}"
+    return url.hostname or "", url.port or 80, headers
+
+
+class NotSentError(ConnectionError):
+    """Connection failed before a request was sent.
+
+    The server cannot have received the request, so it is safe to
+      send it again, whatever its method. The original error is the
+      cause of the exception.
+    """
+
+
+def _check_sent(exc: BaseException, *, sent: bool) -> None:
+    """Aux function to raise a `NotSentError` if a request was not sent.
+
+    Raises:
+        NotSentError: If the connection failed before sending the
+          request.
+    """
+    if not sent and isinstance(exc, ConnectionError):
+        if not isinstance(exc, NotSentError):
+            raise NotSentError(*exc.args) from exc
+
+
+def _can_retry(method: str, exc: BaseException, *, sent: bool) -> bool:
+    """Aux function to check whether a failed request can be sent again.
+
+    Idempotent requests can always be sent again. Other requests
+      (e.g. clocking in) only if sending them failed, as the server
+      may have processed them otherwise.
+    """
+    return method.upper() in IDEMPOTENT_METHODS or (
+        not sent and isinstance(exc, ConnectionError)
+    )
+
+
+def _is_dropped(conn: client.HTTPConnection) -> bool:
+    """Aux function to check whether the server closed an idle connection."""
+    if conn.sock is None:
+        return True
+    try:
+        # idle connections are only readable once closed by the server
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+def decompress(body: bytes, headers: Message) -> bytes:
+    """Decompress a whole response body, according to its headers.
+
+    Args:
+        body: Body as sent by the server.
+        headers: Headers of the response.
+
+    Returns:
+        Decompressed body.
+    """
+    decompressor = _decompressor(headers)
+    if decompressor is None:
+        return body
+    return decompressor.decompress(body) + decompressor.flush()
+
+
+class PooledResponse:
+    """Response bound to a pooled connection.
+
+    The underlying connection is handed back to the pool as soon as
+    the body has been read to the end, or discarded if the response
+    is closed before that.
+
+    Compressed bodies (gzip or deflate) are decompressed as they are
+    read. `compressed_bytes` counts the bytes of the body read from the
+    connection so far, before decompression.
+    """
+
+    def __init__(
+        self,
+        response: client.HTTPResponse,
+        release: Callable[[bool], None],
+        *,
+        connect_time: float = 0.0,
+        ttfb: float = 0.0,
+    ):
+        """Wrap an `http.client` response.
+
+        Args:
+            response: Response to wrap.
+            release: Function handing the connection back to the pool,
+              or discarding it if not reusable.
+            connect_time: Optional, seconds spent opening the
+              connection, zero if reused.
+            ttfb: Optional, seconds from the start of the request to
+              the first byte of the response.
+        """
+        self._response = response
+        self._release: Optional[Callable[[bool], None]] = release
+        self.connect_time = connect_time
+        self.ttfb = ttfb
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.compressed_bytes = 0
+        self._decompressor = _decompressor(response.headers)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        """Read up to `amt` bytes of the body, or all of it."""
+        if self._decompressor is None:
+            data = self._read_raw(amt)
+        elif amt is None:
+            decompressor = self._decompressor
+            data = decompressor.decompress(
+                decompressor.unconsumed_tail + self._read_raw(None)
+            )
+            data += decompressor.flush()
+        else:
+            data = self._read_decompressed(amt)
+        if self._response.isclosed():
+            self._finish(reusable=True)
+        return data
+
+    def _read_raw(self, amt: Optional[int]) -> bytes:
+        """Read up to `amt` bytes of the body as sent, or all of it."""
+        data = self._response.read(amt)
+        self.compressed_bytes += len(data)
+        return data
+
+    def _read_decompressed(self, amt: int) -> bytes:
+        """Read up to `amt` decompressed bytes of the body.
+
+        Only returns an empty value at the end of the body, even if
+          a compressed chunk does not decompress into any data.
+        """
+        decompressor = self._decompressor
+        while True:
+            if decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, amt)
+            else:
+                chunk = self._read_raw(amt)
+                if not chunk:
+                    return decompressor.flush()
+                data = decompressor.decompress(chunk, amt)
+            if data:
+                return data
+
+    def close(self) -> None:
+        """Close the response, discarding its connection if unread."""
+        self._finish(reusable=self._response.isclosed())
+        self._response.close()
+
+    def _finish(self, *, reusable: bool) -> None:
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(reusable)
+
+    def __enter__(self) -> "PooledResponse":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and close the response."""
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent (keep-alive) HTTP connections.
+
+    Connections are kept per host and reused across requests, so
+    consecutive calls to the API share a single TCP connection and
+    TLS session instead of doing a fresh handshake every time.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        timeout: Optional[float] = None,
+    ):
+        """Instantiate pool.
+
+        Args:
+            maxsize: Maximum number of idle connections kept per host.
+            idle_timeout: Seconds after which an idle connection is
+              dropped instead of reused.
+            timeout: Optional, socket timeout in seconds.
+        """
+        if maxsize < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: Dict[_PoolKey, List[Tuple[client.HTTPConnection, float]]] = {}
+        self._proxies: Dict[_PoolKey, Optional[_Proxy]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _proxy(self, key: _PoolKey) -> Optional[_Proxy]:
+        """Aux method to get the proxy of a host, resolved once."""
+        if key not in self._proxies:
+            self._proxies[key] = _resolve_proxy(key)
+        return self._proxies[key]
+
+    def _new_connection(self, key: _PoolKey) -> client.HTTPConnection:
+        scheme, host, port = key
+        proxy = self._proxy(key)
+        if proxy is None:
+            if scheme == "https":
+                return client.HTTPSConnection(host, port, timeout=self.timeout)
+            return client.HTTPConnection(host, port, timeout=self.timeout)
+        proxy_host, proxy_port, proxy_headers = proxy
+        if scheme != "https":
+            return client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+        conn = client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout)
+        conn.set_tunnel(host, port, headers=proxy_headers)
+        return conn
+
+    def _acquire(self, key: _PoolKey) -> Tuple[client.HTTPConnection, bool]:
+        """Get an idle connection for `key`, or a new one."""
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout and not _is_dropped(conn):
+                    return conn, True
+                conn.close()
+        return self._new_connection(key), False
+
+    def _release(self, key: _PoolKey, conn: client.HTTPConnection) -> None:
+        """Hand a connection back to the pool."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if not self._closed and len(idle) < self.maxsize:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def urlopen(self, req: request.Request) -> PooledResponse:
+        """Send a request over a pooled connection.
+
+        Mirrors `urllib.request.urlopen`: responses with an error
+        status raise `urllib.error.HTTPError`.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Response, whose connection returns to the pool once read.
+        """
+        url = parse.urlsplit(req.full_url)
+        key: _PoolKey = (url.scheme, url.hostname or "", url.port)
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        headers = dict(req.header_items())
+        if req.data is not None and not req.has_header("Content-type"):
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        proxy = self._proxy(key)
+        if proxy is not None and url.scheme != "https":
+            # plain requests go through the proxy with the whole URL
+            path = parse.urlunsplit(url._replace(fragment=""))
+            headers.update(proxy[2])
+
+        conn, reused = self._acquire(key)
+        sent = False
+        try:
+            start, connect_time = self._request(
+                conn, req, path, headers, connect=not reused
+            )
+            sent = True
+            response = conn.getresponse()
+        except (client.HTTPException, OSError) as e:
+            conn.close()
+            if not reused or not _can_retry(req.get_method(), e, sent=sent):
+                _check_sent(e, sent=sent)
+                raise
+            # the server dropped an idle connection: retry on a fresh one
+            conn = self._new_connection(key)
+            sent = False
+            try:
+                start, connect_time = self._request(
+                    conn, req, path, headers, connect=True
+                )
+                sent = True
+                response = conn.getresponse()
+            except BaseException as exc:
+                conn.close()
+                _check_sent(exc, sent=sent)
+                raise
+        ttfb = time.perf_counter() - start
+
+        def release(reusable: bool) -> None:
+            if reusable:
+                self._release(key, conn)
+            else:
+                conn.close()
+
+        pooled = PooledResponse(response, release, connect_time=connect_time, ttfb=ttfb)
+        if pooled.status >= 400:
+            body = pooled.read()
+            raise error.HTTPError(
+                req.full_url,
+                pooled.status,
+                pooled.reason,
+                pooled.headers,
+                io.BytesIO(body),
+            )
+        return pooled
+
+    @staticmethod
+    def _request(
+        conn: client.HTTPConnection,
+        req: request.Request,
+        path: str,
+        headers: Dict[str, str],
+        *,
+        connect: bool,
+    ) -> Tuple[float, float]:
+        """Send a request, timing the connection.
+
+        Returns:
+            Start time of the request, and seconds spent connecting.
+        """
+        start = time.perf_counter()
+        connect_time = 0.0
+        if connect:
+            conn.connect()
+            connect_time = time.perf_counter() - start
+        conn.request(req.get_method(), path, body=req.data, headers=headers)
+        return start, connect_time
+
+    def clear(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def close(self) -> None:
+        """Close the pool and all its idle connections."""
+        with self._lock:
+            self._closed = True
+        self.clear()
+
+    def __enter__(self) -> "ConnectionPool":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Exit context and close the pool."""
+        self.close()
+
+
+class AsyncResponse:
+    """Fully read response of an `AsyncConnectionPool` request."""
+
+    def __init__(self, *, status: int, reason: str, headers: Message, body: bytes):
+        """Instantiate response.
+
+        Args:
+            status: Status code of the response.
+            reason: Reason phrase of the response.
+            headers: Headers of the response.
+            body: Body as sent by the server, decompressed here if
+              needed.
+        """
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.connect_time = 0.0
+        self.ttfb = 0.0
+        self.compressed_bytes = len(body)
+        self._body = decompress(body, headers)
+
+    async def read(self) -> bytes:
+        """Return the response body."""
+        return self._body
+
+
+_AsyncConnection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncConnectionPool:
+    """Pool of persistent HTTP/1.1 connections for asyncio.
+
+    Requests wait for a free connection once `maxsize` connections
+    to a host are busy, so any number of tasks can share the pool
+    while the number of open sockets stays bounded.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        timeout: Optional[float] = None,
+    ):
+        """Instantiate pool.
+
+        Args:
+            maxsize: Maximum number of connections open per host.
+            idle_timeout: Seconds after which an idle connection is
+              dropped instead of reused.
+            timeout: Optional, timeout in seconds of each request.
+        """
+        if maxsize < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: Dict[_PoolKey, List[Tuple[_AsyncConnection, float]]] = {}
+        self._slots: Dict[_PoolKey, asyncio.Semaphore] = {}
+        self._proxies: Dict[_PoolKey, Optional[_Proxy]] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+        self._closed = False
+
+    def _proxy(self, key: _PoolKey) -> Optional[_Proxy]:
+        """Aux method to get the proxy of a host, resolved once."""
+        if key not in self._proxies:
+            self._proxies[key] = _resolve_proxy(key)
+        return self._proxies[key]
+
+    async def _new_connection(self, key: _PoolKey) -> _AsyncConnection:
+        scheme, host, port = key
+        proxy = self._proxy(key)
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            if proxy is None:
+                return await asyncio.open_connection(host, port or 443, ssl=self._ssl)
+            sock = await self._tunnel(proxy, host, port or 443)
+            return await asyncio.open_connection(
+                sock=sock, ssl=self._ssl, server_hostname=host
+            )
+        if proxy is None:
+            return await asyncio.open_connection(host, port or 80)
+        return await asyncio.open_connection(proxy[0], proxy[1])
+
+    @staticmethod
+    async def _tunnel(proxy: _Proxy, host: str, port: int) -> socket.socket:
+        """Aux method to open a tunnel to a host through a proxy.
+
+        Returns:
+            Socket connected to the host, through the proxy.
+
+        Raises:
+            OSError: If the proxy refuses the tunnel.
+        """
+        loop = asyncio.get_running_loop()
+        proxy_host, proxy_port, proxy_headers = proxy
+        family, kind, proto, _, address = (
+            await loop.getaddrinfo(proxy_host, proxy_port, type=socket.SOCK_STREAM)
+        )[0]
+        sock = socket.socket(family, kind, proto)
+        sock.setblocking(False)
+        head = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+        head += [f"{name}: {value}" for name, value in proxy_headers.items()]
+        try:
+            await loop.sock_connect(sock, address)
+            await loop.sock_sendall(
+                sock, "\r\n".join(head).encode("latin-1") + b"\r\n\r\n"
+            )
+            reply = b""
+            while b"\r\n\r\n" not in reply:
+                chunk = await loop.sock_recv(sock, 4096)
+                if not chunk:
+                    raise ConnectionError("Proxy closed the connection.")
+                reply += chunk
+            status_line = reply.split(b"\r\n", 1)[0].decode("latin-1")
+            if status_line.split(" ", 2)[1:2] != ["200"]:
+                raise OSError(f"Tunnel connection failed: {status_line}")
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _acquire_idle(self, key: _PoolKey) -> Optional[_AsyncConnection]:
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            conn, last_used = idle.pop()
+            if now - last_used <= self.idle_timeout and not conn[0].at_eof():
+                return conn
+            conn[1].close()
+        return None
+
+    def _release(self, key: _PoolKey, conn: _AsyncConnection) -> None:
+        if self._closed:
+            conn[1].close()
+        else:
+            self._idle.setdefault(key, []).append((conn, time.monotonic()))
+
+    async def urlopen(self, req: request.Request) -> AsyncResponse:
+        """Send a request over a pooled connection.
+
+        Mirrors `urllib.request.urlopen`: responses with an error
+        status raise `urllib.error.HTTPError`.
+
+        Args:
+            req: Request to send.
+
+        Returns:
+            Fully read response.
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        url = parse.urlsplit(req.full_url)
+        key: _PoolKey = (url.scheme, url.hostname or "", url.port)
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        host = url.netloc.rsplit("@", 1)[-1]
+        headers = dict(req.header_items())
+        proxy = self._proxy(key)
+        if proxy is not None and url.scheme != "https":
+            # plain requests go through the proxy with the whole URL
+            path = parse.urlunsplit(url._replace(fragment=""))
+            headers.update(proxy[2])
+        method = req.get_method()
+        head = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        body = req.data if isinstance(req.data, bytes) else b""
+        if req.data is not None:
+            if not req.has_header("Content-type"):
+                head.append("Content-Type: application/x-www-form-urlencoded")
+            head.append(f"Content-Length: {len(body)}")
+        message = "\r\n".join(head).encode("latin-1") + b"\r\n\r\n" + body
+
+        slot = self._slots.setdefault(key, asyncio.Semaphore(self.maxsize))
+        async with slot:
+            conn = self._acquire_idle(key)
+            if conn is not None:
+                sent = False
+                try:
+                    start = await self._write(conn, message)
+                    sent = True
+                    response, reusable = await self._receive(conn, start)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    conn[1].close()
+                    if not _can_retry(method, e, sent=sent):
+                        _check_sent(e, sent=sent)
+                        raise
+                    # the server dropped an idle connection: retry on a fresh one
+                    conn = None
+                except BaseException:
+                    conn[1].close()
+                    raise
+            if conn is None:
+                start = time.perf_counter()
+                try:
+                    conn = await self._new_connection(key)
+                except BaseException as e:
+                    _check_sent(e, sent=False)
+                    raise
+                connect_time = time.perf_counter() - start
+                sent = False
+                try:
+                    start = await self._write(conn, message)
+                    sent = True
+                    response, reusable = await self._receive(conn, start)
+                except BaseException as e:
+                    conn[1].close()
+                    _check_sent(e, sent=sent)
+                    raise
+                response.connect_time = connect_time
+                response.ttfb += connect_time
+            if reusable:
+                self._release(key, conn)
+            else:
+                conn[1].close()
+
+        if response.status >= 400:
+            raise error.HTTPError(
+                req.full_url,
+                response.status,
+                response.reason,
+                response.headers,  # type: ignore
+                io.BytesIO(response._body),
+            )
+        return response
+
+    @staticmethod
+    async def _write(conn: _AsyncConnection, message: bytes) -> float:
+        """Aux method to send a request, returning its start time."""
+        start = time.perf_counter()
+        conn[1].write(message)
+        await conn[1].drain()
+        return start
+
+    async def _receive(
+        self, conn: _AsyncConnection, start: float
+    ) -> Tuple[AsyncResponse, bool]:
+        """Aux method to read the response of a request."""
+        reader = conn[0]
+        if self.timeout is None:
+            return await self._read_response(reader, start=start)
+        return await asyncio.wait_for(
+            self._read_response(reader, start=start), self.timeout
+        )
+
+    @staticmethod
+    async def _read_response(
+        reader: asyncio.StreamReader, *, start: float
+    ) -> Tuple[AsyncResponse, bool]:
+        status_line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+        ttfb = time.perf_counter() - start
+        version, status, reason = (status_line.strip().split(" ", 2) + [""])[:3]
+        lines = [await reader.readuntil(b"\r\n")]
+        while lines[-1] != b"\r\n":
+            lines.append(await reader.readuntil(b"\r\n"))
+        headers = client.parse_headers(io.BytesIO(b"".join(lines)))
+        reusable = version == "HTTP/1.1"
+        if "close" in headers.get("Connection", "").lower():
+            reusable = False
+
+        if status.startswith("1") or status in ("204", "304"):
+            body = b""
+        elif "chunked" in headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            body = b"".join(chunks)
+        elif "Content-Length" in headers:
+            body = await reader.readexactly(int(headers["Content-Length"]))
+        else:
+            body = await reader.read()
+            reusable = False
+
+        response = AsyncResponse(
+            status=int(status), reason=reason, headers=headers, body=body
+        )
+        response.ttfb = ttfb
+        return response, reusable
+
+    def clear(self) -> None:
+        """Close all idle connections."""
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for (_, writer), _ in conns:
+                writer.close()
+
+    async def aclose(self) -> None:
+        """Close the pool and all its idle connections."""
+        self._closed = True
+        self.clear()
+
+    async def __aenter__(self) -> "AsyncConnectionPool":
+        """Enter context."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Exit context and close the pool."""
+        await self.aclose()
@@ -3,6 +3,6 @@
 set -e
 set -x
 
-poetry run black drifactorial tests --check
-poetry run ruff drifactorial tests
-poetry run mypy drifactorial
+poetry run black drifactorial tests benchmarks --check
+poetry run ruff drifactorial tests benchmarks
+poetry run mypy drifactorial benchmarks
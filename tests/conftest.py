@@ -2,3 +2,87 @@
 
 Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
 """
+
+import gzip
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Generator, List, Optional, Set, Tuple
+
+import pytest
+
+
+class LocalServer(ThreadingHTTPServer):
+    """Local keep-alive HTTP server serving canned JSON responses."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        """Instantiate server on a free local port."""
+        super().__init__(("127.0.0.1", 0), _LocalHandler)
+        self.routes: Dict[str, Any] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        self.connections = 0
+        self.compress = False
+        # seconds idle connections are kept open, forever if None
+        self.keep_alive: Optional[float] = None
+        # paths whose requests are read, and answered closing the connection
+        self.drop: Set[str] = set()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _LocalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: LocalServer
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connection.settimeout(self.server.keep_alive)
+        self.server.connections += 1
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        path = self.path.split("?")[0]
+        if path in self.server.drop:
+            self.close_connection = True
+            return
+        route = self.server.routes.get(path, (404, {"error": "not found"}))
+        status, payload, *headers = route(self.path) if callable(route) else route
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers[0] if headers else {}).items():
+            self.send_header(name, value)
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def local_server() -> Generator[LocalServer, None, None]:
+    """Serve canned responses from a local HTTP server."""
+    server = LocalServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,267 @@
+"""Test module for the asyncio client.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+from datetime import date, timedelta
+from urllib import error
+
+import pytest
+from pydantic import TypeAdapter
+from pytest_mock import MockerFixture
+
+import drifactorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.schemas import Account, Employee, Holiday, Leave, Shift, Token
+from tests import utils
+
+
+@pytest.fixture()
+def api(mocker: MockerFixture, local_server):
+    """Point the clients to the local server."""
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    return local_server
+
+
+def test_async_get_methods(api):
+    """Assert GET methods parse responses into schemas."""
+    account = utils.random_schema(Account)
+    employee = utils.random_employee()
+    shift = utils.random_schema(Shift)
+    api.routes["/api/v1/me"] = (200, account)
+    api.routes["/api/v1/employees"] = (200, [employee])
+    api.routes[f"/api/v1/employees/{employee['id']}"] = (200, employee)
+    api.routes["/api/v1/shifts"] = (200, [shift])
+    api.routes["/api/v1/leaves"] = (200, [utils.random_schema(Leave)])
+    api.routes["/api/v1/company_holidays"] = (200, [utils.random_schema(Holiday)])
+
+    async def main():
+        async with AsyncFactorial(access_token=utils.random_lower_string()) as client:
+            return await asyncio.gather(
+                client.get_account(),
+                client.get_employees(),
+                client.get_single_employee(employee_id=employee["id"]),
+                client.get_shifts(year=2021, month=1),
+                client.get_shifts(employee_id=shift["employee_id"] + 1),
+                client.get_leaves(),
+                client.get_holidays(),
+            )
+
+    result = asyncio.run(main())
+    assert result[0] == TypeAdapter(Account).validate_python(account)
+    assert result[1] == [TypeAdapter(Employee).validate_python(employee)]
+    assert result[2] == result[1][0]
+    assert result[3] == [TypeAdapter(Shift).validate_python(shift)]
+    assert result[4] == []
+    assert len(result[5]) == 1
+    assert len(result[6]) == 1
+    assert ("GET", "/api/v1/shifts?year=2021&month=1") in [x[:2] for x in api.requests]
+
+
+def test_async_concurrency(api):
+    """Assert many concurrent requests share a bounded set of connections."""
+    api.routes["/api/v1/me"] = (200, utils.random_schema(Account))
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", pool_size=4) as client:
+            await asyncio.gather(*(client.get_account() for _ in range(200)))
+
+    asyncio.run(main())
+    assert len(api.requests) == 200
+    assert api.connections <= 4
+
+
+def test_async_clock_and_tokens(api):
+    """Assert POST methods send payloads and update the access token."""
+    shift = utils.random_schema(Shift)
+    token = utils.random_schema(Token)
+    api.routes["/api/v1/shifts/clock_in"] = (200, shift)
+    api.routes["/api/v1/shifts/clock_out"] = (200, shift)
+    api.routes["/oauth/token"] = (200, token)
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            shift_in = await client.clock_in(
+                now=utils.random_datetime(), employee_id=utils.random_int()
+            )
+            shift_out = await client.clock_out(
+                now=utils.random_datetime(), employee_id=utils.random_int()
+            )
+            obtained = await client.obtain_access_token(
+                client_id="a",
+                client_secret="b",
+                redirect_uri="c",
+                authorization_key="d",
+            )
+            refreshed = await client.refresh_access_token(
+                client_id="a", client_secret="b", refresh_token="c"
+            )
+            return shift_in, shift_out, obtained, refreshed, client.access_token
+
+    shift_in, shift_out, obtained, refreshed, access_token = asyncio.run(main())
+    assert shift_in == shift_out == TypeAdapter(Shift).validate_python(shift)
+    assert obtained == refreshed == TypeAdapter(Token).validate_python(token)
+    assert access_token == token["access_token"]
+    methods = {(x[0], x[1]) for x in api.requests}
+    assert methods == {
+        ("POST", "/api/v1/shifts/clock_in"),
+        ("POST", "/api/v1/shifts/clock_out"),
+        ("POST", "/oauth/token"),
+    }
+    token_headers = [x[2] for x in api.requests if x[1] == "/oauth/token"]
+    assert token_headers[0]["Content-Type"] == "application/x-www-form-urlencoded"
+
+
+def test_async_http_error(api):
+    """Assert error statuses raise `HTTPError`."""
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            await client.get_account()
+
+    with pytest.raises(error.HTTPError) as exc_info:
+        asyncio.run(main())
+    assert exc_info.value.code == 404
+
+
+def test_async_get_daysoff(api):
+    """Assert get daysoff matches the synchronous client."""
+    employee = utils.random_employee()
+    holiday = utils.random_schema(Holiday)
+    holiday["half_day"] = None
+    employee["company_holiday_ids"] = [holiday["id"]]
+    employee["terminated_on"] = None
+    leave = utils.random_schema(Leave)
+    leave.update(
+        employee_id=employee["id"],
+        approved=True,
+        half_day=drifactorial.HALF_DAY_AM,
+        finish_on=leave["start_on"],
+    )
+    start_on = TypeAdapter(Leave).validate_python(leave).start_on
+    holiday_on = TypeAdapter(Holiday).validate_python(holiday).date
+    employee["start_date"] = str(min(start_on, holiday_on) + timedelta(-1))
+    api.routes[f"/api/v1/employees/{employee['id']}"] = (200, employee)
+    api.routes["/api/v1/company_holidays"] = (200, [holiday])
+    api.routes["/api/v1/leaves"] = (200, [leave])
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            return await client.get_daysoff(
+                employee_id=employee["id"], include_weekend=True
+            )
+
+    days_full, days_am, days_pm = asyncio.run(main())
+    assert days_full == [holiday_on]
+    assert days_am == [start_on]
+    assert days_pm == []
+
+
+def test_async_authorization_link():
+    """Assert authorization helpers are shared with the sync client."""
+    link = AsyncFactorial.obtain_authorization_link(client_id="a", redirect_uri="b")
+    assert link == drifactorial.Factorial.obtain_authorization_link(
+        client_id="a", redirect_uri="b"
+    )
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_async_pagination(api, prefetch: int):
+    """Assert list endpoints are fetched page by page."""
+    fake_leaves = [utils.random_schema(Leave) for _ in range(10)]
+    api.routes["/api/v1/leaves"] = utils.paginated_route(fake_leaves)
+
+    async def main():
+        async with AsyncFactorial(
+            access_token="abc", page_size=4, prefetch=prefetch
+        ) as client:
+            return await client.get_leaves()
+
+    leaves = asyncio.run(main())
+    assert [x.id for x in leaves] == [x["id"] for x in fake_leaves]
+    paths = [x[1] for x in api.requests]
+    for page in range(1, 4):
+        assert f"/api/v1/leaves?page={page}&limit=4" in paths
+    assert len(paths) <= 3 + prefetch
+
+
+def test_async_pagination_ignored(api):
+    """Assert pagination stops if the API ignores the page parameters."""
+    fake_leaves = [utils.random_schema(Leave) for _ in range(3)]
+    api.routes["/api/v1/leaves"] = (200, fake_leaves)
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", page_size=2) as client:
+            return await client.get_leaves()
+
+    assert [x.id for x in asyncio.run(main())] == [x["id"] for x in fake_leaves]
+    assert len(api.requests) == 2
+
+
+def test_async_get_employees_by_ids(api):
+    """Assert many employees are fetched concurrently, errors included."""
+    employee = utils.random_employee()
+    api.routes[f"/api/v1/employees/{employee['id']}"] = (200, employee)
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            return await client.get_employees_by_ids(
+                employee_ids=[0, employee["id"], 0], max_concurrency=1
+            )
+
+    result = asyncio.run(main())
+    assert list(result) == [0, employee["id"]]
+    assert isinstance(result[0], error.HTTPError)
+    assert result[employee["id"]] == TypeAdapter(Employee).validate_python(employee)
+    assert len(api.requests) == 2
+
+
+def test_async_get_shifts_range(api):
+    """Assert shifts of a range are requested by month and merged in order."""
+    api.routes["/api/v1/shifts"] = utils.monthly_route(
+        utils.random_shifts(date(2021, 1, 1), 120)
+    )
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            for _ in range(2):
+                shifts = await client.get_shifts_range(
+                    start=date(2021, 1, 15),
+                    end=date(2021, 3, 10),
+                    max_concurrency=1,
+                    cache_past=True,
+                )
+            return shifts
+
+    assert [x.id for x in asyncio.run(main())] == list(range(14, 69))
+    assert len(api.requests) == 3
+
+
+def test_async_coalesce(api):
+    """Assert identical concurrent requests share a single request."""
+    api.routes["/api/v1/company_holidays"] = (200, [utils.random_schema(Holiday)])
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", coalesce=True) as client:
+            tasks = [asyncio.create_task(client.get_holidays()) for _ in range(5)]
+            await asyncio.sleep(0)
+            # cancelling a waiting task, even the first one, does not cancel
+            # the others
+            tasks[0].cancel()
+            tasks[1].cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            assert all(isinstance(x, asyncio.CancelledError) for x in results[:2])
+            assert all(len(x) == 1 for x in results[2:])
+            await client.get_holidays()
+            # failed requests are shared too
+            api.routes["/api/v1/company_holidays"] = (503, {})
+            tasks = [asyncio.create_task(client.get_holidays()) for _ in range(2)]
+            await asyncio.sleep(0)
+            tasks[0].cancel()
+            with pytest.raises(error.HTTPError):
+                await tasks[1]
+            return client.coalesced
+
+    assert asyncio.run(main()) == 5
+    assert len(api.requests) == 3
@@ -0,0 +1,141 @@
+"""Test module for the auth module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+from urllib.error import HTTPError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.auth import TokenRefresher
+from drifactorial.schemas import Account, Token
+from tests import utils
+
+
+def _token(access_token: str, *, expires_in: int = 7200) -> Dict[str, Any]:
+    """Aux function to generate a token created now."""
+    return {
+        "access_token": access_token,
+        "token_type": "Bearer",
+        "expires_in": expires_in,
+        "refresh_token": f"refresh-{access_token}",
+        "scope": "read+write",
+        "created_at": int(time.time()),
+    }
+
+
+def _refresher(**kwargs: Any) -> TokenRefresher:
+    """Aux function to build a token refresher."""
+    return TokenRefresher(
+        client_id="id", client_secret="secret", refresh_token="refresh", **kwargs
+    )
+
+
+def test_token_refresher():
+    """Assert tokens are due for a refresh within the margin."""
+    refresher = _refresher(margin=10)
+    assert not refresher.expired()
+    refresher.expires_at = 100.0
+    assert not refresher.expired(now=89.0)
+    assert refresher.expired(now=90.0)
+    token = Token.model_validate(_token("new", expires_in=60))
+    refresher = TokenRefresher.from_token(token, client_id="id", client_secret="s")
+    assert refresher.refresh_token == "refresh-new"
+    assert refresher.expires_at == token.created_at + 60
+    assert refresher.expired(now=token.created_at)
+    with pytest.raises(ValueError):
+        _refresher(margin=-1)
+
+
+def test_factorial_refresh_expired(mocker: MockerFixture, local_server):
+    """Assert concurrent requests share a single refresh before expiry."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+
+    def token_route(path: str) -> Tuple[int, Dict[str, Any]]:
+        time.sleep(0.05)
+        return 200, _token("new")
+
+    local_server.routes["/oauth/token"] = token_route
+    local_server.routes["/api/v1/me"] = (200, utils.random_schema(Account))
+    refresher = _refresher(expires_at=time.time() + 30)
+    with Factorial(access_token="old", token_refresher=refresher) as factorial:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(factorial.get_account) for _ in range(8)]
+            for future in futures:
+                future.result()
+        assert factorial.access_token == "new"
+    assert refresher.refreshes == 1
+    assert refresher.refresh_token == "refresh-new"
+    assert not refresher.expired()
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths.count("/oauth/token") == 1
+    assert paths[0] == "/oauth/token"
+    for _, _, headers in local_server.requests[1:]:
+        assert headers["Authorization"] == "Bearer new"
+
+
+def test_factorial_refresh_unauthorized(mocker: MockerFixture, local_server):
+    """Assert requests rejected as unauthorized are replayed once."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    local_server.routes["/oauth/token"] = (200, _token("new"))
+
+    def me_route(path: str) -> Tuple[int, Dict[str, Any]]:
+        _, _, headers = local_server.requests[-1]
+        if headers["Authorization"] == "Bearer new":
+            return 200, utils.random_schema(Account)
+        return 401, {}
+
+    local_server.routes["/api/v1/me"] = me_route
+    refresher = _refresher()
+    with Factorial(access_token="old", token_refresher=refresher) as factorial:
+        factorial.get_account()
+        assert [path for _, path, _ in local_server.requests] == [
+            "/api/v1/me",
+            "/oauth/token",
+            "/api/v1/me",
+        ]
+        assert refresher.refreshes == 1
+        # a token that is still rejected after a refresh is not retried again
+        local_server.routes["/api/v1/me"] = (401, {})
+        with pytest.raises(HTTPError):
+            factorial.get_account()
+        assert len(local_server.requests) == 6
+    # without refresher, nothing is refreshed
+    with Factorial(access_token="old") as factorial:
+        with pytest.raises(HTTPError):
+            factorial.get_account()
+    assert len(local_server.requests) == 7
+
+
+def test_async_factorial_refresh(mocker: MockerFixture, local_server):
+    """Assert concurrent tasks share a single refresh."""
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes["/oauth/token"] = (200, _token("new"))
+
+    def me_route(path: str) -> Tuple[int, Dict[str, Any]]:
+        _, _, headers = local_server.requests[-1]
+        if headers["Authorization"] == "Bearer new":
+            return 200, utils.random_schema(Account)
+        return 401, {}
+
+    local_server.routes["/api/v1/me"] = me_route
+    refresher = _refresher(expires_at=time.time())
+
+    async def main():
+        async with AsyncFactorial(
+            access_token="old", token_refresher=refresher
+        ) as client:
+            await asyncio.gather(*(client.get_account() for _ in range(5)))
+            return client.access_token
+
+    assert asyncio.run(main()) == "new"
+    assert refresher.refreshes == 1
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths == ["/oauth/token"] + ["/api/v1/me"] * 5
@@ -0,0 +1,52 @@
+"""Test module for the benchmarks.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import json
+from pathlib import Path
+
+from benchmarks.data import Scale, generate
+from benchmarks.run import SCENARIOS, compare, main
+from drifactorial.schemas import Employee, Holiday, Leave, Shift
+
+
+def test_generate():
+    """Assert datasets are valid and reproducible."""
+    scale = Scale(employees=5, leaves=2, shifts=3, locations=2, holidays=4, years=1)
+    dataset = generate(scale)
+    assert len(dataset.employees) == 5
+    assert len(dataset.holidays) == 2 * 4
+    assert len(dataset.leaves) == 5 * 2
+    assert len(dataset.shifts) == 5 * 3
+    for schema, items in (
+        (Employee, dataset.employees),
+        (Holiday, dataset.holidays),
+        (Leave, dataset.leaves),
+        (Shift, dataset.shifts),
+    ):
+        for item in items:
+            schema.model_validate(item)
+    assert generate(scale) == dataset
+    assert generate(scale, seed=1) != dataset
+
+
+def test_main(tmp_path: Path):
+    """Assert all scenarios are measured, saved and compared."""
+    output = tmp_path / "results.json"
+    argv = ["--employees", "3", "--leaves", "2", "--shifts", "2", "--years", "1"]
+    argv += ["--repeat", "2", "--burst", "4", "--concurrency", "2"]
+    assert main([*argv, "--output", f"{output}"]) == 0
+    results = json.loads(output.read_text())
+    assert set(results["results"]) == set(SCENARIOS)
+    for result in results["results"].values():
+        assert result["operations"] > 0
+        assert result["items"] > 0
+        assert result["peak_memory"] > 0
+        assert 0 < result["latency"]["p50"] <= result["latency"]["p99"]
+    assert compare(results, results, max_regression=0.0) == []
+
+    baseline = json.loads(output.read_text())
+    baseline["results"]["get_leaves"]["peak_memory"] /= 2
+    regressions = compare(results, baseline, max_regression=0.5)
+    assert regressions == ["get_leaves peak memory +100.0%"]
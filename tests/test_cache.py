@@ -0,0 +1,126 @@
+"""Test module for the cache module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import json
+import time
+from datetime import datetime
+from io import StringIO
+
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.cache import ResponseCache, cache_key
+from drifactorial.schemas import Holiday, Shift
+from tests import utils
+
+
+def test_cache_key():
+    """Assert cache keys do not depend on the order of parameters."""
+    assert cache_key("shifts", {"year": "2021", "month": "1"}) == cache_key(
+        "shifts", {"month": 1, "year": 2021}
+    )
+    assert cache_key("shifts") == cache_key("shifts", {})
+    assert cache_key("shifts") != cache_key("leaves")
+
+
+def test_cache_ttl():
+    """Assert entries expire and endpoints without TTL are not cached."""
+    cache = ResponseCache(ttl={"employees": 0.01})
+    cache.set(cache_key("employees"), b"[]")
+    cache.set(cache_key("employees/1"), b"{}")
+    cache.set(cache_key("leaves"), b"[]")
+    assert len(cache) == 2
+    assert cache.get(cache_key("employees")) == b"[]"
+    assert cache.get(cache_key("employees/1")) == b"{}"
+    assert cache.get(cache_key("leaves")) is None
+    time.sleep(0.02)
+    assert cache.get(cache_key("employees")) is None
+    assert cache.hits == 2
+    assert cache.misses == 2
+    # a TTL of the entry overrides the one of the endpoint
+    cache.set(cache_key("leaves"), b"[]", ttl=0.01)
+    cache.set(cache_key("employees"), b"[]", ttl=60)
+    time.sleep(0.02)
+    assert cache.get(cache_key("leaves")) is None
+    assert cache.get(cache_key("employees")) == b"[]"
+
+
+def test_cache_eviction():
+    """Assert least recently used entries are evicted first."""
+    cache = ResponseCache(ttl={"employees": 60}, maxsize=2, max_bytes=10)
+    for i in range(3):
+        cache.set(cache_key(f"employees/{i}"), b"ab")
+        cache.get(cache_key("employees/0"))
+    assert cache.get(cache_key("employees/0")) == b"ab"
+    assert cache.get(cache_key("employees/1")) is None
+    assert cache.get(cache_key("employees/2")) == b"ab"
+    cache.set(cache_key("employees/3"), b"abcdefgh")
+    assert len(cache) == 2
+    assert cache.size == 10
+    assert cache.get(cache_key("employees/2")) == b"ab"
+    cache.set(cache_key("employees/4"), b"too large to fit")
+    assert cache.get(cache_key("employees/4")) is None
+
+
+def test_cache_invalidate():
+    """Assert invalidation only drops the matching entries."""
+    cache = ResponseCache(ttl={"shifts": 60, "employees": 60})
+    cache.set(cache_key("shifts"), b"[]")
+    cache.set(cache_key("shifts", {"year": 2021, "month": 1}), b"[]")
+    cache.set(cache_key("shifts", {"year": 2021, "month": 2}), b"[]")
+    cache.set(cache_key("shifts", {"employee_id": 2}), b"[]")
+    cache.set(cache_key("employees"), b"[]")
+    cache.set(cache_key("employees/1"), b"{}")
+    assert cache.invalidate("shifts", year=2021, month=1, employee_id=1) == 2
+    assert cache.get(cache_key("shifts", {"year": 2021, "month": 2})) == b"[]"
+    assert cache.get(cache_key("shifts", {"employee_id": 2})) == b"[]"
+    assert cache.invalidate("employees") == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_factorial_cache(mocker: MockerFixture):
+    """Assert the client serves cached responses and invalidates shifts."""
+    holidays = [utils.random_schema(Holiday)]
+    shift = utils.random_schema(Shift)
+    urlopen = mocker.patch(
+        "drifactorial.transport.ConnectionPool.urlopen",
+        side_effect=lambda *args: StringIO(json.dumps(holidays)),
+    )
+    cache = ResponseCache(ttl={"company_holidays": 60, "shifts": 60})
+    factorial = Factorial(access_token=utils.random_lower_string(), cache=cache)
+    assert factorial.get_holidays() == factorial.get_holidays()
+    assert urlopen.call_count == 1
+
+    urlopen.side_effect = lambda *args: StringIO(json.dumps([shift]))
+    factorial.get_shifts(year=2021, month=1)
+    factorial.get_shifts(year=2021, month=2)
+    factorial.get_shifts(year=2021, month=1)
+    assert urlopen.call_count == 3
+
+    # an overnight shift, clocked out the next month
+    shift.update(year=2021, month=1, day=31, employee_id=1)
+    urlopen.side_effect = lambda *args: StringIO(json.dumps(shift))
+    factorial.clock_in(now=datetime(2021, 1, 31, 22), employee_id=1)
+    assert len(cache) == 2
+    urlopen.side_effect = lambda *args: StringIO(json.dumps([shift]))
+    factorial.get_shifts(year=2021, month=1)
+    urlopen.side_effect = lambda *args: StringIO(json.dumps(shift))
+    factorial.clock_out(now=datetime(2021, 2, 1, 6), employee_id=1)
+    assert len(cache) == 2
+    assert urlopen.call_count == 6
+    urlopen.side_effect = lambda *args: StringIO(json.dumps([shift]))
+    factorial.get_shifts(year=2021, month=2)
+    assert urlopen.call_count == 6
+    factorial.get_shifts(year=2021, month=1)
+    assert urlopen.call_count == 7
+
+    # no cache by default
+    factorial = Factorial(access_token=utils.random_lower_string())
+    urlopen.side_effect = lambda *args: StringIO(json.dumps(holidays))
+    factorial.get_holidays()
+    factorial.get_holidays()
+    assert urlopen.call_count == 9
@@ -0,0 +1,115 @@
+"""Test module for the columnar module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import tracemalloc
+from datetime import date, time
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.columnar import NULL, LeaveColumns, LeaveRow, ShiftColumns
+from drifactorial.schemas import Leave, Shift
+from tests import utils
+
+
+def _shifts(n: int) -> List[Shift]:
+    """Aux function to generate shifts, some of them open."""
+    shifts = []
+    for k in range(n):
+        shift = utils.random_schema(Shift)
+        shift.update(id=k, observations=None if k % 3 else "remote")
+        if k % 4 == 0:
+            shift["clock_out"] = None
+        shifts.append(shift)
+    return TypeAdapter(List[Shift]).validate_python(shifts)
+
+
+def test_shift_columns():
+    """Assert shifts are stored in typed arrays and decoded back."""
+    shifts = _shifts(100)
+    columns = ShiftColumns(iter(shifts))
+    assert len(columns) == 100
+    assert columns.column("year").typecode == "i"
+    assert columns.column("clock_in").typecode == "i"
+    assert columns.column("clock_out")[0] == NULL
+    assert list(columns.column("employee_id")) == [x.employee_id for x in shifts]
+    assert columns.strings == ["remote"]
+    assert columns[-1].id == 99
+    assert columns[0].clock_out is None
+    assert [x.to_model() for x in columns] == shifts
+    assert columns.to_models() == shifts
+    # seconds are kept
+    shift = shifts[1].model_copy(update={"clock_in": time(8, 30, 15)})
+    columns.append(shift)
+    assert columns[100].clock_in == time(8, 30, 15)
+    # microseconds are truncated
+    columns.append(shift.model_copy(update={"clock_in": time(8, 30, 15, 999999)}))
+    assert columns[101].to_model().clock_in == time(8, 30, 15)
+    # objects that do not fit are not added
+    with pytest.raises(OverflowError):
+        columns.append(shift.model_copy(update={"day": 2**40}))
+    assert {len(columns.column(x)) for x in Shift.model_fields} == {102}
+
+
+def test_leave_columns():
+    """Assert leaves keep missing values and texts."""
+    raw = [utils.random_schema(Leave) for _ in range(10)]
+    raw[0].update(approved=None, description=None)
+    raw[1].update(employee_full_name=raw[2]["employee_full_name"])
+    leaves = TypeAdapter(List[Leave]).validate_python(raw)
+    columns = LeaveColumns(leaves)
+    assert columns.column("start_on")[0] == leaves[0].start_on.toordinal()
+    assert columns.strings.count(raw[2]["employee_full_name"]) == 1
+    row = columns[0]
+    assert isinstance(row, LeaveRow)
+    assert row.approved is None and row.description is None
+    assert isinstance(columns[1].start_on, date)
+    assert columns.to_models() == leaves
+    assert not hasattr(row, "__dict__")
+
+
+def test_columns_memory():
+    """Assert columns take a fraction of the memory of schema objects."""
+    tracemalloc.start()
+    try:
+        shifts = _shifts(2000)
+        models, _ = tracemalloc.get_traced_memory()
+        columns = ShiftColumns(shifts)
+        total, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(columns) == 2000
+    assert total - models < models / 5
+
+
+def test_factorial_columns(mocker: MockerFixture, local_server):
+    """Assert clients return shifts and leaves as columns."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    shifts = [utils.random_schema(Shift) for _ in range(20)]
+    leaves = [utils.random_schema(Leave) for _ in range(20)]
+    shifts[0]["employee_id"] = leaves[0]["employee_id"] = 7
+    local_server.routes["/api/v1/shifts"] = (200, shifts)
+    local_server.routes["/api/v1/leaves"] = (200, leaves)
+    with Factorial(access_token="abc") as factorial:
+        assert factorial.get_shift_columns().to_models() == factorial.get_shifts()
+        columns = factorial.get_leave_columns(employee_id=7)
+        assert columns.to_models() == factorial.get_leaves(employee_id=7)
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            return (
+                await client.get_shift_columns(employee_id=7),
+                await client.get_leave_columns(),
+            )
+
+    shift_columns, leave_columns = asyncio.run(main())
+    assert list(shift_columns.column("employee_id")) == [7]
+    assert len(leave_columns) == 20
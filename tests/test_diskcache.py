@@ -0,0 +1,112 @@
+"""Test module for the diskcache module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import List
+
+from pydantic import TypeAdapter
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.diskcache import DiskCache
+from drifactorial.schemas import Employee, Holiday
+from tests import utils
+
+
+def _employees(n: int) -> List[Employee]:
+    """Aux function to generate employees."""
+    raw = [utils.random_employee(hiring_cents=100) for _ in range(n)]
+    return TypeAdapter(List[Employee]).validate_python(raw)
+
+
+def test_disk_cache(tmp_path, mocker: MockerFixture):
+    """Assert objects are stored until they expire."""
+    cache = DiskCache(tmp_path / "cache", ttl={"employees": 60})
+    employees = _employees(10)
+    assert cache.get("employees", List[Employee]) is None
+    cache.set("employees", List[Employee], employees)
+    # endpoints without a TTL are not stored
+    cache.set("company_holidays", List[Holiday], [])
+    assert [x.name for x in (tmp_path / "cache").iterdir()] == ["employees.bin"]
+    # shared with other instances, e.g. in other processes
+    other = DiskCache(tmp_path / "cache", ttl={"employees": 60})
+    assert other.get("employees", List[Employee]) == employees
+    assert (cache.hits, cache.misses, other.hits) == (0, 1, 1)
+    mocker.patch("drifactorial.diskcache.time.time", return_value=time.time() + 61)
+    assert cache.get("employees", List[Employee]) is None
+    assert cache.invalidate() == 1
+    assert cache.invalidate() == 0
+
+
+def test_disk_cache_invalid(tmp_path):
+    """Assert files of other schemas or corrupted are ignored."""
+    cache = DiskCache(tmp_path, ttl={"employees": 60})
+    cache.set("employees", List[Employee], _employees(2))
+    assert cache.get("employees", List[Holiday]) is None
+    path = tmp_path / "employees.bin"
+    path.write_bytes(path.read_bytes()[:60])
+    assert cache.get("employees", List[Employee]) is None
+    path.write_bytes(b"DRFC")
+    assert cache.get("employees", List[Employee]) is None
+
+
+def test_disk_cache_concurrent(tmp_path):
+    """Assert readers never see partially written files."""
+    cache = DiskCache(tmp_path, ttl={"employees": 60})
+    versions = [_employees(50) for _ in range(4)]
+
+    def write(n: int) -> None:
+        for _ in range(5):
+            cache.set("employees", List[Employee], versions[n])
+
+    def read(n: int) -> None:
+        for _ in range(20):
+            loaded = cache.get("employees", List[Employee])
+            assert loaded is None or loaded in versions
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(write, x) for x in range(4)]
+        futures += [executor.submit(read, x) for x in range(4)]
+        for future in futures:
+            future.result()
+    assert [x.name for x in tmp_path.iterdir()] == ["employees.bin"]
+
+
+def test_factorial_disk_cache(mocker: MockerFixture, local_server, tmp_path):
+    """Assert warm clients load employees and holidays from disk."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    holidays = [utils.random_schema(Holiday) for _ in range(10)]
+    holidays[0]["date"] = "2021-06-01"
+    local_server.routes["/api/v1/employees"] = (200, [utils.random_employee()])
+    local_server.routes["/api/v1/company_holidays"] = (200, holidays)
+    june = {"start": date(2021, 6, 1), "end": date(2021, 6, 30)}
+    with Factorial(access_token="abc", disk_cache=DiskCache(tmp_path)) as factorial:
+        employees = factorial.get_employees()
+        assert holidays[0]["id"] in [x.id for x in factorial.get_holidays(**june)]
+    assert len(local_server.requests) == 2
+    # the whole list is requested, and filtered locally
+    assert local_server.requests[1][1] == "/api/v1/company_holidays"
+
+    with Factorial(access_token="abc", disk_cache=DiskCache(tmp_path)) as factorial:
+        assert factorial.get_employees() == employees
+        assert len(factorial.get_holidays()) == 10
+        assert all(
+            june["start"] <= x.date <= june["end"]
+            for x in factorial.get_holidays(**june)
+        )
+
+    async def main():
+        async with AsyncFactorial(
+            access_token="abc", disk_cache=DiskCache(tmp_path)
+        ) as client:
+            return await client.get_employees(), await client.get_holidays()
+
+    assert asyncio.run(main())[0] == employees
+    assert len(local_server.requests) == 2
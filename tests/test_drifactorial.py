@@ -5,9 +5,12 @@ Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, time, timedelta
 from io import StringIO
-from typing import List, Optional
+from time import sleep
+from typing import Any, List, Optional, Tuple
+from urllib.error import HTTPError
 
 import pytest
 from pydantic import TypeAdapter
@@ -16,6 +19,7 @@ from pytest_mock import MockerFixture
 
 import drifactorial
 from drifactorial import Factorial
+from drifactorial.metrics import ParseEvent
 from drifactorial.schemas import Account, Employee, Hiring, Holiday, Leave, Shift, Token
 from tests import utils
 
@@ -41,11 +45,20 @@ def test_daterange():
     assert len(dates) == 27
 
 
+def test_adapter():
+    """Assert schema adapters are built only once."""
+    assert drifactorial._adapter(List[Leave]) is drifactorial._adapter(List[Leave])
+    assert drifactorial._adapter(Leave) is not drifactorial._adapter(List[Leave])
+    raw = json.dumps([utils.random_schema(Leave)]).encode("utf-8")
+    leaves = drifactorial._adapter(List[Leave]).validate_json(raw)
+    assert leaves == [TypeAdapter(Leave).validate_python(json.loads(raw)[0])]
+
+
 def test_get_holidays(mocker: MockerFixture):
     """Assert get holidays method."""
     fake_response_holidays = [utils.random_schema(Holiday)]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_holidays)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -70,26 +83,26 @@ def test_get_holidays(mocker: MockerFixture):
     fake_date = TypeAdapter(date).validate_python(fake_response_holidays[0]["date"])
     # test filter start
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_holidays)),
     )
     holidays = factorial.get_holidays(start=fake_date + timedelta(-1))
     assert len(holidays) == 1
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_holidays)),
     )
     holidays = factorial.get_holidays(start=fake_date + timedelta(1))
     assert len(holidays) == 0
     # test filter end
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_holidays)),
     )
     holidays = factorial.get_holidays(end=fake_date + timedelta(1))
     assert len(holidays) == 1
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_holidays)),
     )
     holidays = factorial.get_holidays(end=fake_date + timedelta(-1))
@@ -100,7 +113,7 @@ def test_get_leaves(mocker: MockerFixture):
     """Assert get leaves method."""
     fake_response_leaves = [utils.random_schema(Leave)]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -125,13 +138,13 @@ def test_get_leaves(mocker: MockerFixture):
     # test filter employee
     employee_id = fake_response_leaves[0]["employee_id"]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(employee_id=employee_id)
     assert len(leaves) == 1
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(employee_id=employee_id + 1)
@@ -140,13 +153,13 @@ def test_get_leaves(mocker: MockerFixture):
     # test filter start
     fake_date = TypeAdapter(date).validate_python(fake_response_leaves[0]["finish_on"])
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(start=fake_date + timedelta(1))
     assert len(leaves) == 0
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(start=fake_date + timedelta(-1))
@@ -155,13 +168,13 @@ def test_get_leaves(mocker: MockerFixture):
     # test filter end
     fake_date = TypeAdapter(date).validate_python(fake_response_leaves[0]["start_on"])
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(end=fake_date + timedelta(1))
     assert len(leaves) == 1
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_leaves)),
     )
     leaves = factorial.get_leaves(end=fake_date + timedelta(-1))
@@ -176,7 +189,7 @@ def test_get_employees(mocker: MockerFixture, hiring_cents: int, hiring_type: st
         utils.random_employee(hiring_cents=hiring_cents, hiring_type=hiring_type)
     ]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_employees)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -216,7 +229,7 @@ def test_get_shifts(
     """Assert get shifts method."""
     fake_response_shifts = [utils.random_schema(Shift)]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_shifts)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -248,13 +261,13 @@ def test_get_shifts(
     # test filter employee
     employee_id = fake_response_shifts[0]["employee_id"]
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_shifts)),
     )
     shifts = factorial.get_shifts(employee_id=employee_id)
     assert len(shifts) == 1
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_shifts)),
     )
     shifts = factorial.get_shifts(employee_id=employee_id + 1)
@@ -265,7 +278,7 @@ def test_get_account(mocker: MockerFixture):
     """Assert get account method."""
     fake_response_account = utils.random_schema(Account)
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_account)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -287,7 +300,7 @@ def test_get_single_employee(
         hiring_cents=hiring_cents, hiring_type=hiring_type
     )
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_single_employee)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -316,11 +329,33 @@ def test_get_single_employee(
             assert getattr(single_employee, field) == value  # type: ignore
 
 
+def test_get_employees_by_ids(mocker: MockerFixture, local_server):
+    """Assert many employees are fetched concurrently, errors included."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    employees = {x: utils.random_employee() for x in range(1, 6)}
+    for employee_id, employee in employees.items():
+        employee["id"] = employee_id
+        local_server.routes[f"/api/v1/employees/{employee_id}"] = (200, employee)
+    local_server.routes["/api/v1/employees/7"] = (200, {"id": "invalid"})
+    ids = [3, 1, 404, 3, 7, 5, 2, 4, 1]
+    with Factorial(access_token=utils.random_lower_string()) as factorial:
+        result = factorial.get_employees_by_ids(employee_ids=ids, max_concurrency=3)
+        assert factorial.get_employees_by_ids(employee_ids=[]) == {}
+        with pytest.raises(ValueError):
+            factorial.get_employees_by_ids(employee_ids=ids, max_concurrency=0)
+    assert list(result) == [3, 1, 404, 7, 5, 2, 4]
+    for employee_id, employee in employees.items():
+        assert result[employee_id] == TypeAdapter(Employee).validate_python(employee)
+    assert isinstance(result[404], HTTPError)
+    assert isinstance(result[7], ValueError)
+    assert len(local_server.requests) == 7
+
+
 def test_clock_in(mocker: MockerFixture):
     """Assert clock in method."""
     fake_response_clock_in = utils.random_schema(Shift)
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_clock_in)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -348,7 +383,7 @@ def test_clock_out(mocker: MockerFixture):
     """Assert clock out method."""
     fake_response_clock_in = utils.random_schema(Shift)
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_clock_in)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -403,7 +438,7 @@ def test_obtain_access_token(mocker: MockerFixture):
     """Assert obtain acces token method."""
     fake_response_obtain_token = utils.random_schema(Token)
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_obtain_token)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -422,7 +457,7 @@ def test_refresh_access_token(mocker: MockerFixture):
     """Assert obtain acces token method."""
     fake_response_obtain_token = utils.random_schema(Token)
     mocker.patch(
-        "drifactorial.request.urlopen",
+        "drifactorial.transport.ConnectionPool.urlopen",
         return_value=StringIO(json.dumps(fake_response_obtain_token)),
     )
     factorial = Factorial(access_token=utils.random_lower_string())
@@ -701,3 +736,471 @@ def test_get_daysoff(mocker: MockerFixture):
     assert len(daysoff) == 3
     for el in daysoff:
         assert len(el) == 0
+
+
+def test_get_daysoff_compact(mocker: MockerFixture):
+    """Assert compact days off are merged intervals of the same days."""
+    employee = TypeAdapter(Employee).validate_python(utils.random_employee())
+    employee.start_date = date(2021, 1, 1)
+    employee.terminated_on = None
+    employee.company_holiday_ids = (1,)
+    holiday = utils.random_schema(Holiday)
+    holiday.update(id=1, date="2021-01-06", half_day=None)
+    leaves = [utils.random_schema(Leave) for _ in range(3)]
+    for leave, (start_on, finish_on) in zip(
+        leaves,
+        [
+            ("2021-01-07", "2021-01-12"),
+            ("2021-01-04", "2021-01-05"),
+            ("2021-03-01", "2051-03-01"),
+        ],
+    ):
+        leave.update(
+            approved=True,
+            employee_id=employee.id,
+            start_on=start_on,
+            finish_on=finish_on,
+            half_day=None,
+        )
+    mocker.patch("drifactorial.Factorial.get_single_employee", return_value=employee)
+    mocker.patch(
+        "drifactorial.Factorial.get_holidays",
+        return_value=TypeAdapter(List[Holiday]).validate_python([holiday]),
+    )
+    mocker.patch(
+        "drifactorial.Factorial.get_leaves",
+        return_value=TypeAdapter(List[Leave]).validate_python(leaves),
+    )
+    factorial = Factorial(access_token=utils.random_lower_string())
+    end = date(2021, 3, 3)
+    full, am, pm = factorial.get_daysoff(employee_id=employee.id, end=end, compact=True)
+    assert full == [
+        (date(2021, 1, 4), date(2021, 1, 8)),
+        (date(2021, 1, 11), date(2021, 1, 12)),
+        (date(2021, 3, 1), date(2021, 3, 3)),
+    ]
+    assert am == pm == []
+    days = factorial.get_daysoff(employee_id=employee.id, end=end)
+    assert days[0] == [y for x in full for y in drifactorial.daterange(*x)]
+    full, _, _ = factorial.get_daysoff(
+        employee_id=employee.id, end=end, include_weekend=True, compact=True
+    )
+    assert full == [
+        (date(2021, 1, 4), date(2021, 1, 12)),
+        (date(2021, 3, 1), date(2021, 3, 3)),
+    ]
+
+
+def test_get_daysoff_bulk(mocker: MockerFixture):
+    """Assert bulk get daysoff method."""
+    employees = [
+        TypeAdapter(Employee).validate_python(utils.random_employee()) for _ in range(3)
+    ]
+    for i, employee in enumerate(employees):
+        employee.id = i + 1
+    holidays = [
+        TypeAdapter(Holiday).validate_python(utils.random_schema(Holiday))
+        for _ in range(6)
+    ]
+    leaves = [
+        TypeAdapter(Leave).validate_python(utils.random_schema(Leave))
+        for _ in range(12)
+    ]
+    for i, holiday in enumerate(holidays):
+        holiday.id = i + 1
+        holiday.half_day = [None, drifactorial.HALF_DAY_AM, drifactorial.HALF_DAY_PM][
+            i % 3
+        ]
+    for i, leave in enumerate(leaves):
+        leave.employee_id = employees[i % 3].id
+        leave.approved = i % 4 != 0
+        leave.half_day = [None, drifactorial.HALF_DAY_AM, drifactorial.HALF_DAY_PM][
+            i % 3
+        ]
+        leave.finish_on = leave.start_on + timedelta(i % 5)
+    first_day = min(
+        [x.date for x in holidays] + [x.start_on for x in leaves]
+    ) + timedelta(-1)
+    for i, employee in enumerate(employees):
+        employee.company_holiday_ids = (i + 1, i + 2, i + 4)
+        employee.start_date = first_day
+        employee.terminated_on = None
+    employees[2].terminated_on = date.today()
+
+    def fake_get_leaves(*, start=None, end=None, employee_id=None):
+        return [
+            x
+            for x in leaves
+            if (start is None or x.finish_on >= start)
+            and (end is None or x.start_on <= end)
+            and (employee_id is None or x.employee_id == employee_id)
+        ]
+
+    def fake_get_holidays(*, start=None, end=None):
+        return [
+            x
+            for x in holidays
+            if (start is None or x.date >= start) and (end is None or x.date <= end)
+        ]
+
+    by_id = {x.id: x for x in employees}
+    mock_employees = mocker.patch(
+        "drifactorial.Factorial.get_employees", return_value=employees
+    )
+    mocker.patch(
+        "drifactorial.Factorial.get_single_employee",
+        side_effect=lambda *, employee_id: by_id[employee_id],
+    )
+    mock_leaves = mocker.patch(
+        "drifactorial.Factorial.get_leaves", side_effect=fake_get_leaves
+    )
+    mock_holidays = mocker.patch(
+        "drifactorial.Factorial.get_holidays", side_effect=fake_get_holidays
+    )
+    factorial = Factorial(access_token=utils.random_lower_string())
+    for include_weekend in [True, False]:
+        mock_leaves.reset_mock()
+        mock_holidays.reset_mock()
+        daysoff = factorial.get_daysoff_bulk(include_weekend=include_weekend)
+        assert mock_leaves.call_count == 1
+        assert mock_holidays.call_count == 1
+        assert list(daysoff) == [x.id for x in employees]
+        for employee in employees:
+            assert daysoff[employee.id] == factorial.get_daysoff(
+                employee_id=employee.id, include_weekend=include_weekend
+            )
+
+    # select and deduplicate employee ids
+    mock_employees.reset_mock()
+    daysoff = factorial.get_daysoff_bulk(employee_ids=[3, 1, 3])
+    assert mock_employees.call_count == 1
+    assert list(daysoff) == [3, 1]
+
+    # filter dates
+    start = first_day + timedelta(days=365)
+    daysoff = factorial.get_daysoff_bulk(start=start, include_weekend=True)
+    for employee in employees:
+        assert daysoff[employee.id] == factorial.get_daysoff(
+            employee_id=employee.id, start=start, include_weekend=True
+        )
+        for el in daysoff[employee.id]:
+            assert all(x >= start for x in el)
+
+    # unknown employee
+    with pytest.raises(ValueError):
+        factorial.get_daysoff_bulk(employee_ids=[4])
+    assert factorial.get_daysoff_bulk(employee_ids=[]) == {}
+
+
+def test_server_filters(mocker: MockerFixture, local_server):
+    """Assert supported filters are sent to the API as query parameters."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    leave = utils.random_schema(Leave)
+    local_server.routes["/api/v1/leaves"] = (200, [leave])
+    local_server.routes["/api/v1/company_holidays"] = (200, [])
+    local_server.routes["/api/v1/shifts"] = (200, [])
+    factorial = Factorial(access_token=utils.random_lower_string())
+    leaves = factorial.get_leaves(
+        start="2021-01-01", end=date(2021, 1, 31), employee_id=leave["employee_id"]
+    )
+    factorial.get_holidays(start=date(2021, 1, 1))
+    factorial.get_shifts(year=2021, month=1, employee_id=3)
+    paths = [x[1] for x in local_server.requests]
+    assert paths == [
+        f"/api/v1/leaves?from=2021-01-01&to=2021-01-31&employee_id={leave['employee_id']}",
+        "/api/v1/company_holidays",
+        "/api/v1/shifts?year=2021&month=1&employee_id=3",
+    ]
+    # client-side filters are still applied
+    start_on = TypeAdapter(date).validate_python(leave["start_on"])
+    finish_on = TypeAdapter(date).validate_python(leave["finish_on"])
+    assert len(leaves) == int(
+        finish_on >= date(2021, 1, 1) and start_on <= date(2021, 1, 31)
+    )
+
+    # disabled server filters
+    local_server.requests.clear()
+    factorial = Factorial(
+        access_token=utils.random_lower_string(), server_filters=False
+    )
+    leaves = factorial.get_leaves(employee_id=leave["employee_id"])
+    assert len(leaves) == 1
+    assert local_server.requests[0][1] == "/api/v1/leaves"
+
+
+def test_server_filters_rejected(mocker: MockerFixture, local_server):
+    """Assert rejected filters degrade to client-side filtering."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    leaves = [utils.random_schema(Leave) for _ in range(2)]
+    leaves[1]["employee_id"] = leaves[0]["employee_id"] + 1
+    employee_id = leaves[0]["employee_id"]
+    errors = [{"error": "Invalid request"}]
+
+    def reject_params(path):
+        if "?" in path:
+            return 400, errors[-1]
+        return 200, leaves
+
+    local_server.routes["/api/v1/leaves"] = reject_params
+    factorial = Factorial(access_token=utils.random_lower_string())
+    # errors that do not name a filter are not remembered
+    for _ in range(2):
+        parsed = factorial.get_leaves(employee_id=employee_id)
+        assert [x.id for x in parsed] == [leaves[0]["id"]]
+    # filters named as not supported are disabled
+    errors.append({"errors": {"employee_id": ["is not permitted"]}})
+    for _ in range(2):
+        parsed = factorial.get_leaves(employee_id=employee_id)
+        assert [x.id for x in parsed] == [leaves[0]["id"]]
+    errors.append({"error": "Unknown parameter: to"})
+    for _ in range(2):
+        factorial.get_leaves(start="2021-01-01", end="2021-01-31")
+    paths = [x[1] for x in local_server.requests]
+    assert paths == [
+        f"/api/v1/leaves?employee_id={employee_id}",
+        "/api/v1/leaves",
+        f"/api/v1/leaves?employee_id={employee_id}",
+        "/api/v1/leaves",
+        f"/api/v1/leaves?employee_id={employee_id}",
+        "/api/v1/leaves",
+        "/api/v1/leaves",
+        "/api/v1/leaves?from=2021-01-01&to=2021-01-31",
+        "/api/v1/leaves",
+        "/api/v1/leaves?from=2021-01-01",
+        "/api/v1/leaves",
+    ]
+
+    # other errors are raised
+    local_server.routes["/api/v1/leaves"] = (500, {})
+    with pytest.raises(HTTPError):
+        Factorial(access_token=utils.random_lower_string()).get_leaves(employee_id=1)
+
+
+def test_iter_methods(mocker: MockerFixture):
+    """Assert streaming methods yield the same objects as list methods."""
+    fake_leaves = [utils.random_schema(Leave) for _ in range(20)]
+    fake_shifts = [utils.random_schema(Shift) for _ in range(20)]
+    fake_employees = [utils.random_employee() for _ in range(5)]
+    for i in range(10):
+        fake_leaves[i]["employee_id"] = fake_shifts[i]["employee_id"] = 1
+    urlopen = mocker.patch("drifactorial.transport.ConnectionPool.urlopen")
+    factorial = Factorial(access_token=utils.random_lower_string())
+
+    def check(fake, get, iterate, **filters):
+        urlopen.side_effect = lambda *args: StringIO(json.dumps(fake))
+        iterator = iterate(**filters)
+        assert not isinstance(iterator, list)
+        assert list(iterator) == get(**filters)
+
+    check(fake_employees, factorial.get_employees, factorial.iter_employees)
+    check(fake_shifts, factorial.get_shifts, factorial.iter_shifts)
+    check(fake_shifts, factorial.get_shifts, factorial.iter_shifts, employee_id=1)
+    check(fake_shifts, factorial.get_shifts, factorial.iter_shifts, year=2021, month=1)
+    check(fake_leaves, factorial.get_leaves, factorial.iter_leaves)
+    check(fake_leaves, factorial.get_leaves, factorial.iter_leaves, employee_id=1)
+    dates = sorted(
+        TypeAdapter(date).validate_python(x["start_on"]) for x in fake_leaves
+    )
+    check(
+        fake_leaves,
+        factorial.get_leaves,
+        factorial.iter_leaves,
+        start=dates[5],
+        end=dates[15],
+    )
+    assert len(list(factorial.iter_leaves(employee_id=1))) == 10
+
+
+def test_iter_early_close(mocker: MockerFixture, local_server):
+    """Assert streaming methods read lazily and release the connection."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    local_server.routes["/api/v1/leaves"] = (
+        200,
+        [utils.random_schema(Leave) for _ in range(2000)],
+    )
+    local_server.routes["/api/v1/me"] = (200, utils.random_schema(Account))
+    with Factorial(access_token=utils.random_lower_string()) as factorial:
+        leaves = factorial.iter_leaves()
+        assert isinstance(next(leaves), Leave)
+        leaves.close()
+        factorial.get_account()
+        assert sum(1 for _ in factorial.iter_leaves()) == 2000
+        factorial.get_account()
+    # the unread response is discarded, the fully read one is reused
+    assert local_server.connections == 2
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_pagination(mocker: MockerFixture, local_server, prefetch: int):
+    """Assert list endpoints are fetched page by page."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    fake_leaves = [utils.random_schema(Leave) for _ in range(10)]
+    fake_employees = [utils.random_employee() for _ in range(3)]
+    local_server.routes["/api/v1/leaves"] = utils.paginated_route(fake_leaves)
+    local_server.routes["/api/v1/employees"] = utils.paginated_route(fake_employees)
+    events: List[Any] = []
+    with Factorial(
+        access_token=utils.random_lower_string(),
+        page_size=3,
+        prefetch=prefetch,
+        server_filters=False,
+        hooks=[events.append],
+    ) as factorial:
+        leaves = factorial.get_leaves()
+        assert [x.id for x in leaves] == [x["id"] for x in fake_leaves]
+        # each page is parsed once, as it arrives, and counted as parsed
+        parsed = [x.items for x in events if isinstance(x, ParseEvent)]
+        assert parsed == [3, 3, 3, 1]
+        assert [x.id for x in factorial.iter_leaves()] == [x.id for x in leaves]
+        assert len(factorial._get(endpoint="leaves")) == len(fake_leaves)
+        employees = factorial.get_employees()
+        assert [x.id for x in employees] == [x["id"] for x in fake_employees]
+    paths = [x[1] for x in local_server.requests]
+    for page in range(1, 5):
+        assert f"/api/v1/leaves?page={page}&limit=3" in paths
+    # the last page is the first one not full, but read-ahead requests
+    # up to `prefetch` more pages
+    assert len(paths) <= 3 * 4 + 2 + 3 * prefetch
+    if not prefetch:
+        assert len(paths) == 3 * 4 + 2
+        assert "/api/v1/employees?page=2&limit=3" in paths
+
+
+def test_pagination_ignored(mocker: MockerFixture, local_server):
+    """Assert pagination stops if the API ignores the page parameters."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    fake_leaves = [utils.random_schema(Leave) for _ in range(3)]
+    local_server.routes["/api/v1/leaves"] = (200, fake_leaves)
+    for page_size in (2, 100):
+        with Factorial(
+            access_token=utils.random_lower_string(), page_size=page_size
+        ) as factorial:
+            assert [x.id for x in factorial.get_leaves()] == [
+                x["id"] for x in fake_leaves
+            ]
+    # a single request when everything fits in a page, and a repeated
+    # page otherwise
+    assert len(local_server.requests) == 2 + 1
+
+
+def test_pagination_prefetch(mocker: MockerFixture, local_server):
+    """Assert next pages are requested while the current one is consumed."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    fake_leaves = [utils.random_schema(Leave) for _ in range(10)]
+    local_server.routes["/api/v1/leaves"] = utils.paginated_route(fake_leaves)
+    with Factorial(
+        access_token=utils.random_lower_string(), page_size=2, prefetch=2
+    ) as factorial:
+        leaves = factorial.iter_leaves()
+        next(leaves)
+        # wait for the read-ahead requests to complete
+        factorial._executor.shutdown(wait=True)
+        pages = sorted(x[1] for x in local_server.requests)
+        assert pages == [f"/api/v1/leaves?page={x}&limit=2" for x in range(1, 4)]
+        leaves.close()
+
+    with pytest.raises(ValueError):
+        Factorial(access_token=utils.random_lower_string(), page_size=0)
+    with pytest.raises(ValueError):
+        Factorial(access_token=utils.random_lower_string(), prefetch=-1)
+
+
+def test_get_shifts_range(mocker: MockerFixture, local_server):
+    """Assert shifts of a range are requested by month and merged in order."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    today = date.today()
+    fake_shifts = utils.random_shifts(date(2021, 1, 1), 120) + utils.random_shifts(
+        today.replace(day=1), 1
+    )
+    local_server.routes["/api/v1/shifts"] = utils.monthly_route(fake_shifts)
+    with Factorial(access_token=utils.random_lower_string()) as factorial:
+        shifts = factorial.get_shifts_range(
+            start=date(2021, 1, 15), end=date(2021, 3, 10), max_concurrency=2
+        )
+        assert [x.id for x in shifts] == list(range(14, 69))
+        assert len(local_server.requests) == 3
+        shifts = factorial.get_shifts_range(
+            start=date(2021, 2, 1), end=date(2021, 2, 28), employee_id=1
+        )
+        assert {x.employee_id for x in shifts} == {1}
+        assert len(shifts) == 14
+
+        # past months are requested only once, the current month every time
+        for _ in range(2):
+            shifts = factorial.get_shifts_range(
+                start=date(2021, 4, 1), end=today, cache_past=True
+            )
+            assert [x.id for x in shifts] == list(range(90, 120)) + [0]
+        paths = [path for _, path, _ in local_server.requests[4:]]
+        months = len(drifactorial._months(date(2021, 4, 1), today))
+        assert len(paths) == months + 1
+        assert paths[-1].endswith(f"year={today.year}&month={today.month}")
+
+        # an overnight shift of a past month, clocked out the next month
+        shift = utils.random_schema(Shift)
+        shift.update(year=2021, month=4, day=30, employee_id=1)
+        local_server.routes["/api/v1/shifts/clock_out"] = (200, shift)
+        factorial.clock_out(now=datetime(2021, 5, 1, 6), employee_id=1)
+        sent = len(local_server.requests)
+        factorial.get_shifts_range(
+            start=date(2021, 4, 1), end=date(2021, 5, 31), cache_past=True
+        )
+        paths = [path for _, path, _ in local_server.requests[sent:]]
+        assert paths == ["/api/v1/shifts?year=2021&month=4"]
+
+        # kept in a cache of past months only, which can be cleared
+        assert factorial.cache.ttl == {}
+        assert len(factorial.cache) == months - 1
+        local_server.routes["/api/v1/company_holidays"] = (200, [])
+        factorial.get_holidays()
+        assert len(factorial.cache) == months - 1
+        factorial.cache.clear()
+        sent = len(local_server.requests)
+        factorial.get_shifts_range(
+            start=date(2021, 4, 1), end=date(2021, 4, 30), cache_past=True
+        )
+        assert len(local_server.requests) == sent + 1
+
+        with pytest.raises(ValueError):
+            factorial.get_shifts_range(start=date(2021, 2, 1), end=date(2021, 1, 1))
+
+
+def test_coalesce(mocker: MockerFixture, local_server):
+    """Assert identical concurrent requests share a single request."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    fake_holidays = [utils.random_schema(Holiday) for _ in range(5)]
+
+    def holidays_route(path: str) -> Tuple[int, List[Any]]:
+        sleep(0.1)
+        return (500, []) if "fail" in path else (200, fake_holidays)
+
+    local_server.routes["/api/v1/company_holidays"] = holidays_route
+    with Factorial(
+        access_token=utils.random_lower_string(), coalesce=True
+    ) as factorial:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(factorial.get_holidays) for _ in range(8)]
+            results = [x.result() for x in futures]
+        assert all(x == results[0] for x in results)
+        assert len(results[0]) == 5
+        assert len(local_server.requests) == 1
+        assert factorial.coalesced == 7
+        # errors are shared too
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(
+                    factorial._get_raw,
+                    endpoint="company_holidays",
+                    params={"fail": "1"},
+                )
+                for _ in range(4)
+            ]
+            for future in futures:
+                with pytest.raises(HTTPError):
+                    future.result()
+        assert len(local_server.requests) == 2
+        assert factorial.coalesced == 10
+        # later requests are not coalesced
+        factorial.get_holidays()
+        assert len(local_server.requests) == 3
+        assert not factorial._in_flight
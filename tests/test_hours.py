@@ -0,0 +1,103 @@
+"""Test module for the hours module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import random
+from datetime import date, time, timedelta
+from typing import List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial.columnar import ShiftColumns
+from drifactorial.hours import MONTH, WEEK, PeriodHours, worked_hours
+from drifactorial.schemas import Shift
+
+
+def _shift(
+    employee_id: int, day: date, clock_in: time, clock_out: Optional[time]
+) -> Shift:
+    """Aux function to build a shift."""
+    return Shift(
+        id=random.randint(1, 10**6),
+        day=day.day,
+        month=day.month,
+        year=day.year,
+        clock_in=clock_in,
+        clock_out=clock_out,
+        employee_id=employee_id,
+        observations=None,
+    )
+
+
+SHIFTS = [
+    _shift(1, date(2021, 6, 7), time(9), time(13)),
+    _shift(1, date(2021, 6, 7), time(14), time(17, 30)),
+    # overnight
+    _shift(1, date(2021, 6, 8), time(22), time(6)),
+    # open
+    _shift(1, date(2021, 6, 13), time(9), None),
+    _shift(2, date(2021, 6, 7), time(9), time(17)),
+    _shift(2, date(2021, 7, 1), time(9), time(9, 45)),
+]
+
+
+def _random_shifts(n: int) -> List[Shift]:
+    """Aux function to generate valid random shifts."""
+    shifts = []
+    for _ in range(n):
+        day = date(2021, 1, 1) + timedelta(days=random.randrange(400))
+        clock_out = None if random.random() < 0.1 else time(random.randrange(24))
+        clock_in = time(random.randrange(24), random.randrange(60))
+        shifts.append(_shift(random.randrange(20), day, clock_in, clock_out))
+    return shifts
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_worked_hours(use_numpy: bool):
+    """Assert hours are aggregated by day, week and month."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    assert worked_hours(SHIFTS, use_numpy=use_numpy) == [
+        PeriodHours(1, date(2021, 6, 7), 7.5, 2, 0),
+        PeriodHours(1, date(2021, 6, 8), 8.0, 1, 0),
+        PeriodHours(1, date(2021, 6, 13), 0.0, 1, 1),
+        PeriodHours(2, date(2021, 6, 7), 8.0, 1, 0),
+        PeriodHours(2, date(2021, 7, 1), 0.75, 1, 0),
+    ]
+    assert worked_hours(SHIFTS, period=WEEK, use_numpy=use_numpy) == [
+        PeriodHours(1, date(2021, 6, 7), 15.5, 4, 1),
+        PeriodHours(2, date(2021, 6, 7), 8.0, 1, 0),
+        PeriodHours(2, date(2021, 6, 28), 0.75, 1, 0),
+    ]
+    assert worked_hours(ShiftColumns(SHIFTS), period=MONTH, use_numpy=use_numpy) == [
+        PeriodHours(1, date(2021, 6, 1), 15.5, 4, 1),
+        PeriodHours(2, date(2021, 6, 1), 8.0, 1, 0),
+        PeriodHours(2, date(2021, 7, 1), 0.75, 1, 0),
+    ]
+    assert worked_hours([], use_numpy=use_numpy) == []
+    invalid = SHIFTS[0].model_copy(update={"day": 31})
+    with pytest.raises(ValueError):
+        worked_hours([invalid], use_numpy=use_numpy)
+    with pytest.raises(ValueError):
+        worked_hours(SHIFTS, period="year", use_numpy=use_numpy)
+
+
+def test_worked_hours_numpy():
+    """Assert NumPy and pure Python aggregations match."""
+    pytest.importorskip("numpy")
+    columns = ShiftColumns(_random_shifts(2000))
+    for period in ("day", WEEK, MONTH):
+        expected = worked_hours(columns, period=period, use_numpy=False)
+        result = worked_hours(columns, period=period, use_numpy=True)
+        assert [x[:2] + x[3:] for x in result] == [x[:2] + x[3:] for x in expected]
+        assert [x.hours for x in result] == pytest.approx([x.hours for x in expected])
+
+
+def test_worked_hours_without_numpy(mocker: MockerFixture):
+    """Assert the pure Python aggregation is used without NumPy."""
+    mocker.patch("drifactorial.hours._numpy", return_value=None)
+    assert len(worked_hours(SHIFTS)) == 5
+    with pytest.raises(ImportError):
+        worked_hours(SHIFTS, use_numpy=True)
@@ -0,0 +1,43 @@
+"""Test module for the import time of the package.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+import drifactorial
+from drifactorial import schemas
+
+LAZY_MODULES = ("dateutil", "pydantic", "drifactorial.schemas")
+ROOT = Path(__file__).parent.parent
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    """Aux function to run python in a fresh interpreter."""
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_lazy_modules():
+    """Assert heavy dependencies are not loaded on import."""
+    code = "import json, sys, drifactorial; print(json.dumps(list(sys.modules)))"
+    modules: List[str] = json.loads(_run("-c", code).stdout)
+    for lazy in LAZY_MODULES:
+        assert not any(x == lazy or x.startswith(f"{lazy}.") for x in modules)
+
+
+def test_lazy_attributes():
+    """Assert lazily loaded attributes are available."""
+    for name in drifactorial.SCHEMA_NAMES:
+        assert getattr(drifactorial, name) is getattr(schemas, name)
+    assert drifactorial.__version__
+    assert not hasattr(drifactorial, "Unknown")
@@ -0,0 +1,88 @@
+"""Test module for the index module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import random
+from datetime import date, timedelta
+
+from pydantic import TypeAdapter
+
+from drifactorial import daterange
+from drifactorial.index import LeaveIndex
+from drifactorial.schemas import Employee, Holiday, Leave
+from tests import utils
+
+
+def random_leave(*, employee_id: int, start_on: date, days: int) -> Leave:
+    """Generate a random Leave object."""
+    leave = TypeAdapter(Leave).validate_python(utils.random_schema(Leave))
+    leave.employee_id = employee_id
+    leave.start_on = start_on
+    leave.finish_on = start_on + timedelta(days)
+    leave.approved = random.random() < 0.8
+    return leave
+
+
+def test_leave_index():
+    """Assert queries match a day by day scan of leaves and holidays."""
+    origin = date(2021, 1, 1)
+    employees = []
+    for employee_id in range(1, 11):
+        employee = TypeAdapter(Employee).validate_python(utils.random_employee())
+        employee.id = employee_id
+        employee.team_ids = (employee_id % 3,)
+        employee.company_holiday_ids = (employee_id % 2,)
+        employees.append(employee)
+    holidays = []
+    for holiday_id in range(2):
+        holiday = TypeAdapter(Holiday).validate_python(utils.random_schema(Holiday))
+        holiday.id = holiday_id
+        holiday.date = origin + timedelta(random.randint(0, 60))
+        holidays.append(holiday)
+    leaves = [
+        random_leave(
+            employee_id=random.randint(1, 12),
+            start_on=origin + timedelta(random.randint(0, 60)),
+            days=random.randint(-1, 10),
+        )
+        for _ in range(60)
+    ]
+
+    # build half of the index at once, and insert the rest incrementally
+    index = LeaveIndex(employees=employees[:5], leaves=leaves[:30])
+    for holiday in holidays:
+        index.add_holiday(holiday)
+    for employee in employees[5:]:
+        index.add_employee(employee)
+    for leave in leaves[30:]:
+        index.add_leave(leave)
+
+    daysoff = {x: set() for x in range(1, 13)}
+    for leave in leaves:
+        if leave.approved:
+            daysoff[leave.employee_id].update(
+                daterange(leave.start_on, leave.finish_on)
+            )
+    for employee in employees:
+        for holiday in holidays:
+            if holiday.id in employee.company_holiday_ids:
+                daysoff[employee.id].add(holiday.date)
+
+    for employee_id, days in daysoff.items():
+        intervals = index.daysoff(employee_id)
+        assert [y for x in intervals for y in daterange(*x)] == sorted(days)
+    for day in daterange(origin - timedelta(1), origin + timedelta(75)):
+        off = sorted(x for x, days in daysoff.items() if day in days)
+        assert index.off_on(day) == off
+        assert all(index.is_off(x, day) for x in off)
+        team = sorted(x for x in off if x <= 10 and x % 3 == 1)
+        assert index.off_on(day, team_id=1) == team
+        end = day + timedelta(6)
+        week = sorted(
+            x for x, days in daysoff.items() if any(day <= y <= end for y in days)
+        )
+        assert index.off_between(day, end) == week
+    assert index.off_on(origin, team_id=99) == []
+    assert index.employee_ids(team_id=2) == {2, 5, 8}
+    assert not index.is_off(99, origin)
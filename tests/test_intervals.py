@@ -0,0 +1,59 @@
+"""Test module for the intervals module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import random
+from datetime import date, timedelta
+
+from drifactorial import daterange
+from drifactorial.intervals import (
+    count_days,
+    expand_intervals,
+    merge_intervals,
+    remove_weekends,
+)
+
+
+def test_merge_intervals():
+    """Assert overlapping and contiguous intervals are merged."""
+    intervals = [
+        (date(2021, 1, 10), date(2021, 1, 12)),
+        (date(2021, 1, 1), date(2021, 1, 3)),
+        (date(2021, 1, 4), date(2021, 1, 4)),
+        (date(2021, 1, 11), date(2021, 1, 11)),
+        (date(2021, 1, 20), date(2021, 1, 19)),
+    ]
+    assert merge_intervals(intervals) == [
+        (date(2021, 1, 1), date(2021, 1, 4)),
+        (date(2021, 1, 10), date(2021, 1, 12)),
+    ]
+    assert merge_intervals([]) == []
+
+
+def test_remove_weekends():
+    """Assert weekends are removed without going through single days."""
+    # Saturday 2021-01-02 to Monday 2021-01-18
+    intervals = [(date(2021, 1, 2), date(2021, 1, 18))]
+    assert remove_weekends(intervals) == [
+        (date(2021, 1, 4), date(2021, 1, 8)),
+        (date(2021, 1, 11), date(2021, 1, 15)),
+        (date(2021, 1, 18), date(2021, 1, 18)),
+    ]
+    assert remove_weekends([(date(2021, 1, 2), date(2021, 1, 3))]) == []
+
+
+def test_intervals_match_days():
+    """Assert interval arithmetic matches the day by day expansion."""
+    start = date(2021, 1, 1)
+    for _ in range(50):
+        intervals = []
+        for _ in range(random.randint(0, 10)):
+            first = start + timedelta(random.randint(0, 100))
+            intervals.append((first, first + timedelta(random.randint(-1, 20))))
+        days = sorted({y for x in intervals for y in daterange(*x)})
+        merged = merge_intervals(intervals)
+        assert expand_intervals(merged) == days
+        assert count_days(merged) == len(days)
+        weekdays = remove_weekends(merged)
+        assert expand_intervals(weekdays) == [x for x in days if x.weekday() < 5]
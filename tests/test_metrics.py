@@ -0,0 +1,151 @@
+"""Test module for the metrics module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+from urllib.error import HTTPError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.metrics import (
+    MetricsAggregator,
+    ParseEvent,
+    RequestEvent,
+    endpoint_name,
+    percentile,
+)
+from drifactorial.schemas import Leave
+from tests import utils
+
+
+def test_endpoint_name():
+    """Assert single resources are grouped together."""
+    assert endpoint_name("employees/123") == "employees/{id}"
+    assert endpoint_name("employees/123/shifts") == "employees/{id}/shifts"
+    assert endpoint_name("shifts/clock_in") == "shifts/clock_in"
+    assert endpoint_name("leaves") == "leaves"
+
+
+def test_percentile():
+    """Assert nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_metrics_aggregator():
+    """Assert events are summarized by endpoint and metric."""
+    aggregator = MetricsAggregator(window=100)
+    for i in range(1, 201):
+        aggregator(
+            RequestEvent(
+                endpoint="leaves",
+                method="GET",
+                status=200,
+                connect_time=0.0,
+                ttfb=i / 1000,
+                total_time=i / 100,
+                bytes=i,
+            )
+        )
+    aggregator(
+        ParseEvent(endpoint="leaves", decode_time=None, validation_time=1.0, items=5)
+    )
+    report = aggregator.report()
+    assert aggregator.endpoints() == ["leaves"]
+    assert set(report["leaves"]) == {
+        "connect_time",
+        "ttfb",
+        "total_time",
+        "bytes",
+        "validation_time",
+        "items",
+    }
+    # only the most recent values are kept
+    assert report["leaves"]["bytes"]["count"] == 100
+    assert report["leaves"]["bytes"]["p50"] == 150
+    assert report["leaves"]["bytes"]["p99"] == 199
+    assert report["leaves"]["total_time"]["mean"] == pytest.approx(1.505)
+    assert report["leaves"]["items"] == {
+        "count": 1,
+        "mean": 5,
+        "p50": 5,
+        "p95": 5,
+        "p99": 5,
+    }
+    aggregator.clear()
+    assert aggregator.report() == {}
+
+
+def test_factorial_hooks(mocker: MockerFixture, local_server):
+    """Assert the client emits request and parse events."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    leaves = [utils.random_schema(Leave) for _ in range(3)]
+    employee = utils.random_employee()
+    local_server.routes["/api/v1/leaves"] = (200, leaves)
+    local_server.routes[f"/api/v1/employees/{employee['id']}"] = (200, employee)
+    events = []
+    with Factorial(
+        access_token=utils.random_lower_string(), hooks=[events.append]
+    ) as factorial:
+        factorial.get_leaves()
+        request, parsed = events
+        assert isinstance(request, RequestEvent)
+        assert (request.endpoint, request.method, request.status) == (
+            "leaves",
+            "GET",
+            200,
+        )
+        assert request.connect_time > 0
+        assert request.ttfb >= request.connect_time
+        assert request.total_time >= request.ttfb
+        assert request.bytes > 0
+        assert isinstance(parsed, ParseEvent)
+        assert parsed.decode_time is None
+        assert parsed.validation_time > 0
+        assert parsed.items == 3
+
+        # streamed responses measure decoding apart
+        events.clear()
+        assert len(list(factorial.iter_leaves())) == 3
+        parsed, request = events
+        assert parsed.items == 3 and parsed.decode_time >= 0
+        assert request.connect_time == 0
+        assert request.bytes > 0
+
+        aggregator = MetricsAggregator()
+        factorial.add_hook(aggregator)
+        factorial.get_single_employee(employee_id=employee["id"])
+        with pytest.raises(HTTPError):
+            factorial.get_single_employee(employee_id=employee["id"] + 1)
+        assert aggregator.endpoints() == ["employees/{id}"]
+        assert events[-1].status == 404
+        assert events[-1].ttfb is None
+        factorial.remove_hook(events.append)
+        factorial.remove_hook(aggregator)
+        factorial.get_leaves()
+        assert aggregator.report()["employees/{id}"]["items"]["count"] == 1
+
+
+def test_async_factorial_hooks(mocker: MockerFixture, local_server):
+    """Assert the asyncio client emits request and parse events."""
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes["/api/v1/leaves"] = (200, [utils.random_schema(Leave)])
+    aggregator = MetricsAggregator()
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", hooks=[aggregator]) as client:
+            await asyncio.gather(client.get_leaves(), client.get_leaves())
+
+    asyncio.run(main())
+    report = aggregator.report()["leaves"]
+    assert report["total_time"]["count"] == 2
+    assert report["connect_time"]["p99"] > 0
+    assert report["ttfb"]["p50"] > 0
+    assert report["items"]["mean"] == 1
@@ -0,0 +1,146 @@
+"""Test module for the mirror module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import pytest
+from pydantic import TypeAdapter
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.mirror import Mirror
+from drifactorial.schemas import Employee, Holiday, Leave, Shift
+from tests import utils
+
+
+def random_records(schema, n: int) -> List:
+    """Generate random schema objects with unique ids."""
+    records = TypeAdapter(List[schema]).validate_python(
+        [
+            utils.random_employee()
+            if schema is Employee
+            else utils.random_schema(schema)
+            for _ in range(n)
+        ]
+    )
+    for i, record in enumerate(records):
+        record.id = i + 1
+    return records
+
+
+def test_mirror(mocker: MockerFixture, tmp_path):
+    """Assert the mirror stores, syncs incrementally and reads back records."""
+    today = date.today()
+    employees = random_records(Employee, 3)
+    holidays = random_records(Holiday, 4)
+    leaves = random_records(Leave, 5)
+    shifts = random_records(Shift, 5)
+    for i, leave in enumerate(leaves):
+        leave.employee_id = employees[i % 3].id
+        leave.start_on = today - timedelta(days=100 * i)
+        leave.finish_on = leave.start_on + timedelta(days=3)
+    for i, shift in enumerate(shifts):
+        shift.employee_id = employees[i % 3].id
+        shift.year, shift.month = (today.year - i, today.month)
+
+    def filter_leaves(
+        *, start: Optional[date] = None, employee_id: Optional[int] = None
+    ) -> List[Leave]:
+        return [
+            x.model_copy()
+            for x in leaves
+            if (start is None or x.finish_on >= start)
+            and employee_id in (None, x.employee_id)
+        ]
+
+    def filter_shifts(
+        *,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        employee_id: Optional[int] = None,
+    ) -> List[Shift]:
+        return [
+            x.model_copy()
+            for x in shifts
+            if year in (None, x.year)
+            and month in (None, x.month)
+            and employee_id in (None, x.employee_id)
+        ]
+
+    get_employees = mocker.patch.object(
+        Factorial, "get_employees", return_value=employees
+    )
+    mocker.patch.object(Factorial, "get_holidays", return_value=holidays)
+    get_leaves = mocker.patch.object(Factorial, "get_leaves", side_effect=filter_leaves)
+    get_shifts = mocker.patch.object(Factorial, "get_shifts", side_effect=filter_shifts)
+    client = Factorial(access_token=utils.random_lower_string())
+    path = f"{tmp_path / 'mirror.db'}"
+
+    with Mirror(path, client=client) as mirror:
+        assert mirror.synced_at("leaves") is None
+        assert mirror.sync() == {
+            "employees": 3,
+            "company_holidays": 4,
+            "leaves": 5,
+            "shifts": 5,
+        }
+        assert mirror.get_employees() == employees
+        assert mirror.get_single_employee(employee_id=2) == employees[1]
+        with pytest.raises(ValueError):
+            mirror.get_single_employee(employee_id=99)
+        assert mirror.get_holidays() == holidays
+        start = min(x.date for x in holidays) + timedelta(days=1)
+        assert mirror.get_holidays(start=start) == [
+            x for x in holidays if x.date >= start
+        ]
+        assert mirror.get_leaves() == leaves
+        assert mirror.get_leaves(start=today - timedelta(days=2), employee_id=1) == [
+            leaves[0]
+        ]
+        assert mirror.get_leaves(end=today - timedelta(days=150)) == leaves[2:]
+        assert mirror.get_shifts(year=today.year, month=today.month) == [shifts[0]]
+        assert mirror.get_shifts(employee_id=2) == [shifts[1], shifts[4]]
+        assert mirror.sync() == dict.fromkeys(
+            ["employees", "company_holidays", "leaves", "shifts"], 0
+        )
+        synced_at = mirror.synced_at("shifts")
+        assert synced_at is not None and synced_at <= datetime.now()
+
+    # incremental sync only requests recent leaves and shifts
+    leaves[1].description = utils.random_lower_string()
+    leaves[1].finish_on = today
+    # records edited out of the recent ones are kept
+    leaves[0].finish_on = leaves[0].start_on = today - timedelta(days=40)
+    shifts[0].year -= 1
+    shifts.append(shifts[2].model_copy(update={"id": 6, "year": today.year}))
+    with Mirror(path, client=client, lookback=timedelta(days=31)) as mirror:
+        assert mirror.sync(resources=["leaves", "shifts"]) == {"leaves": 2, "shifts": 2}
+        since = today - timedelta(days=31)
+        get_leaves.assert_any_call(start=since)
+        get_leaves.assert_called_with(employee_id=leaves[0].employee_id)
+        get_shifts.assert_any_call(year=since.year, month=since.month)
+        get_shifts.assert_any_call(year=today.year, month=today.month)
+        get_shifts.assert_called_with(employee_id=shifts[0].employee_id)
+        assert mirror.get_leaves() == leaves
+        assert mirror.get_shifts() == shifts
+
+        # recent records missing from all the records are deleted
+        shifts.pop()
+        assert mirror.sync(resources=["shifts"]) == {"shifts": 1}
+        assert mirror.get_shifts() == shifts
+
+        # full syncs delete the missing records
+        leaves.pop()
+        assert mirror.sync(resources=["leaves"], full=True) == {"leaves": 1}
+        assert mirror.get_leaves() == leaves
+        with pytest.raises(ValueError):
+            mirror.sync(resources=["unknown"])
+    assert get_employees.call_count == 2
+
+    with Mirror(path) as mirror:
+        assert mirror.get_employees() == employees
+        with pytest.raises(RuntimeError):
+            mirror.sync()
@@ -0,0 +1,240 @@
+"""Test module for the outbox module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import socket
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from urllib.error import HTTPError, URLError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.outbox import (
+    ClockQueue,
+    PendingClockError,
+    is_transient,
+    is_unknown,
+)
+from drifactorial.schemas import Shift
+from drifactorial.transport import NotSentError
+from tests import utils
+
+CLOCK_IN = "/api/v1/shifts/clock_in"
+CLOCK_OUT = "/api/v1/shifts/clock_out"
+
+
+def test_is_transient():
+    """Assert which errors leave clocks in the queue, and in which state."""
+    transient = [
+        HTTPError("url", 503, "unavailable", {}, None),  # type: ignore
+        HTTPError("url", 429, "throttled", {}, None),  # type: ignore
+        NotSentError(111, "refused"),
+    ]
+    unknown = [
+        HTTPError("url", 500, "error", {}, None),  # type: ignore
+        HTTPError("url", 504, "timeout", {}, None),  # type: ignore
+        ConnectionResetError(),
+        URLError("refused"),
+        socket.timeout(),
+        asyncio.IncompleteReadError(b"", None),
+    ]
+    permanent = [
+        HTTPError("url", 422, "invalid", {}, None),  # type: ignore
+        ValueError(),
+    ]
+    assert all(is_transient(x) and not is_unknown(x) for x in transient)
+    assert all(is_unknown(x) and not is_transient(x) for x in unknown)
+    assert not any(is_transient(x) or is_unknown(x) for x in permanent)
+
+
+def test_clock_queue(tmp_path):
+    """Assert clocks are stored until settled."""
+    now = datetime(2021, 10, 1, 9, 0)
+    with ClockQueue(f"{tmp_path / 'queue.db'}") as queue:
+        ids = queue.put_many([("clock_in", 1, now), ("clock_out", 1, now)])
+        assert len(queue) == 2
+        with pytest.raises(ValueError):
+            queue.put_many([("clock_up", 1, now)])
+        assert len(queue) == 2
+        assert not queue.settle(ids[0], exc=NotSentError(111, "refused"))
+        assert queue.settle(ids[1])
+    # the queue survives the process
+    with ClockQueue(f"{tmp_path / 'queue.db'}") as queue:
+        (pending,) = queue.pending()
+        assert pending.id == ids[0]
+        assert pending.action == "clock_in"
+        assert pending.employee_id == 1
+        assert pending.now == now
+        assert pending.attempts == 1
+        assert "refused" in pending.last_error
+        assert pending.state == "pending"
+
+        # clocks of unknown outcome are kept apart until resolved
+        assert not queue.settle(pending.id, exc=socket.timeout())
+        assert queue.pending() == []
+        (unknown,) = queue.unknown()
+        assert (unknown.id, unknown.attempts) == (pending.id, 2)
+        queue.resolve(unknown.id, posted=False)
+        assert [x.id for x in queue.pending()] == [pending.id]
+        queue.settle(pending.id, exc=socket.timeout())
+        queue.resolve(unknown.id, posted=True)
+        assert len(queue) == 0
+
+
+def test_factorial_clock_many(mocker: MockerFixture, local_server, tmp_path):
+    """Assert clocks are posted concurrently, and failed ones replayed."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    statuses: Dict[int, int] = {}
+
+    def route(path: str) -> Tuple[int, Dict[str, Any]]:
+        status = statuses.get(len(local_server.requests), 200)
+        return status, utils.random_schema(Shift) if status == 200 else {}
+
+    local_server.routes[CLOCK_IN] = route
+    local_server.routes[CLOCK_OUT] = route
+    now = datetime.now()
+    entries: List[Tuple[int, datetime]] = [(x, now) for x in range(1, 11)]
+    with Factorial(access_token="abc", pool_size=4) as factorial:
+        results = factorial.clock_in_many(entries=entries)
+        assert len(results) == 10
+        assert all(isinstance(x, Shift) for x in results)
+        assert len(local_server.requests) == 10
+
+        with ClockQueue(f"{tmp_path / 'queue.db'}") as queue:
+            # the 2nd request fails with a server error, the 3rd is rejected
+            statuses.update({12: 503, 13: 422})
+            results = factorial.clock_out_many(
+                entries=entries[:3], max_concurrency=1, queue=queue
+            )
+            assert isinstance(results[0], Shift)
+            assert isinstance(results[1], HTTPError) and results[1].code == 503
+            assert isinstance(results[2], HTTPError) and results[2].code == 422
+            (pending,) = queue.pending()
+            assert (pending.action, pending.employee_id) == ("clock_out", 2)
+
+            replayed = factorial.replay_clocks(queue=queue)
+            assert list(replayed) == [pending.id]
+            assert isinstance(replayed[pending.id], Shift)
+            assert len(queue) == 0
+            assert factorial.replay_clocks(queue=queue) == {}
+        with pytest.raises(ValueError):
+            factorial.clock_in_many(entries=entries, max_concurrency=0)
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths == [CLOCK_IN] * 10 + [CLOCK_OUT] * 4
+
+
+def test_factorial_clock_order(mocker: MockerFixture, local_server):
+    """Assert clocks of an employee are held back after a transient error."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    statuses = {CLOCK_IN: 503}
+    local_server.routes[CLOCK_IN] = lambda _: (
+        statuses[CLOCK_IN],
+        utils.random_schema(Shift),
+    )
+    local_server.routes[CLOCK_OUT] = lambda _: (200, utils.random_schema(Shift))
+    now = datetime.now()
+    with Factorial(access_token="abc") as factorial, ClockQueue(":memory:") as queue:
+        results = factorial.clock_in_many(entries=[(1, now), (2, now)], queue=queue)
+        assert all(isinstance(x, HTTPError) for x in results)
+        results = factorial.clock_out_many(entries=[(1, now), (3, now)], queue=queue)
+        assert isinstance(results[0], PendingClockError)
+        assert results[0].employee_id == 1
+        assert isinstance(results[1], Shift)
+        assert [x.employee_id for x in queue.pending()] == [1, 2, 1]
+
+        async def main():
+            async with AsyncFactorial(access_token="abc") as client:
+                return await client.replay_clocks(queue=queue)
+
+        # the clock-out waits for the clock-in
+        replayed = asyncio.run(main())
+        assert [type(x) for x in replayed.values()] == [
+            HTTPError,
+            HTTPError,
+            PendingClockError,
+        ]
+        statuses[CLOCK_IN] = 200
+        replayed = factorial.replay_clocks(queue=queue, max_concurrency=1)
+        assert all(isinstance(x, Shift) for x in replayed.values())
+        assert len(queue) == 0
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths[:5] == [CLOCK_IN] * 2 + [CLOCK_OUT] + [CLOCK_IN] * 2
+    assert paths[5:] == [CLOCK_IN, CLOCK_OUT, CLOCK_IN]
+
+
+def test_factorial_clock_unknown(mocker: MockerFixture, local_server):
+    """Assert clocks that may have reached the API are not replayed."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes[CLOCK_IN] = (200, utils.random_schema(Shift))
+    local_server.routes[CLOCK_OUT] = (200, utils.random_schema(Shift))
+    # the clock-in is read by the server, but never answered
+    local_server.drop.add(CLOCK_IN)
+    now = datetime.now()
+    with Factorial(access_token="abc") as factorial, ClockQueue(":memory:") as queue:
+        (result,) = factorial.clock_in_many(entries=[(1, now)], queue=queue)
+        assert isinstance(result, ConnectionError)
+        (unknown,) = queue.unknown()
+        factorial.clock_out_many(entries=[(1, now)], queue=queue)
+        assert [x.action for x in queue.pending()] == ["clock_out"]
+
+        async def main():
+            async with AsyncFactorial(access_token="abc") as client:
+                return await client.replay_clocks(queue=queue)
+
+        # the clock-out waits until the clock-in is resolved
+        (replayed,) = asyncio.run(main()).values()
+        assert isinstance(replayed, PendingClockError)
+        queue.resolve(unknown.id, posted=True)
+        (replayed,) = factorial.replay_clocks(queue=queue).values()
+        assert isinstance(replayed, Shift)
+        assert len(queue) == 0
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths == [CLOCK_IN, CLOCK_OUT]
+
+
+def test_clock_queue_upgrade(tmp_path):
+    """Assert queues created without clock states are upgraded."""
+    path = f"{tmp_path / 'queue.db'}"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE clocks"
+            " (id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT NOT NULL,"
+            " employee_id INTEGER NOT NULL, now TIMESTAMP NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO clocks (action, employee_id, now) VALUES (?, ?, ?)",
+            ("clock_in", 1, datetime(2021, 10, 1, 9, 0).isoformat()),
+        )
+    conn.close()
+    with ClockQueue(path) as queue:
+        (pending,) = queue.pending()
+        assert pending.state == "pending"
+
+
+def test_async_factorial_clock_many(mocker: MockerFixture, local_server):
+    """Assert clocks of the same employee are posted in order."""
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes[CLOCK_IN] = (200, utils.random_schema(Shift))
+    local_server.routes[CLOCK_OUT] = (200, utils.random_schema(Shift))
+    now = datetime.now()
+
+    async def main():
+        async with AsyncFactorial(access_token="abc") as client:
+            clock_ins = await client.clock_in_many(entries=[(1, now), (2, now)])
+            clock_outs = await client.clock_out_many(entries=[(1, now)] * 3)
+            return clock_ins + clock_outs
+
+    results = asyncio.run(main())
+    assert len(results) == 5
+    assert all(isinstance(x, Shift) for x in results)
+    paths = [path for _, path, _ in local_server.requests]
+    assert paths == [CLOCK_IN] * 2 + [CLOCK_OUT] * 3
@@ -0,0 +1,151 @@
+"""Test module for the ratelimit module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.error import HTTPError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.ratelimit import RateLimiter, parse_retry_after
+from tests import utils
+
+
+def test_parse_retry_after():
+    """Assert both forms of Retry-After are parsed."""
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" 0 ") == 0.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    past = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_rate_limiter_bucket():
+    """Assert requests are spread out at the rate after a burst."""
+    limiter = RateLimiter(rate=100, burst=2)
+    waits = [limiter.acquire() for _ in range(5)]
+    assert waits[:2] == [0.0, 0.0]
+    for n, wait in enumerate(waits[2:], 1):
+        assert wait == pytest.approx(n / 100, abs=0.005)
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+    with pytest.raises(ValueError):
+        RateLimiter(burst=0)
+
+
+def test_rate_limiter_retry_delay():
+    """Assert which responses are retried, and for how long."""
+    limiter = RateLimiter(rate=8, min_rate=1, max_retries=2, backoff_base=1)
+    # throttled: rate halves, Retry-After is honoured and pauses the bucket
+    assert (
+        limiter.retry_delay(status=429, method="POST", retry_after="2", attempt=0) == 2
+    )
+    assert limiter.rate == 4
+    assert limiter.acquire() > 1.9
+    assert (
+        limiter.retry_delay(status=429, method="GET", retry_after=None, attempt=1) <= 2
+    )
+    assert (
+        limiter.retry_delay(status=429, method="GET", retry_after=None, attempt=2)
+        is None
+    )
+    assert limiter.rate == 1
+    assert limiter.throttled == 3
+    # server errors: only idempotent requests are retried, with jitter
+    assert (
+        0
+        <= limiter.retry_delay(status=503, method="GET", retry_after=None, attempt=0)
+        <= 1
+    )
+    assert (
+        limiter.retry_delay(status=503, method="POST", retry_after=None, attempt=0)
+        is None
+    )
+    assert (
+        limiter.retry_delay(status=404, method="GET", retry_after=None, attempt=0)
+        is None
+    )
+    assert limiter.retries == 3
+    assert limiter.rate == 1
+    # successes recover the rate, and raise it up to the maximum
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == limiter.max_rate == 16
+
+
+def test_rate_limiter_max_rate():
+    """Assert the rate climbs above the initial one, up to the maximum."""
+    limiter = RateLimiter(rate=10)
+    limiter.on_success()
+    assert 10 < limiter.rate < 20
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 20
+    limiter.retry_delay(status=429, method="GET", retry_after=None, attempt=0)
+    assert limiter.rate == 10
+    # a maximum equal to the rate only backs off
+    limiter = RateLimiter(rate=10, max_rate=10)
+    limiter.on_success()
+    assert limiter.rate == 10
+    limiter.retry_delay(status=429, method="GET", retry_after=None, attempt=0)
+    assert limiter.rate == 5
+
+
+def test_factorial_rate_limiter(mocker: MockerFixture, local_server):
+    """Assert the client retries throttled and failed requests."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    responses = [
+        (429, {}, {"Retry-After": "0"}),
+        (503, {}),
+        (200, utils.random_employee()),
+    ]
+    local_server.routes["/api/v1/employees/1"] = lambda path: responses.pop(0)
+    local_server.routes["/api/v1/clock_in"] = (503, {})
+    limiter = RateLimiter(rate=1000, backoff_base=0.01)
+    with Factorial(
+        access_token=utils.random_lower_string(), rate_limiter=limiter
+    ) as factorial:
+        factorial.get_single_employee(employee_id=1)
+        assert len(local_server.requests) == 3
+        assert limiter.throttled == 1 and limiter.retries == 2
+        # non idempotent requests are not retried on server errors
+        with pytest.raises(HTTPError):
+            factorial.clock_in(now=datetime.now(), employee_id=1)
+        assert len(local_server.requests) == 4
+
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes["/api/v1/me"] = lambda path: (429, {}, {"Retry-After": "0"})
+
+    async def main():
+        limiter = RateLimiter(rate=1000, max_retries=2)
+        async with AsyncFactorial(access_token="abc", rate_limiter=limiter) as client:
+            await client.get_account()
+
+    with pytest.raises(HTTPError):
+        asyncio.run(main())
+    assert len(local_server.requests) == 7
+
+
+def test_rate_limiter_throughput(mocker: MockerFixture, local_server):
+    """Assert concurrent requests stay at the rate."""
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.routes["/api/v1/me"] = (200, {"x": 1})
+    limiter = RateLimiter(rate=200, burst=1)
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", rate_limiter=limiter) as client:
+            await asyncio.gather(*(client._get(endpoint="me") for _ in range(21)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - start >= 0.1
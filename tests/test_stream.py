@@ -0,0 +1,67 @@
+"""Test module for the stream module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import io
+import json
+
+import pytest
+
+from drifactorial.stream import iter_json_array, join_json_arrays
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1024])
+def test_iter_json_array(chunk_size: int):
+    """Assert items are decoded whatever the chunk boundaries."""
+    data = [
+        {"id": 1, "name": "Núria Ça", "tags": ["a", "b"], "nested": {"x": None}},
+        12345,
+        -1.5e3,
+        "text with , and ] inside",
+        [],
+        {},
+        True,
+        None,
+    ]
+    for raw in [json.dumps(data), json.dumps(data, indent=2)]:
+        stream = io.BytesIO(raw.encode("utf-8"))
+        assert list(iter_json_array(stream.read, chunk_size=chunk_size)) == data
+        stream = io.StringIO(raw)
+        assert list(iter_json_array(stream.read, chunk_size=chunk_size)) == data
+
+
+@pytest.mark.parametrize("raw", ["[]", " [ ] ", "[\n]"])
+def test_iter_json_array_empty(raw: str):
+    """Assert empty arrays yield nothing."""
+    stream = io.BytesIO(raw.encode("utf-8"))
+    assert list(iter_json_array(stream.read, chunk_size=1)) == []
+
+
+@pytest.mark.parametrize(
+    "raw", ["", "{}", "[1, 2", "[1 2]", "[1,, 2]", '[{"a": 1]', "[1] [2]"]
+)
+def test_iter_json_array_malformed(raw: str):
+    """Assert malformed documents raise `ValueError`."""
+    stream = io.BytesIO(raw.encode("utf-8"))
+    with pytest.raises(ValueError):
+        list(iter_json_array(stream.read, chunk_size=2))
+
+
+def test_iter_json_array_lazy():
+    """Assert the document is read as items are consumed."""
+    raw = json.dumps([{"id": x, "pad": "x" * 100} for x in range(1000)])
+    stream = io.BytesIO(raw.encode("utf-8"))
+    items = iter_json_array(stream.read, chunk_size=512)
+    assert next(items)["id"] == 0
+    assert stream.tell() <= 512
+    assert sum(1 for _ in items) == 999
+
+
+def test_join_json_arrays():
+    """Assert arrays are concatenated in order."""
+    documents = [b"[1, 2]", b" [] ", b'[{"a": [3]}]\n', b"[]"]
+    assert json.loads(join_json_arrays(documents)) == [1, 2, {"a": [3]}]
+    assert join_json_arrays([]) == b"[]"
+    with pytest.raises(ValueError):
+        join_json_arrays([b"[1]", b"{}"])
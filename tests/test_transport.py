@@ -0,0 +1,281 @@
+"""Test module for the transport module.
+
+Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
+"""
+
+import asyncio
+import gzip
+import json
+import socket
+import time
+import zlib
+from email.message import Message
+from typing import Any, List
+from urllib import error, request
+
+import pytest
+from pytest_mock import MockerFixture
+
+from drifactorial import Factorial
+from drifactorial.aio import AsyncFactorial
+from drifactorial.metrics import RequestEvent
+from drifactorial.schemas import Account, Leave
+from drifactorial.transport import (
+    ACCEPT_ENCODING,
+    AsyncConnectionPool,
+    ConnectionPool,
+    NotSentError,
+    _decompressor,
+    decompress,
+)
+from tests import utils
+
+
+def test_pool_reuses_connection(local_server):
+    """Assert consecutive requests share a single connection."""
+    local_server.routes["/a"] = (200, {"value": 1})
+    with ConnectionPool(maxsize=2) as pool:
+        for _ in range(5):
+            response = pool.urlopen(request.Request(f"{local_server.url}/a"))
+            assert json.loads(response.read()) == {"value": 1}
+    assert local_server.connections == 1
+    assert len(local_server.requests) == 5
+
+
+def test_pool_idle_timeout(local_server):
+    """Assert idle connections are dropped after the timeout."""
+    local_server.routes["/a"] = (200, [])
+    with ConnectionPool(idle_timeout=0.01) as pool:
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+        time.sleep(0.05)
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+    assert local_server.connections == 2
+
+
+def test_pool_unread_response(local_server):
+    """Assert closing an unread response discards its connection."""
+    local_server.routes["/a"] = (200, list(range(100)))
+    with ConnectionPool() as pool:
+        pool.urlopen(request.Request(f"{local_server.url}/a")).close()
+        response = pool.urlopen(request.Request(f"{local_server.url}/a"))
+        assert json.loads(response.read()) == list(range(100))
+    assert local_server.connections == 2
+
+
+def test_pool_http_error(local_server):
+    """Assert error statuses raise `HTTPError` and keep the connection."""
+    local_server.routes["/a"] = (200, {})
+    with ConnectionPool() as pool:
+        with pytest.raises(error.HTTPError) as exc_info:
+            pool.urlopen(request.Request(f"{local_server.url}/missing"))
+        assert exc_info.value.code == 404
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+    assert local_server.connections == 1
+
+
+def test_pool_closed():
+    """Assert a closed pool refuses requests."""
+    pool = ConnectionPool()
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.urlopen(request.Request("http://127.0.0.1/"))
+    with pytest.raises(ValueError):
+        ConnectionPool(maxsize=0)
+
+
+def test_pool_retries(local_server):
+    """Assert only idempotent requests are sent again on a dropped connection."""
+    local_server.routes["/a"] = (200, {})
+    local_server.drop.add("/drop")
+    post = request.Request(f"{local_server.url}/drop", data=b"{}", method="POST")
+    with ConnectionPool() as pool:
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+        with pytest.raises(ConnectionError):
+            pool.urlopen(post)
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+        with pytest.raises(ConnectionError):
+            pool.urlopen(request.Request(f"{local_server.url}/drop"))
+
+    async def main():
+        async with AsyncConnectionPool() as pool:
+            await pool.urlopen(request.Request(f"{local_server.url}/a"))
+            with pytest.raises(asyncio.IncompleteReadError):
+                await pool.urlopen(post)
+
+    asyncio.run(main())
+    methods = [x[0] for x in local_server.requests if x[1] == "/drop"]
+    assert methods == ["POST", "GET", "GET", "POST"]
+
+
+def test_pool_not_sent():
+    """Assert requests that never left the client are told apart."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+    post = request.Request(f"http://{host}:{port}/a", data=b"{}", method="POST")
+    with ConnectionPool() as pool:
+        with pytest.raises(NotSentError) as e:
+            pool.urlopen(post)
+        assert isinstance(e.value.__cause__, ConnectionRefusedError)
+
+    async def main():
+        async with AsyncConnectionPool() as pool:
+            with pytest.raises(NotSentError):
+                await pool.urlopen(post)
+
+    asyncio.run(main())
+
+
+def test_pool_closed_by_server(local_server):
+    """Assert connections closed by the server while idle are not reused."""
+    local_server.keep_alive = 0.05
+    local_server.routes["/a"] = (200, {})
+    post = request.Request(f"{local_server.url}/a", data=b"{}", method="POST")
+    with ConnectionPool() as pool:
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+        time.sleep(0.2)
+        pool.urlopen(post).read()
+
+    async def main():
+        async with AsyncConnectionPool() as pool:
+            await pool.urlopen(request.Request(f"{local_server.url}/a"))
+            await asyncio.sleep(0.2)
+            await pool.urlopen(post)
+
+    asyncio.run(main())
+    assert [x[0] for x in local_server.requests] == ["GET", "POST", "GET", "POST"]
+    assert local_server.connections == 4
+
+
+def test_pool_proxy(monkeypatch, local_server):
+    """Assert requests go through the proxies of the environment."""
+    host, port = local_server.server_address[:2]
+    monkeypatch.setenv("http_proxy", f"http://user:secret@{host}:{port}")
+    monkeypatch.setenv("https_proxy", local_server.url)
+    monkeypatch.setenv("no_proxy", "direct.invalid")
+    local_server.routes["http://example.invalid/a"] = (200, {"value": 1})
+    with ConnectionPool() as pool:
+        response = pool.urlopen(request.Request("http://example.invalid/a?b=1"))
+        assert json.loads(response.read()) == {"value": 1}
+        # the test server does not open tunnels
+        with pytest.raises(OSError, match="Tunnel connection failed"):
+            pool.urlopen(request.Request("https://example.invalid/a"))
+
+    async def main():
+        async with AsyncConnectionPool() as pool:
+            response = await pool.urlopen(request.Request("http://example.invalid/a"))
+            assert json.loads(await response.read()) == {"value": 1}
+            with pytest.raises(OSError, match="Tunnel connection failed"):
+                await pool.urlopen(request.Request("https://example.invalid/a"))
+
+    asyncio.run(main())
+    paths = [x[1] for x in local_server.requests]
+    assert paths == ["http://example.invalid/a?b=1", "http://example.invalid/a"]
+    for _, _, headers in local_server.requests:
+        assert headers["Proxy-Authorization"] == "Basic dXNlcjpzZWNyZXQ="
+    # hosts excluded from the proxies are reached directly
+    monkeypatch.setenv("no_proxy", host)
+    local_server.routes["/a"] = (200, {})
+    with ConnectionPool() as pool:
+        pool.urlopen(request.Request(f"{local_server.url}/a")).read()
+    assert local_server.requests[-1][1] == "/a"
+
+
+def test_factorial_keep_alive(mocker: MockerFixture, local_server):
+    """Assert the client reuses connections across methods."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    local_server.routes["/api/v1/me"] = (200, utils.random_schema(Account))
+    local_server.routes["/api/v1/company_holidays"] = (200, [])
+    with Factorial(access_token=utils.random_lower_string(), pool_size=1) as factorial:
+        factorial.get_account()
+        factorial.get_holidays()
+        factorial.get_account()
+    assert local_server.connections == 1
+    for _, _, headers in local_server.requests:
+        assert headers["Authorization"] == f"Bearer {factorial.access_token}"
+
+
+def test_decompress():
+    """Assert gzip and deflate bodies are decompressed."""
+    body = json.dumps(list(range(1000))).encode()
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw_deflate = compressor.compress(body) + compressor.flush()
+    for encoding, compressed in (
+        ("gzip", gzip.compress(body)),
+        ("deflate", zlib.compress(body)),
+        # without the zlib header, as sent by some servers
+        ("deflate", raw_deflate),
+        ("identity", body),
+    ):
+        headers = Message()
+        headers["Content-Encoding"] = encoding
+        assert decompress(compressed, headers) == body
+        decompressor = _decompressor(headers)
+        if decompressor is not None:
+            # fed in tiny chunks, with a length limit
+            chunks = [decompressor.decompress(compressed[:1], 10)]
+            tail = compressed[1:]
+            while tail:
+                chunks.append(decompressor.decompress(tail, 10))
+                tail = decompressor.unconsumed_tail
+            assert b"".join(chunks) + decompressor.flush() == body
+    assert decompress(body, Message()) == body
+
+
+def test_pool_decompression(local_server):
+    """Assert compressed responses are decompressed as they are read."""
+    local_server.compress = True
+    items = list(range(5000))
+    local_server.routes["/a"] = (200, items)
+    req = request.Request(
+        f"{local_server.url}/a", headers={"Accept-Encoding": ACCEPT_ENCODING}
+    )
+    with ConnectionPool() as pool:
+        response = pool.urlopen(req)
+        chunks = list(iter(lambda: response.read(100), b""))
+        assert all(0 < len(x) <= 100 for x in chunks)
+        assert json.loads(b"".join(chunks)) == items
+        assert 0 < response.compressed_bytes < len(b"".join(chunks))
+        # mixing partial and full reads keeps all the data
+        response = pool.urlopen(req)
+        head = response.read(10)
+        assert json.loads(head + response.read()) == items
+        # uncompressed responses when not accepted
+        response = pool.urlopen(request.Request(f"{local_server.url}/a"))
+        body = response.read()
+        assert json.loads(body) == items
+        assert response.compressed_bytes == len(body)
+    assert local_server.connections == 1
+
+
+def test_factorial_compression(mocker: MockerFixture, local_server):
+    """Assert the client negotiates compression and reports both sizes."""
+    mocker.patch("drifactorial.URL_BASE", local_server.url)
+    mocker.patch("drifactorial.aio.URL_BASE", local_server.url)
+    local_server.compress = True
+    leaves = [utils.random_schema(Leave) for _ in range(200)]
+    local_server.routes["/api/v1/leaves"] = (200, leaves)
+    events: List[Any] = []
+    with Factorial(access_token="abc", hooks=[events.append]) as factorial:
+        assert len(list(factorial.iter_leaves())) == 200
+        assert len(factorial.get_leaves()) == 200
+    with Factorial(
+        access_token="abc", hooks=[events.append], compression=False
+    ) as factorial:
+        assert len(factorial.get_leaves()) == 200
+
+    async def main():
+        async with AsyncFactorial(access_token="abc", hooks=[events.append]) as client:
+            return await client.get_leaves()
+
+    assert len(asyncio.run(main())) == 200
+    requests = [x for x in events if isinstance(x, RequestEvent)]
+    assert len(requests) == 4
+    for event in requests[:2] + requests[3:]:
+        assert 0 < event.compressed_bytes < event.bytes
+    assert requests[2].compressed_bytes == requests[2].bytes
+    encodings = [
+        {k.lower(): v for k, v in x.items()}["accept-encoding"]
+        for _, _, x in local_server.requests
+    ]
+    assert encodings == [ACCEPT_ENCODING, ACCEPT_ENCODING, "identity", ACCEPT_ENCODING]
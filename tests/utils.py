@@ -5,10 +5,11 @@ Dribia 2021, Xavier Hoffmann <xrhoffmann@gmail.com>
 
 import random
 import string
-from datetime import date, datetime, time
-from typing import Any, Dict, Optional
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib import parse
 
-from drifactorial.schemas import Employee
+from drifactorial.schemas import Employee, Shift
 
 
 def random_lower_string(*, k: int = 32) -> str:
@@ -120,3 +121,42 @@ def random_employee(
     }
     data.update(hiring=hiring_raw)
     return data
+
+
+def paginated_route(items: List[Any]) -> Callable[[str], Tuple[int, List[Any]]]:
+    """Serve a list page by page on the local test server."""
+
+    def route(path: str) -> Tuple[int, List[Any]]:
+        query = parse.parse_qs(parse.urlsplit(path).query)
+        page = int(query["page"][0])
+        limit = int(query["limit"][0])
+        return 200, items[(page - 1) * limit : page * limit]
+
+    return route
+
+
+def monthly_route(shifts: List[Any]) -> Callable[[str], Tuple[int, List[Any]]]:
+    """Serve shifts filtered by month on the local test server."""
+
+    def route(path: str) -> Tuple[int, List[Any]]:
+        query = parse.parse_qs(parse.urlsplit(path).query)
+        return 200, [
+            x
+            for x in shifts
+            if all(f"{x[k]}" == v[0] for k, v in query.items() if k in x)
+        ]
+
+    return route
+
+
+def random_shifts(start: date, days: int) -> List[Dict[str, Any]]:
+    """Generate a random shift per day, for two employees."""
+    shifts = []
+    for n in range(days):
+        day = start + timedelta(days=n)
+        shift = random_schema(Shift)
+        shift.update(
+            id=n, year=day.year, month=day.month, day=day.day, employee_id=1 + n % 2
+        )
+        shifts.append(shift)
+    return shifts